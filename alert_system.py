@@ -1,20 +1,420 @@
 # alert_system.py
 
+import heapq
+import itertools
+import threading
+import time
+from collections import namedtuple
+
+from news2_algo import CLINICAL_BANDS, NEWSResult, clinical_band
+
+# Alert levels from the NEWS2 clinical response, lowest first. A single parameter scoring 3
+# ("low-medium") alerts even when the aggregate score is in the low band. cooldown is the
+# shortest gap between two notifications of the same alert at the same level (repeats inside
+# it are deduplicated); repeat_after is how long an unacknowledged alert waits before it is
+# re-sent as a reminder.
+AlertLevel = namedtuple("AlertLevel", ["name", "severity", "colour", "response", "cooldown", "repeat_after"])
+
+_BANDS = {band.name: band for band in CLINICAL_BANDS}
+
+ALERT_LEVELS = (
+    AlertLevel("low_medium", 1, "yellow",
+               "Registered nurse immediately informs medical team to decide on escalation", 3600, 3600),
+    AlertLevel("medium", 2, _BANDS["medium"].colour, _BANDS["medium"].response, 1800, 1800),
+    AlertLevel("high", 3, _BANDS["high"].colour, _BANDS["high"].response, 600, 900),
+)
+ALERT_LEVELS_BY_NAME = {level.name: level for level in ALERT_LEVELS}
+
+# Seconds a patient must stay below their current alert level before it is lowered or cleared
+DEFAULT_HOLD = 900
+
+
+def alert_level(score, params_with_3_points=()):
+    """Return the AlertLevel for a NEWS score and the parameters scoring 3, or None if no alert applies."""
+    if score is None:
+        return None
+    level = ALERT_LEVELS_BY_NAME.get(clinical_band(score).name)
+    if level is None and params_with_3_points:
+        level = ALERT_LEVELS_BY_NAME["low_medium"]
+    return level
+
+
+def _severity(level):
+    return level.severity if level is not None else 0
+
+
+class Alert:
+    """
+    One open (or resolved) alert for a patient.
+
+    An alert is raised when a patient first reaches an alert level. It is then updated in
+    place as the patient's score moves: escalated if the level rises, lowered or resolved
+    once the patient has stayed below it for the hold time. `reason` is why the latest
+    notification went out: 'raised', 'escalated', 'new_parameter' or 'reminder'.
+    """
+    __slots__ = ("id", "patient_id", "level", "score", "params_with_3_points", "raised_at", "updated_at",
+                 "notified_at", "notifications", "reason", "acknowledged_at", "acknowledged_by",
+                 "resolved_at", "remind_at", "_notified_params")
+
+    def __init__(self, alert_id, patient_id, level, score, params_with_3_points, now):
+        self.id = alert_id
+        self.patient_id = patient_id
+        self.level = level
+        self.score = score
+        self.params_with_3_points = params_with_3_points
+        self.raised_at = self.updated_at = now
+        self.notified_at = None
+        self.notifications = 0
+        self.reason = None
+        self.acknowledged_at = self.acknowledged_by = None
+        self.resolved_at = None
+        self.remind_at = None
+        self._notified_params = frozenset()
+
+    @property
+    def severity(self):
+        return self.level.severity
+
+    @property
+    def is_open(self):
+        return self.resolved_at is None
+
+    @property
+    def message(self):
+        text = f"Patient {self.patient_id}: NEWS2 score {self.score} ({self.level.name.replace('_', '-')})"
+        if self.params_with_3_points:
+            scoring_3 = ", ".join(param.replace('_', ' ').title() for param in self.params_with_3_points)
+            text += f", scoring 3: {scoring_3}"
+        return f"{text}. {self.level.response}."
+
+    def to_dict(self):
+        return {'id': self.id, 'patient_id': self.patient_id, 'level': self.level.name, 'severity': self.severity,
+                'score': self.score, 'params_with_3_points': self.params_with_3_points,
+                'raised_at': self.raised_at, 'updated_at': self.updated_at, 'notified_at': self.notified_at,
+                'notifications': self.notifications, 'reason': self.reason,
+                'acknowledged_at': self.acknowledged_at, 'acknowledged_by': self.acknowledged_by,
+                'resolved_at': self.resolved_at, 'message': self.message}
+
+    def __repr__(self):
+        state = "resolved" if self.resolved_at is not None else "acknowledged" if self.acknowledged_at else "open"
+        return f"Alert(id={self.id}, patient_id={self.patient_id!r}, level={self.level.name!r}, score={self.score}, {state})"
+
+
+class _PatientState:
+    __slots__ = ("level", "alert", "pending", "pending_since", "version", "notified")
+
+    def __init__(self):
+        self.level = None
+        self.alert = None
+        self.pending = _NOT_PENDING
+        self.pending_since = None
+        self.version = 0
+        self.notified = {}  # level name -> (time last notified, alert id)
+
+
+_NOT_PENDING = object()
+
+
 class AlertSystem:
     """
     This class handles the generation and distribution of alerts to hospital staff
     based on changes in NEWS scores or other critical patient data.
-    
-    TODO:
-    - Implement alert generation logic based on NEWS scores
-    - Define different alert levels and corresponding actions
-    - Implement notification methods (e.g., SMS, email, in-app notifications)
+
+    Each patient has a small state machine over the alert levels in ALERT_LEVELS:
+    - reaching a higher level raises an alert, or escalates the patient's open alert, at once
+    - a parameter newly scoring 3 re-notifies the open alert
+    - dropping to a lower level only takes effect once the patient has stayed below their
+      current level for `hold` seconds (hysteresis); going back up in that time cancels it,
+      so a score flapping across a band edge does not raise and resolve alerts every minute.
+      Dropping out of every level resolves the alert.
+    - re-notifying an open alert at a level it was notified at less than that level's
+      cooldown ago is suppressed (a reminder is still scheduled); a newly raised alert is
+      always sent
+    - an open, unacknowledged alert is re-sent every repeat_after seconds
+
+    Open alerts sit in a priority queue ordered by severity, then age. evaluate() touches only
+    the patient it is given and tick() only the timers (hold periods, reminders) that are due,
+    so a tick costs O(changed patients + due timers) however many patients are monitored;
+    feed it the NEWSEvents from news2_stream, which are only emitted on change.
+
+    Parameters:
+    - db: optional DatabaseManager; every notification is recorded with log_alert
+    - hold: seconds below the current level before it is lowered or cleared
+    - dispatcher: optional notification_dispatcher.NotificationDispatcher that sends the
+      notifications in the background (without one they are printed)
     """
-    
-    def generate_alert(self, patient_id, news_score):
-        # Generate and send an alert based on the NEWS score
-        pass
-    
+
+    def __init__(self, db=None, hold=DEFAULT_HOLD, dispatcher=None):
+        self.db = db
+        self.hold = hold
+        self.dispatcher = dispatcher
+        self.patients = {}
+        self.alerts = {}  # alert id -> open Alert
+        self.counters = dict.fromkeys(('evaluated', 'raised', 'escalated', 'new_parameter', 'reminders',
+                                       'suppressed', 'lowered', 'resolved', 'acknowledged'), 0)
+        self._queue = []  # (-severity, raised_at, alert id); stale entries are skipped lazily
+        self._timers = []  # (due, seq, patient_id or None, alert id or None, patient state version)
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+
+    # Evaluation
+
+    def evaluate(self, patient_id, result, now=None):
+        """
+        Apply one patient's new NEWS result.
+
+        Parameters:
+        - patient_id: patient identifier
+        - result: a NEWSResult, a news2_stream NEWSEvent, or an aggregate score
+        - now: epoch seconds (default: now)
+
+        Returns:
+        - list of Alerts notified as a result (usually empty)
+        """
+        score, params_with_3_points = _score_and_threes(result)
+        if score is None:
+            return []
+        now = time.time() if now is None else now
+        notified = []
+        with self._lock:
+            self.counters['evaluated'] += 1
+            state = self.patients.get(patient_id)
+            if state is None:
+                state = self.patients[patient_id] = _PatientState()
+            target = alert_level(score, params_with_3_points)
+            alert = state.alert
+            if alert is not None:
+                alert.score, alert.params_with_3_points, alert.updated_at = score, params_with_3_points, now
+
+            if _severity(target) > _severity(state.level):
+                self._cancel_pending(state)
+                state.level = target
+                if alert is None:
+                    alert = state.alert = Alert(next(self._ids), patient_id, target, score, params_with_3_points, now)
+                    self.alerts[alert.id] = alert
+                    self.counters['raised'] += 1
+                    self._notify(state, alert, 'raised', now, notified)
+                else:
+                    alert.level = target
+                    alert.acknowledged_at = alert.acknowledged_by = None
+                    self.counters['escalated'] += 1
+                    self._notify(state, alert, 'escalated', now, notified)
+                heapq.heappush(self._queue, (-alert.severity, alert.raised_at, alert.id))
+            else:
+                if _severity(target) == _severity(state.level):
+                    self._cancel_pending(state)
+                elif state.pending is _NOT_PENDING:
+                    # Start the hold period; later drops within it keep the original start
+                    state.pending, state.pending_since = target, now
+                    state.version += 1
+                    self._timer(now + self.hold, patient_id=patient_id, version=state.version)
+                else:
+                    state.pending = target
+                if alert is not None and set(params_with_3_points) - alert._notified_params:
+                    self.counters['new_parameter'] += 1
+                    self._notify(state, alert, 'new_parameter', now, notified, dedupe=False)
+        return notified
+
+    def evaluate_many(self, results, now=None):
+        """
+        Apply a batch of changed results and then run any due timers.
+
+        Parameters:
+        - results: iterable of NEWSEvents or (patient_id, result) pairs, for the patients that changed
+
+        Returns:
+        - list of Alerts notified
+        """
+        now = time.time() if now is None else now
+        notified = []
+        with self._lock:
+            for item in results:
+                if hasattr(item, 'patient_id'):
+                    notified.extend(self.evaluate(item.patient_id, item, now))
+                else:
+                    notified.extend(self.evaluate(item[0], item[1], now))
+            notified.extend(self.tick(now))
+        return notified
+
+    def tick(self, now=None):
+        """Run the hold-period and reminder timers that are due; returns the Alerts notified."""
+        now = time.time() if now is None else now
+        notified = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                due, _, patient_id, alert_id, version = heapq.heappop(self._timers)
+                if patient_id is not None:
+                    state = self.patients[patient_id]
+                    if state.version == version and state.pending is not _NOT_PENDING:
+                        self._lower(state, due)
+                else:
+                    alert = self.alerts.get(alert_id)
+                    if alert is not None and alert.acknowledged_at is None and alert.remind_at == due:
+                        self.counters['reminders'] += 1
+                        self._notify(self.patients[alert.patient_id], alert, 'reminder', now, notified, dedupe=False)
+        return notified
+
+    def generate_alert(self, patient_id, news_score, now=None):
+        """
+        Generate and send an alert based on the NEWS score.
+
+        Parameters:
+        - patient_id: patient identifier
+        - news_score: a NEWSResult, NEWSEvent or aggregate score
+
+        Returns:
+        - the patient's open Alert, or None if no alert level applies
+        """
+        with self._lock:
+            self.evaluate(patient_id, news_score, now)
+            state = self.patients.get(patient_id)
+            return state.alert if state is not None else None
+
     def notify_staff(self, alert):
-        # Send notifications to appropriate hospital staff
-        pass
\ No newline at end of file
+        # Send notifications to appropriate hospital staff. Dispatch only queues, so this never
+        # waits on SMTP or an SMS gateway while the alert lock is held.
+        if self.dispatcher is not None:
+            self.dispatcher.dispatch(alert)
+            return
+        print(f"[{alert.level.name.upper()} {alert.reason}] {alert.message}")
+
+    # Staff actions
+
+    def acknowledge(self, alert_id, by=None, now=None):
+        """Mark an open alert as acknowledged, which stops its reminders. Returns the Alert, or None."""
+        with self._lock:
+            alert = self.alerts.get(alert_id)
+            if alert is not None and alert.acknowledged_at is None:
+                alert.acknowledged_at, alert.acknowledged_by = time.time() if now is None else now, by
+                alert.remind_at = None
+                self.counters['acknowledged'] += 1
+            return alert
+
+    def resolve(self, alert_id, now=None):
+        """Close an alert by hand. The patient's level is kept, so they are only re-alerted if it rises."""
+        with self._lock:
+            alert = self.alerts.pop(alert_id, None)
+            if alert is not None:
+                alert.resolved_at = time.time() if now is None else now
+                alert.remind_at = None
+                self.patients[alert.patient_id].alert = None
+                self.counters['resolved'] += 1
+            return alert
+
+    # Queue
+
+    def next_alert(self, include_acknowledged=False):
+        """Return the most urgent open alert (highest severity, then oldest) without removing it."""
+        alerts = self.open_alerts(1, include_acknowledged)
+        return alerts[0] if alerts else None
+
+    def open_alerts(self, limit=None, include_acknowledged=True):
+        """Return open alerts, most urgent first (highest severity, then oldest)."""
+        with self._lock:
+            self._drop_stale()
+            entries = [entry for entry in self._queue if self._entry_current(entry)
+                       and (include_acknowledged or self.alerts[entry[2]].acknowledged_at is None)]
+            # An alert that went down and back up has two current entries; keep its first
+            entries = sorted(entries) if limit is None else heapq.nsmallest(limit * 2, entries)
+            alerts = list({entry[2]: self.alerts[entry[2]] for entry in entries}.values())
+            return alerts[:limit]
+
+    def patient_alert(self, patient_id):
+        """Return a patient's open Alert, or None."""
+        state = self.patients.get(patient_id)
+        return state.alert if state is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'patients': len(self.patients), 'open_alerts': len(self.alerts),
+                    'pending_timers': len(self._timers)}
+
+    # Internals
+
+    def _notify(self, state, alert, reason, now, notified, dedupe=True):
+        # Only repeats for the same alert are deduplicated: a newly raised alert always goes out
+        level = alert.level
+        last_at, last_alert = state.notified.get(level.name, (None, None))
+        if dedupe and last_alert == alert.id and now - last_at < level.cooldown:
+            self.counters['suppressed'] += 1
+            alert._notified_params = frozenset(alert.params_with_3_points)
+            if alert.remind_at is None:
+                # e.g. escalated again after an acknowledgement: remind once the cooldown is over
+                alert.remind_at = last_at + level.cooldown
+                self._timer(alert.remind_at, alert_id=alert.id)
+            return
+        state.notified[level.name] = now, alert.id
+        alert.reason, alert.notified_at = reason, now
+        alert.notifications += 1
+        alert._notified_params = frozenset(alert.params_with_3_points)
+        alert.remind_at = now + level.repeat_after
+        self._timer(alert.remind_at, alert_id=alert.id)
+        if self.db is not None:
+            try:
+                self.db.log_alert(alert.patient_id, level.name, alert.message, alert.score, now)
+            except Exception as e:
+                print(f"Error recording alert {alert.id}: {e}")
+        self.notify_staff(alert)
+        notified.append(alert)
+
+    def _lower(self, state, now):
+        target = state.pending
+        state.level = target
+        state.pending, state.pending_since = _NOT_PENDING, None
+        alert = state.alert
+        if alert is None:
+            return
+        if target is None:
+            self.alerts.pop(alert.id, None)
+            alert.resolved_at, alert.remind_at = now, None
+            state.alert = None
+            self.counters['resolved'] += 1
+        else:
+            alert.level, alert.updated_at = target, now
+            heapq.heappush(self._queue, (-alert.severity, alert.raised_at, alert.id))
+            if alert.remind_at is not None:
+                alert.remind_at = min(alert.remind_at, now + target.repeat_after)
+                self._timer(alert.remind_at, alert_id=alert.id)
+            self.counters['lowered'] += 1
+
+    def _cancel_pending(self, state):
+        if state.pending is not _NOT_PENDING:
+            state.pending, state.pending_since = _NOT_PENDING, None
+            state.version += 1
+
+    def _timer(self, due, patient_id=None, alert_id=None, version=None):
+        heapq.heappush(self._timers, (due, next(self._seq), patient_id, alert_id, version))
+
+    def _drop_stale(self):
+        # Pop entries for resolved alerts or superseded severities off the top of the heap, and
+        # rebuild it if stale entries have piled up underneath
+        queue = self._queue
+        while queue and not self._entry_current(queue[0]):
+            heapq.heappop(queue)
+        if len(queue) > 2 * len(self.alerts) + 64:
+            self._queue = [entry for entry in queue if self._entry_current(entry)]
+            heapq.heapify(self._queue)
+
+    def _entry_current(self, entry):
+        alert = self.alerts.get(entry[2])
+        return alert is not None and entry[0] == -alert.severity
+
+
+def _score_and_threes(result):
+    if isinstance(result, NEWSResult) or hasattr(result, 'params_with_3_points'):
+        return result.score, tuple(result.params_with_3_points)
+    return result, ()
+
+
+# Example usage
+if __name__ == "__main__":
+    alerts = AlertSystem(hold=600)
+    start = time.time()
+
+    # A patient deteriorating, briefly dipping, then recovering
+    for minute, score in [(0, 2), (5, 5), (10, 7), (12, 6), (14, 7), (20, 4), (40, 1)]:
+        alerts.evaluate("TEST001", score, now=start + minute * 60)
+        alerts.tick(start + minute * 60)
+    alerts.tick(start + 60 * 60)
+    print(alerts.stats())
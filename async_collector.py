@@ -0,0 +1,137 @@
+# async_collector.py
+
+import asyncio
+
+import aiohttp
+
+from fitbit_integration import FITBIT_API_BASE, PATIENT_ENDPOINTS
+from intraday_sync import parse_intraday
+
+# Endpoints whose raw body is parsed into a compact form rather than decoded as JSON
+PAYLOAD_PARSERS = {
+    'heart_rate': parse_intraday,
+}
+
+
+class AsyncDataCollector:
+    """
+    Fetches every endpoint for every patient concurrently over one shared connection pool.
+
+    DataCollector fetches one endpoint after another for one patient, so a ward poll costs
+    patients x endpoints x round trip. Here all requests for the ward are in flight at once,
+    bounded by a total and per-host connection limit, so a cycle costs roughly one round trip.
+
+    Use as an async context manager so the pool is opened once and reused across cycles:
+
+        async with AsyncDataCollector() as collector:
+            async for patient_id, name, data, error in collector.iter_ward(tokens):
+                ...
+
+    Parameters:
+    - max_connections: total open connections in the pool
+    - max_connections_per_host: concurrency limit per host (api.fitbit.com)
+    - timeout: seconds allowed for each request, including connecting
+    - api_base: API root URL
+    - endpoints: dict of name -> path to fetch per patient (defaults to PATIENT_ENDPOINTS)
+    """
+
+    def __init__(self, max_connections=100, max_connections_per_host=50, timeout=10.0,
+                 api_base=FITBIT_API_BASE, endpoints=None):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.api_base = api_base.rstrip('/')
+        self.endpoints = dict(endpoints or PATIENT_ENDPOINTS)
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             limit_per_host=self.max_connections_per_host,
+                                             keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                 raise_for_status=True)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch(self, access_token, path, parser=None):
+        """GET one API path with a patient's bearer token and return the decoded JSON, or parser(raw body)."""
+        headers = {'Authorization': f'Bearer {access_token}'}
+        async with self.session.get(self.api_base + path, headers=headers) as response:
+            if parser is not None:
+                return parser(await response.read())
+            return await response.json()
+
+    async def iter_ward(self, patient_tokens):
+        """
+        Fetch all endpoints for all patients and yield each response as soon as it arrives.
+
+        Parameters:
+        - patient_tokens: dict of patient_id -> access token for that patient's Fitbit account
+
+        Yields:
+        - (patient_id, endpoint name, data, error): data is the decoded JSON (an IntradaySeries
+          for heart_rate), or None with the
+          exception in error if the request failed or timed out
+        """
+        await self.open()
+
+        async def fetch_one(patient_id, name, path, access_token):
+            try:
+                return patient_id, name, await self.fetch(access_token, path, PAYLOAD_PARSERS.get(name)), None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return patient_id, name, None, e
+
+        tasks = [asyncio.ensure_future(fetch_one(patient_id, name, path, access_token))
+                 for patient_id, access_token in patient_tokens.items()
+                 for name, path in self.endpoints.items()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def collect_ward(self, patient_tokens):
+        """
+        Fetch a whole ward and return dict of patient_id -> get_patient_data-style dict.
+
+        Failed endpoints are left as None, with the errors listed under 'errors'.
+        """
+        ward = {patient_id: {'patient_id': patient_id, **dict.fromkeys(self.endpoints), 'errors': {}}
+                for patient_id in patient_tokens}
+        async for patient_id, name, data, error in self.iter_ward(patient_tokens):
+            ward[patient_id][name] = data
+            if error is not None:
+                ward[patient_id]['errors'][name] = error
+        return ward
+
+
+def collect_ward(patient_tokens, **collector_options):
+    """Synchronous helper for schedulers and scripts: fetch a whole ward in one event loop run."""
+    async def run():
+        async with AsyncDataCollector(**collector_options) as collector:
+            return await collector.collect_ward(patient_tokens)
+    return asyncio.run(run())
+
+
+# Example usage
+if __name__ == "__main__":
+    import os
+
+    token = os.getenv('FITBIT_ACCESS_TOKEN')
+    if not token:
+        print("Set FITBIT_ACCESS_TOKEN to fetch data for a test patient.")
+    else:
+        print(collect_ward({'TEST001': token}))
@@ -0,0 +1,354 @@
+# benchmarks.py
+
+"""
+Reproducible benchmarks for the per-tick hot paths of a monitored ward.
+
+Covers NEWS2 scoring on a realistic mix of observations, the HTML/markdown rendering in
+streamlit_ui_utils, intraday parsing, readings ingest into DatabaseManager, and one polling cycle of DataCollector / DataCollectorFitbit against
+an in-process fake Fitbit backend (no network). Results are compared with the stored
+baseline in benchmarks_baseline.json and any benchmark slower than the baseline by more
+than the threshold is reported as a regression (exit status 1). A benchmark with no baseline
+entry also fails, so new or changed benchmarks must have their baseline saved with them.
+
+Usage:
+    python benchmarks.py                      # run and compare with the baseline
+    python benchmarks.py --save-baseline      # run and store the results as the new baseline
+    python benchmarks.py --only scoring --threshold 0.10
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import timeit
+
+import requests
+from requests.adapters import BaseAdapter
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+DEFAULT_THRESHOLD = 0.25
+SEED = 20240501
+TIME_WINDOW = re.compile(r"/time/(\d\d:\d\d)/(\d\d:\d\d)")
+
+BENCHMARKS = {}
+
+
+def benchmark(name, number):
+    """Register a benchmark: setup() returns the callable to time, run `number` times per repeat."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+    return register
+
+
+def realistic_observations(count, seed=SEED):
+    """Seeded vital-sign vectors: mostly stable patients, with a tail of deteriorating ones."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        unwell = rng.random() < 0.15
+        rows.append({
+            "respiration_rate": rng.randint(20, 30) if unwell else rng.randint(12, 20),
+            "SpO2_scale1": rng.randint(88, 95) if unwell else rng.randint(95, 100),
+            "temperature": round(rng.uniform(37.5, 40.0) if unwell else rng.uniform(36.1, 37.5), 1),
+            "pulse": rng.randint(95, 150) if unwell else rng.randint(55, 95),
+            "systolic_bp": rng.choice([None, rng.randint(85, 110) if unwell else rng.randint(110, 160)]),
+            "consciousness": rng.choice(["A", "A", "V"]) if unwell else "A",
+            "on_oxygen": unwell and rng.random() < 0.5,
+        })
+    return rows
+
+
+def heart_rate_intraday_payload(points=1440, seed=SEED):
+    """A full day of 1-minute heart rate in the Fitbit intraday response shape."""
+    rng = random.Random(seed)
+    bpm = 70
+    dataset = []
+    for minute in range(points):
+        bpm = min(160, max(45, bpm + rng.randint(-3, 3)))
+        dataset.append({"time": f"{minute // 60:02d}:{minute % 60:02d}:00", "value": bpm})
+    return {
+        "activities-heart": [{"dateTime": "2024-05-01", "value": {"restingHeartRate": 64}}],
+        "activities-heart-intraday": {"dataset": dataset, "datasetInterval": 1, "datasetType": "minute"},
+    }
+
+
+class FakeFitbitAdapter(BaseAdapter):
+    """
+    requests transport adapter that answers Fitbit API calls in-process with canned JSON.
+
+    Mount it on a requests/OAuth2Session session to take the network out of a benchmark
+    while keeping the full client-side cost (request preparation, auth, JSON decoding).
+    Every response reports an untouched rate-limit window, so the budget never runs out.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+        self.heart = heart_rate_intraday_payload()
+        self.heart_windows = {}
+        steps = json.dumps({"activities-steps": [{"dateTime": "2024-05-01", "value": "4312"}]}).encode()
+        profile = json.dumps({"user": {"encodedId": "FAKE01"}}).encode()
+        self.routes = [("/activities/heart/", self._heart), ("/activities/steps/", lambda url: steps),
+                       ("/profile.json", lambda url: profile)]
+
+    def _heart(self, url):
+        # Honour /time/HH:MM/HH:MM windows like the real intraday endpoint
+        window = TIME_WINDOW.search(url)
+        key = window.groups() if window else None
+        body = self.heart_windows.get(key)
+        if body is None:
+            payload = self.heart
+            if window:
+                start, end = f"{window.group(1)}:00", f"{window.group(2)}:59"
+                dataset = [point for point in self.heart["activities-heart-intraday"]["dataset"]
+                           if start <= point["time"] <= end]
+                payload = {**self.heart, "activities-heart-intraday": {
+                    **self.heart["activities-heart-intraday"], "dataset": dataset}}
+            body = self.heart_windows[key] = json.dumps(payload).encode()
+        return body
+
+    def send(self, request, **kwargs):
+        self.requests += 1
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers["Content-Type"] = "application/json"
+        response.headers.update({"Fitbit-Rate-Limit-Limit": "150", "Fitbit-Rate-Limit-Remaining": "150",
+                                 "Fitbit-Rate-Limit-Reset": "3600"})
+        for fragment, body in self.routes:
+            if fragment in request.url:
+                response.status_code = 200
+                response._content = body(request.url)
+                break
+        else:
+            response.status_code = 404
+            response._content = b'{"errors": [{"errorType": "not_found"}]}'
+        return response
+
+    def close(self):
+        pass
+
+
+@benchmark("scoring.score_news", number=20_000)
+def bench_score_news():
+    from news2_algo import score_news
+    rows = realistic_observations(20_000)
+
+    def run():
+        for row in rows:
+            score_news(**row)
+    return run
+
+
+@benchmark("scoring.calculate_news_score", number=20_000)
+def bench_calculate_news_score():
+    from news2_algo import calculate_news_score
+    rows = realistic_observations(20_000)
+
+    def run():
+        for row in rows:
+            calculate_news_score(**row)
+    return run
+
+
+@benchmark("scoring.cached_steady_ward", number=20_000)
+def bench_cached_scoring():
+    from news2_cache import NEWSScoreCache
+    from streamlit_app_fe import NEWS_DATA
+    cache = NEWSScoreCache(maxsize=1024)
+    rows = (NEWS_DATA * (20_000 // len(NEWS_DATA) + 1))[:20_000]
+
+    def run():
+        for row in rows:
+            cache.score(**row)
+    return run
+
+
+@benchmark("scoring.batch_1e5", number=100_000)
+def bench_batch_scoring():
+    from news2_algo import calculate_news_scores_batch
+    rows = realistic_observations(100_000)
+    columns = [[row[name] for row in rows] for name in
+               ("respiration_rate", "SpO2_scale1", "temperature", "pulse", "systolic_bp", "consciousness")]
+
+    def run():
+        calculate_news_scores_batch(*columns)
+    return run
+
+
+@benchmark("render.display_news_score_and_suggestions", number=200)
+def bench_display():
+    from news2_algo import score_news
+    from streamlit_ui_utils import display_news_score_and_suggestions
+    rows = realistic_observations(200)
+    results = [(score_news(**row), row) for row in rows]
+
+    def run():
+        for result, row in results:
+            display_news_score_and_suggestions(result, **row, update_frequency=5)
+    return run
+
+
+@benchmark("render.render_devices_120", number=120)
+def bench_render_devices():
+    from streamlit_ui_utils import render_devices
+
+    def run():
+        render_devices(device_count=120)
+    return run
+
+
+@benchmark("parse.heart_rate_intraday_day", number=200)
+def bench_parse_intraday():
+    from intraday_sync import parse_intraday
+    body = json.dumps(heart_rate_intraday_payload()).encode()
+
+    def run():
+        for _ in range(200):
+            parse_intraday(body)
+    return run
+
+
+@benchmark("storage.save_series_day", number=1440 * 20)
+def bench_save_series():
+    import tempfile
+    import numpy as np
+    from database_manager import DatabaseManager
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+    timestamps = np.arange(1440) * 60 + 1714521600
+    values = np.random.default_rng(SEED).integers(50, 120, 1440)
+
+    def run():
+        for patient in range(20):
+            db.save_series(f"P{patient:05d}", "heart_rate", timestamps, values)
+    return run
+
+
+@benchmark("collect.DataCollector.get_patient_data", number=50)
+def bench_data_collector():
+    from data_collector import DataCollector
+    from fitbit_integration import get_session
+    collector = DataCollector()
+    collector.token = {"access_token": "fake", "token_type": "Bearer"}
+    get_session().mount("https://", FakeFitbitAdapter())
+
+    def run():
+        for patient in range(50):
+            collector.get_patient_data(f"P{patient:03d}")
+    return run
+
+
+@benchmark("collect.DataCollectorFitbit.get_patient_data", number=50)
+def bench_data_collector_fitbit():
+    from fitbit import Fitbit
+    from python_fitbit import DataCollectorFitbit
+    collector = DataCollectorFitbit()
+    collector.client = Fitbit("client", "secret", oauth2=True, access_token="fake", refresh_token="fake",
+                              expires_at=time.time() + 86400)
+    collector.client.client.session.mount("https://", FakeFitbitAdapter())
+    collector.client.client.session.hooks['response'].append(collector._observe_rate_limit)
+
+    def run():
+        for patient in range(50):
+            collector.get_patient_data(f"P{patient:03d}")
+    return run
+
+
+def run_benchmarks(names=None, repeat=5):
+    """
+    Run the selected benchmarks (all by default).
+
+    Returns:
+    - Dict of name -> {'per_op_us': median microseconds per operation, 'min_per_op_us': best repeat}
+    """
+    results = {}
+    for name, (setup, number) in BENCHMARKS.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        run = setup()
+        run()  # warm up imports, caches and connection pools
+        timings = [seconds / number * 1e6 for seconds in timeit.repeat(run, number=1, repeat=repeat)]
+        results[name] = {"per_op_us": round(statistics.median(timings), 3), "min_per_op_us": round(min(timings), 3)}
+        print(f"{name:50s} {results[name]['per_op_us']:12.3f} us/op (best {results[name]['min_per_op_us']:.3f})")
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results with the baseline.
+
+    Returns:
+    - (regressions, missing): regressions is a list of (name, baseline, current, ratio) for
+      benchmarks slower than baseline * (1 + threshold); missing lists the benchmarks with no
+      baseline entry, which cannot be checked and count as failures until one is saved
+    """
+    regressions, missing = [], []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            print(f"{name:50s} {'(none)':>12s} -> {result['per_op_us']:12.3f} us/op  NO BASELINE")
+            missing.append(name)
+            continue
+        ratio = result["per_op_us"] / reference["per_op_us"]
+        marker = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:50s} {reference['per_op_us']:12.3f} -> {result['per_op_us']:12.3f} us/op  x{ratio:.2f} {marker}")
+        if marker:
+            regressions.append((name, reference["per_op_us"], result["per_op_us"], ratio))
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NEWS scoring, rendering and data collection.")
+    parser.add_argument("--only", nargs="*", help="Benchmark name prefixes to run (e.g. scoring render)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repeats per benchmark (median is reported)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown versus baseline before failing (default 0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    # Streamlit warns on every call made outside `streamlit run`; the rendering cost is what we measure.
+    # Its loggers are configured on import, so quieten them afterwards.
+    import streamlit  # noqa: F401
+    for logger_name in list(logging.root.manager.loggerDict):
+        if logger_name.startswith("streamlit"):
+            logging.getLogger(logger_name).setLevel(logging.ERROR)
+    random.seed(SEED)
+
+    results = run_benchmarks(args.only, args.repeat)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline first.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print()
+    regressions, missing = compare_with_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+    if missing:
+        print(f"{len(missing)} benchmark(s) have no baseline ({', '.join(missing)}); "
+              f"save one with --save-baseline --only <name> when adding or changing a benchmark")
+    return 1 if regressions or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
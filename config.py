@@ -1,3 +1,52 @@
 # This file will store configuration variables, API keys, and other settings for the application.
 
+import os
 
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Fitbit Web API and OAuth2 endpoints. Point these at a local stand-in (see fake_fitbit_server.py)
+# to load-test the collectors without touching the real API.
+FITBIT_API_BASE = os.getenv('FITBIT_API_BASE', 'https://api.fitbit.com').rstrip('/')
+FITBIT_AUTHORIZE_URL = os.getenv('FITBIT_AUTHORIZE_URL', 'https://www.fitbit.com/oauth2/authorize')
+FITBIT_TOKEN_URL = os.getenv('FITBIT_TOKEN_URL', f'{FITBIT_API_BASE}/oauth2/token')
+
+# Cap on requests per hour across all users (see rate_limiter.py); Fitbit's own limit is per user,
+# so this is unset (no app-wide cap) unless the app has been given a lower quota
+FITBIT_APP_REQUESTS_PER_HOUR = int(os.getenv('FITBIT_APP_REQUESTS_PER_HOUR', '0')) or None
+
+# SQLite file holding each user's OAuth tokens so they survive restarts (see token_store.py)
+TOKEN_DB_PATH = os.getenv('FITBIT_TOKEN_DB', 'fitbit_tokens.sqlite3')
+
+# Refresh access tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv('FITBIT_TOKEN_REFRESH_MARGIN', '300'))
+
+# Fitbit subscriptions: subscriber id and verification code from the app's subscriber settings,
+# and where the local webhook receiver listens (see webhook_receiver.py)
+FITBIT_SUBSCRIBER_ID = os.getenv('FITBIT_SUBSCRIBER_ID', '1')
+FITBIT_SUBSCRIBER_VERIFICATION_CODE = os.getenv('FITBIT_SUBSCRIBER_VERIFICATION_CODE')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8502'))
+
+# On-disk cache of daily summary responses (see response_cache.py)
+RESPONSE_CACHE_PATH = os.getenv('FITBIT_RESPONSE_CACHE', 'fitbit_responses.sqlite3')
+
+# Patient readings, NEWS scores and alert history (see database_manager.py)
+DATABASE_PATH = os.getenv('NEWS_DATABASE', 'continews.sqlite3')
+
+# Memory-mapped ring buffers holding each device's latest vitals (see vitals_ring.py)
+VITALS_RING_DIR = os.getenv('VITALS_RING_DIR', 'vitals_ring')
+# One slot more than 24 hours of 1-minute readings: readers never see the slot being written next
+VITALS_RING_CAPACITY = int(os.getenv('VITALS_RING_CAPACITY', str(24 * 60 + 1)))
+
+# Alert notifications (see notification_dispatcher.py). ALERT_RECIPIENTS is a comma-separated
+# list of channel:address:minimum level, e.g. "email:ward7@example.nhs.uk:medium,sms:+447700900123:high"
+ALERT_SMTP_HOST = os.getenv('ALERT_SMTP_HOST', 'localhost')
+ALERT_SMTP_PORT = int(os.getenv('ALERT_SMTP_PORT', '25'))
+ALERT_EMAIL_FROM = os.getenv('ALERT_EMAIL_FROM', 'news2-alerts@localhost')
+ALERT_RECIPIENTS = os.getenv('ALERT_RECIPIENTS', '')
+
+# Local endpoint serving scheduler metrics in Prometheus text format (see scheduler_metrics.py)
+SCHEDULER_METRICS_HOST = os.getenv('SCHEDULER_METRICS_HOST', '127.0.0.1')
+SCHEDULER_METRICS_PORT = int(os.getenv('SCHEDULER_METRICS_PORT', '9108'))
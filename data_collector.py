@@ -7,6 +7,12 @@ from dotenv import load_dotenv
 import warnings
 import streamlit as st
 
+from config import FITBIT_AUTHORIZE_URL, FITBIT_TOKEN_URL
+from fitbit_integration import PATIENT_ENDPOINTS, FitbitClient
+from intraday_sync import INTRADAY_SERIES, IntradaySync, intraday_path, parse_intraday
+from rate_limiter import RateLimited, get_rate_limit_budget
+from token_store import TokenRefreshError, get_token_store
+
 # Disable SSL-related warnings
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 
@@ -14,24 +20,32 @@ warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 load_dotenv()  # Load environment variables from .env file
 
 class DataCollector:
-    def __init__(self):
+    def __init__(self, token_store=None):
         self.client_id = os.getenv('FITBIT_CLIENT_ID')
         self.client_secret = os.getenv('FITBIT_CLIENT_SECRET')
         self.redirect_uri = 'https://nhs-continews.streamlit.app/'
         self.token = None
+        self.user_id = None
+        self.token_store = token_store
+        self.intraday = IntradaySync()
         self.oauth = OAuth2Session(self.client_id, redirect_uri=self.redirect_uri,
                                    scope=["activity", "heartrate", "sleep", "profile"])
 
     def authorize(self):
         try:
-            authorization_url, _ = self.oauth.authorization_url('https://www.fitbit.com/oauth2/authorize')
+            authorization_url, _ = self.oauth.authorization_url(FITBIT_AUTHORIZE_URL)
             st.write(f'Please visit this URL to authorize the application: {authorization_url}')
             authorization_response = st.text_input('Enter the full callback URL:')
             if authorization_response:
-                self.token = self.oauth.fetch_token('https://api.fitbit.com/oauth2/token',
+                self.token = self.oauth.fetch_token(FITBIT_TOKEN_URL,
                                                     authorization_response=authorization_response,
                                                     client_secret=self.client_secret
                                                     )
+                # Keep the token in the shared store so it survives restarts and is refreshed ahead of expiry
+                self.user_id = self.token.get('user_id', self.user_id)
+                if self.token_store is None:
+                    self.token_store = get_token_store()
+                self.token = self.token_store.save(self.user_id, self.token)
                 return self.token
             else:
                 st.warning("Authorization response not provided.")
@@ -40,30 +54,46 @@ class DataCollector:
             st.error(f"Error during authorization: {e}")
             return None
     
-    def get_patient_data(self, patient_id):
+    def get_patient_data(self, patient_id, band=None):
+        # band is the patient's NEWS band: amber and red patients may use the reserved part of the
+        # rate-limit budget. RateLimited is raised rather than reported, so a PriorityFetchQueue
+        # running this fetch keeps it queued for its next cycle.
         if not self.token:
             st.error("You need to authorize first. Call authorize() method.")
             return None
 
         try:
-            # Fetch heart rate data
-            heart_rate_url = 'https://api.fitbit.com/1/user/-/activities/heart/date/today/1d/1min.json'
-            heart_rate_response = self.oauth.get(heart_rate_url)
-            heart_rate_data = heart_rate_response.json()
+            access_token = self.token['access_token']
+            if self.token_store is not None:
+                access_token = self.token_store.get_access_token(self.user_id)
+            client = FitbitClient(access_token, user_id=self.user_id, rate_limits=get_rate_limit_budget(), band=band)
+
+            # Fetch the heart rate readings since the last sync, and steps, in parallel over the shared session
+            paths = {'steps': PATIENT_ENDPOINTS['steps']}
+            windows = self.intraday.windows(patient_id, 'heart_rate')
+            for day, start, end in windows:
+                paths[day] = intraday_path(INTRADAY_SERIES['heart_rate'], day, start, end)
+            responses = client.fetch_many(paths)
+            for response in responses.values():
+                if isinstance(response, Exception):
+                    raise response
+                response.raise_for_status()
 
-            # Fetch steps data
-            steps_url = 'https://api.fitbit.com/1/user/-/activities/steps/date/today/1d.json'
-            steps_response = self.oauth.get(steps_url)
-            steps_data = steps_response.json()
+            # Parse the new heart rate points straight into typed arrays and merge them into the local history
+            for day, _, _ in windows:
+                self.intraday.merge(patient_id, 'heart_rate', day, parse_intraday(responses[day].content))
 
-            # Process and return the data
+            # Process and return the data; heart_rate is the newest day's IntradaySeries
             return {
                 'patient_id': patient_id,
-                'heart_rate': heart_rate_data,
-                'steps': steps_data,
+                'date': day,
+                'heart_rate': self.intraday.series(patient_id, 'heart_rate', day),
+                'steps': responses['steps'].json(),
             }
 
-        except requests.exceptions.RequestException as e:
+        except RateLimited:
+            raise
+        except (requests.exceptions.RequestException, TokenRefreshError) as e:
             st.error(f"Error fetching data: {e}")
             return None
         
@@ -1,25 +1,601 @@
 # database_manager.py
 
+import math
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+import numpy as np
+
+from config import DATABASE_PATH
+from intraday_sync import IntradaySeries, parse_intraday
+from news2_algo import CONSCIOUSNESS_POINTS
+
+# One parameter's history for a patient: epoch seconds and values, in time order
+Series = namedtuple('Series', ['timestamps', 'values'])
+
+# The same from a rollup tier: bucket start times, with values holding each bucket's mean
+RollupSeries = namedtuple('RollupSeries', ['timestamps', 'values', 'min', 'max', 'last', 'count'])
+
+# Storage tiers in seconds per bucket: raw 1-minute readings, then 5-minute, hourly and daily
+# rollups (UTC buckets). Each rollup tier is kept up to date as readings are saved.
+RAW_RESOLUTION = 60
+ROLLUP_RESOLUTIONS = (300, 3600, 86400)
+
+# Seconds each tier is kept for (None: forever). Raw data expires first; rollups outlive it.
+DEFAULT_RETENTION = {
+    RAW_RESOLUTION: 14 * 86400,
+    300: 90 * 86400,
+    3600: 2 * 365 * 86400,
+    86400: None,
+}
+_EXPIRY_INTERVAL = 3600
+
+# Observation readings stored per patient, as in NEWS_DATA; consciousness is stored as its AVPU code.
+# Only the levels score_news accepts are stored, so every stored reading can be rescored; code 1
+# ('C', new confusion) is left unused so existing V/P/U rows keep their meaning.
+OBSERVATION_PARAMETERS = ('respiration_rate', 'SpO2', 'temperature', 'pulse', 'systolic_bp', 'consciousness')
+CONSCIOUSNESS_CODES = {'A': 0, 'V': 2, 'P': 3, 'U': 4}
+assert set(CONSCIOUSNESS_CODES) == set(CONSCIOUSNESS_POINTS)
+_CONSCIOUSNESS_BY_CODE = {code: level for level, code in CONSCIOUSNESS_CODES.items()}
+_OBSERVATION_ALIASES = {'SpO2_scale1': 'SpO2'}
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS patients (
+        id INTEGER PRIMARY KEY,
+        patient_id TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS parameters (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS readings (
+        patient INTEGER NOT NULL,
+        parameter INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        value REAL NOT NULL,
+        PRIMARY KEY (patient, parameter, ts)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS news_scores (
+        patient INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        score INTEGER,
+        band TEXT,
+        params_with_3_points TEXT NOT NULL,
+        PRIMARY KEY (patient, ts)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY,
+        patient INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        level TEXT NOT NULL,
+        score INTEGER,
+        message TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS alerts_patient_ts ON alerts (patient, ts);
+    CREATE INDEX IF NOT EXISTS alerts_ts ON alerts (ts);
+    CREATE TABLE IF NOT EXISTS rollups (
+        patient INTEGER NOT NULL,
+        parameter INTEGER NOT NULL,
+        resolution INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        min REAL NOT NULL,
+        max REAL NOT NULL,
+        sum REAL NOT NULL,
+        last REAL NOT NULL,
+        last_ts INTEGER NOT NULL,
+        PRIMARY KEY (patient, parameter, resolution, bucket)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS news_rollups (
+        patient INTEGER NOT NULL,
+        resolution INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        max_score INTEGER NOT NULL,
+        PRIMARY KEY (patient, resolution, bucket)
+    ) WITHOUT ROWID;
+    CREATE TEMP TABLE IF NOT EXISTS rollup_scope (
+        patient INTEGER NOT NULL,
+        parameter INTEGER NOT NULL,
+        lo INTEGER NOT NULL,
+        hi INTEGER NOT NULL
+    );
+'''
+
+_INSERT_READING = 'INSERT OR REPLACE INTO readings (patient, parameter, ts, value) VALUES (?, ?, ?, ?)'
+# Retention deletes, one series at a time so each is a primary-key range seek
+_EXPIRE_READINGS = 'DELETE FROM readings WHERE patient = ? AND parameter = ? AND ts < ?'
+_EXPIRE_NEWS_SCORES = 'DELETE FROM news_scores WHERE patient = ? AND ts < ?'
+_EXPIRE_ROLLUPS = 'DELETE FROM rollups WHERE patient = ? AND parameter = ? AND resolution = ? AND bucket < ?'
+_EXPIRE_NEWS_ROLLUPS = 'DELETE FROM news_rollups WHERE patient = ? AND resolution = ? AND bucket < ?'
+_SELECT_READINGS = 'SELECT ts, value FROM readings WHERE patient = ? AND parameter = ? AND ts >= ? AND ts < ? ORDER BY ts'
+_SELECT_PATIENT_PARAMETERS = '''
+    SELECT parameters.name FROM parameters
+    WHERE EXISTS (SELECT 1 FROM readings WHERE patient = :patient AND parameter = parameters.id)
+       OR EXISTS (SELECT 1 FROM rollups WHERE patient = :patient AND parameter = parameters.id)
+    ORDER BY parameters.id'''
+_SELECT_ROLLUPS = ('SELECT bucket, sum / count, min, max, last, count FROM rollups '
+                   'WHERE patient = ? AND parameter = ? AND resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket')
+
+# Recompute the rollup buckets touched by a write (listed in rollup_scope) from the tier below.
+# Buckets are rebuilt rather than incremented so re-saving a reading never double-counts it;
+# 'last' is looked up by primary key from the row (or source bucket) holding the latest ts.
+_REBUILD_FROM_READINGS = '''
+    INSERT OR REPLACE INTO rollups (patient, parameter, resolution, bucket, count, min, max, sum, last, last_ts)
+    SELECT patient, parameter, :resolution, bucket, count, min, max, sum,
+           (SELECT value FROM readings
+            WHERE patient = g.patient AND parameter = g.parameter AND ts = g.last_ts),
+           last_ts
+    FROM (SELECT r.patient, r.parameter, r.ts - r.ts % :resolution AS bucket, count(*) AS count,
+                 min(r.value) AS min, max(r.value) AS max, sum(r.value) AS sum, max(r.ts) AS last_ts
+          FROM rollup_scope AS s JOIN readings AS r
+            ON r.patient = s.patient AND r.parameter = s.parameter AND r.ts >= s.lo AND r.ts < s.hi
+          GROUP BY r.patient, r.parameter, bucket) AS g'''
+_REBUILD_FROM_ROLLUPS = '''
+    INSERT OR REPLACE INTO rollups (patient, parameter, resolution, bucket, count, min, max, sum, last, last_ts)
+    SELECT patient, parameter, :resolution, bucket, count, min, max, sum,
+           (SELECT last FROM rollups
+            WHERE patient = g.patient AND parameter = g.parameter AND resolution = :source
+              AND bucket = g.last_ts - g.last_ts % :source),
+           last_ts
+    FROM (SELECT r.patient, r.parameter, r.bucket - r.bucket % :resolution AS bucket, sum(r.count) AS count,
+                 min(r.min) AS min, max(r.max) AS max, sum(r.sum) AS sum, max(r.last_ts) AS last_ts
+          FROM rollup_scope AS s JOIN rollups AS r
+            ON r.patient = s.patient AND r.parameter = s.parameter AND r.resolution = :source
+           AND r.bucket >= s.lo AND r.bucket < s.hi
+          GROUP BY r.patient, r.parameter, r.bucket - r.bucket % :resolution) AS g'''
+_UPSERT_NEWS_ROLLUP = '''
+    INSERT INTO news_rollups (patient, resolution, bucket, max_score) VALUES (?, ?, ?, ?)
+    ON CONFLICT (patient, resolution, bucket) DO UPDATE SET max_score = max(max_score, excluded.max_score)'''
+_SELECT_NEWS_ROLLUPS = ('SELECT bucket, max_score FROM news_rollups '
+                        'WHERE patient = ? AND resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket')
+_INSERT_NEWS_SCORE = ('INSERT OR REPLACE INTO news_scores (patient, ts, score, band, params_with_3_points) '
+                      'VALUES (?, ?, ?, ?, ?)')
+_SELECT_NEWS_SCORES = ('SELECT ts, score, band, params_with_3_points FROM news_scores '
+                       'WHERE patient = ? AND ts >= ? AND ts < ? ORDER BY ts')
+_INSERT_ALERT = 'INSERT INTO alerts (patient, ts, level, score, message) VALUES (?, ?, ?, ?, ?)'
+_SELECT_ALERTS = '''
+    SELECT alerts.id, patients.patient_id, alerts.ts, alerts.level, alerts.score, alerts.message
+    FROM alerts JOIN patients ON patients.id = alerts.patient
+    WHERE alerts.ts >= ? AND alerts.ts < ? {patient_filter}
+    ORDER BY alerts.ts'''
+
+_FOREVER = 2 ** 62
+
+
 class DatabaseManager:
     """
     This class manages the database operations for storing and retrieving
     patient data, NEWS scores, and alert histories.
-    
-    TODO:
-    - Set up database connection (consider using SQLAlchemy for ORM)
-    - Implement CRUD operations for patient data
-    - Implement methods for storing and retrieving NEWS scores
-    - Implement logging of alert histories
+
+    Data lives in an embedded SQLite file in WAL mode, so the dashboard can read while the
+    collectors write. Readings go into one narrow table keyed on (patient, parameter, ts)
+    without a rowid, so each patient's series is stored in time order and a range query is a
+    single index seek. Patient and parameter names are stored once and referenced by integer
+    id. Inserts are batched with executemany in one transaction; re-saving a reading for the
+    same time replaces it, so overlapping fetches never duplicate.
+
+    Every write also rebuilds the 5-minute, hourly and daily rollup buckets it touched
+    (min/max/mean/last per parameter, and the highest NEWS score), in the same transaction.
+    History queries for long ranges read the coarsest tier that still meets the requested
+    resolution, and expire() drops raw readings after their retention period while the
+    rollups are kept for longer. Expiry is kept off the write path: run it periodically,
+    e.g. from the scheduler with schedule_expiry().
+
+    One connection writes (serialised by a lock); every reading thread gets its own
+    connection so reads never wait on a write.
+
+    Parameters:
+    - path: SQLite database file (default: config.DATABASE_PATH)
+    - retention: dict of resolution -> seconds to keep (None: forever), as DEFAULT_RETENTION
     """
-    
-    def __init__(self):
-        # Initialize database connection
-        pass
-    
+
+    def __init__(self, path=DATABASE_PATH, retention=None):
+        self.path = path
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._patient_ids = {}
+        self._parameter_ids = {}
+        self._writer = self._open()
+        self._writer.execute('PRAGMA journal_mode=WAL')
+        self._writer.executescript(SCHEMA)
+        self._parameter_ids.update(self._writer.execute('SELECT name, id FROM parameters'))
+
+    def _open(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False,
+                             cached_statements=64)
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _reader(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self._open()
+        return db
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # Ids (called with the write lock held)
+
+    def _patient(self, patient_id):
+        id_ = self._patient_ids.get(patient_id)
+        if id_ is None:
+            self._writer.execute('INSERT OR IGNORE INTO patients (patient_id) VALUES (?)', (patient_id,))
+            id_ = self._writer.execute('SELECT id FROM patients WHERE patient_id = ?', (patient_id,)).fetchone()[0]
+            self._patient_ids[patient_id] = id_
+        return id_
+
+    def _parameter(self, name):
+        id_ = self._parameter_ids.get(name)
+        if id_ is None:
+            self._writer.execute('INSERT OR IGNORE INTO parameters (name) VALUES (?)', (name,))
+            id_ = self._writer.execute('SELECT id FROM parameters WHERE name = ?', (name,)).fetchone()[0]
+            self._parameter_ids[name] = id_
+        return id_
+
+    def _lookup_patient(self, patient_id):
+        id_ = self._patient_ids.get(patient_id)
+        if id_ is None:
+            row = self._reader().execute('SELECT id FROM patients WHERE patient_id = ?', (patient_id,)).fetchone()
+            id_ = row[0] if row else None
+        return id_
+
+    def _rollback(self):
+        # Ids created in the failed transaction are gone, so forget the cached ones
+        self._writer.execute('ROLLBACK')
+        self._patient_ids.clear()
+        self._parameter_ids = dict(self._writer.execute('SELECT name, id FROM parameters'))
+
+    # Writes
+
+    def save_readings(self, rows):
+        """
+        Store many readings in one transaction.
+
+        Parameters:
+        - rows: iterable of (patient_id, parameter, timestamp, value); timestamp in epoch seconds
+
+        Returns:
+        - Number of rows written
+        """
+        return self.save_batch(readings=rows)
+
+    def save_batch(self, readings=(), news_scores=()):
+        """
+        Store readings and NEWS scores together in one transaction (used by write_behind).
+
+        Parameters:
+        - readings: iterable of (patient_id, parameter, timestamp, value)
+        - news_scores: iterable of (patient_id, timestamp, NEWSResult)
+
+        Returns:
+        - Number of readings written
+        """
+        with self._write_lock:
+            self._writer.execute('BEGIN')
+            try:
+                written = self._insert_readings(readings)
+                for patient_id, timestamp, result in news_scores:
+                    self._insert_news_score(self._patient(patient_id), int(timestamp), result)
+                self._writer.execute('COMMIT')
+            except BaseException:
+                self._rollback()
+                raise
+        return written
+
+    def _insert_readings(self, rows):
+        rows = [(self._patient(patient_id), self._parameter(parameter), int(timestamp), float(value))
+                for patient_id, parameter, timestamp, value in rows]
+        if not rows:
+            return 0
+        self._writer.executemany(_INSERT_READING, rows)
+        spans = {}
+        for patient, parameter, timestamp, _ in rows:
+            span = spans.get((patient, parameter))
+            if span is None:
+                spans[(patient, parameter)] = [timestamp, timestamp]
+            elif timestamp < span[0]:
+                span[0] = timestamp
+            elif timestamp > span[1]:
+                span[1] = timestamp
+        self._rebuild_rollups((patient, parameter, lo, hi) for (patient, parameter), (lo, hi) in spans.items())
+        return len(rows)
+
+    def _insert_news_score(self, patient, timestamp, result):
+        self._writer.execute(_INSERT_NEWS_SCORE, (patient, timestamp, result.score, result.band,
+                                                  ','.join(result.params_with_3_points)))
+        if result.score is not None:
+            self._writer.executemany(_UPSERT_NEWS_ROLLUP, [
+                (patient, resolution, timestamp - timestamp % resolution, result.score)
+                for resolution in ROLLUP_RESOLUTIONS])
+
+    def save_series(self, patient_id, parameter, timestamps, values):
+        """Store one parameter's readings for a patient from parallel sequences (e.g. numpy arrays)."""
+        with self._write_lock:
+            timestamps = np.asarray(timestamps, dtype=np.int64)
+            if not len(timestamps):
+                return 0
+            self._writer.execute('BEGIN')
+            try:
+                patient, parameter = self._patient(patient_id), self._parameter(parameter)
+                cursor = self._writer.executemany(_INSERT_READING, zip(
+                    (patient,) * len(timestamps), (parameter,) * len(timestamps),
+                    timestamps.tolist(), np.asarray(values, dtype=np.float64).tolist()))
+                self._rebuild_rollups([(patient, parameter, int(timestamps.min()), int(timestamps.max()))])
+                self._writer.execute('COMMIT')
+            except BaseException:
+                self._rollback()
+                raise
+        return cursor.rowcount
+
     def save_patient_data(self, patient_id, data):
-        # Save patient data to the database
-        pass
-    
-    def get_patient_history(self, patient_id):
-        # Retrieve patient history from the database
-        pass
\ No newline at end of file
+        """
+        Save patient data to the database.
+
+        Parameters:
+        - data: a get_patient_data result (heart_rate as an IntradaySeries for data['date'],
+          steps as the Fitbit time-series JSON), or an observation dict like the NEWS_DATA
+          rows, optionally with a 'timestamp' in epoch seconds (default: now)
+
+        Returns:
+        - Number of readings written
+        """
+        return self.save_readings(patient_data_rows(patient_id, data))
+
+    def save_news_score(self, patient_id, result, timestamp=None):
+        """Store a NEWSResult (or anything with score, band and params_with_3_points) for a patient."""
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        self.save_batch(news_scores=[(patient_id, timestamp, result)])
+
+    def log_alert(self, patient_id, level, message, score=None, timestamp=None):
+        """Record an alert sent for a patient and return its id."""
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        with self._write_lock:
+            cursor = self._writer.execute(_INSERT_ALERT, (self._patient(patient_id), timestamp, level, score, message))
+        return cursor.lastrowid
+
+    def _rebuild_rollups(self, spans):
+        # spans: (patient, parameter, first ts, last ts) written in this transaction. Each tier is
+        # rebuilt over whole buckets of its own size from the tier below it.
+        spans = list(spans)
+        source = None
+        for resolution in ROLLUP_RESOLUTIONS:
+            self._writer.execute('DELETE FROM rollup_scope')
+            self._writer.executemany('INSERT INTO rollup_scope (patient, parameter, lo, hi) VALUES (?, ?, ?, ?)', [
+                (patient, parameter, lo - lo % resolution, hi - hi % resolution + resolution)
+                for patient, parameter, lo, hi in spans])
+            if source is None:
+                self._writer.execute(_REBUILD_FROM_READINGS, {'resolution': resolution})
+            else:
+                self._writer.execute(_REBUILD_FROM_ROLLUPS, {'resolution': resolution, 'source': source})
+            source = resolution
+
+    def expire(self, now=None):
+        """
+        Apply the retention policy: delete raw readings, NEWS scores and rollup buckets older
+        than their tier's retention period.
+
+        The primary keys lead with the patient, so rows are deleted one patient (and parameter)
+        at a time, each as an index range seek in its own short transaction; writers only ever
+        wait for one series. Not called by the writes themselves; see schedule_expiry().
+
+        Returns:
+        - Number of rows deleted
+        """
+        now = int(time.time() if now is None else now)
+        patients = [row[0] for row in self._reader().execute('SELECT id FROM patients')]
+        parameters = [row[0] for row in self._reader().execute('SELECT id FROM parameters')]
+        deleted = 0
+        for patient in patients:
+            keep = self.retention.get(RAW_RESOLUTION)
+            if keep is not None:
+                for parameter in parameters:
+                    deleted += self._delete(_EXPIRE_READINGS, (patient, parameter, now - keep))
+                deleted += self._delete(_EXPIRE_NEWS_SCORES, (patient, now - keep))
+            for resolution in ROLLUP_RESOLUTIONS:
+                keep = self.retention.get(resolution)
+                if keep is not None:
+                    for parameter in parameters:
+                        deleted += self._delete(_EXPIRE_ROLLUPS, (patient, parameter, resolution, now - keep))
+                    deleted += self._delete(_EXPIRE_NEWS_ROLLUPS, (patient, resolution, now - keep))
+        return deleted
+
+    def _delete(self, statement, params):
+        with self._write_lock:
+            return self._writer.execute(statement, params).rowcount
+
+    def schedule_expiry(self, scheduler, interval=_EXPIRY_INTERVAL):
+        """
+        Run expire() every `interval` seconds on a Scheduler (see scheduler.py), starting now.
+
+        Returns:
+        - the Job
+        """
+        return scheduler.add_job('database:expire', self.expire, interval, job_class='maintenance')
+
+    def resolution_for(self, resolution, start=None, now=None):
+        """
+        Pick the storage tier for a query: the coarsest tier no coarser than `resolution`
+        seconds, moved to a coarser tier if the chosen one has already expired at `start`.
+
+        Returns:
+        - RAW_RESOLUTION or one of ROLLUP_RESOLUTIONS
+        """
+        tiers = (RAW_RESOLUTION,) + ROLLUP_RESOLUTIONS
+        chosen = max([tier for tier in tiers if tier <= (resolution or 0)], default=RAW_RESOLUTION)
+        if start is not None:
+            now = time.time() if now is None else now
+            for tier in tiers[tiers.index(chosen):]:
+                keep = self.retention.get(tier)
+                chosen = tier
+                if keep is None or start >= now - keep:
+                    break
+        return chosen
+
+    # Reads
+
+    def get_patient_history(self, patient_id, parameters=None, start=None, end=None, resolution=None,
+                            max_points=None):
+        """
+        Retrieve patient history from the database.
+
+        Parameters:
+        - parameters: parameter names to return (default: every parameter held for the patient)
+        - start / end: epoch-second range, start inclusive and end exclusive (default: all time)
+        - resolution: seconds between points the caller needs; the coarsest tier that meets it is
+          read (default: raw readings)
+        - max_points: alternatively, roughly how many points per parameter the caller can use
+          (e.g. a chart's width); needs start
+
+        Returns:
+        - dict of parameter -> Series of numpy arrays (int64 epoch seconds, float64 values) for
+          raw readings, or RollupSeries (bucket starts, means, min, max, last, count) when a
+          rollup tier is read; empty if the patient is unknown
+        """
+        patient = self._lookup_patient(patient_id)
+        if patient is None:
+            return {}
+        db = self._reader()
+        if parameters is None:
+            parameters = [name for name, in db.execute(_SELECT_PATIENT_PARAMETERS, {'patient': patient})]
+        elif isinstance(parameters, str):
+            parameters = [parameters]
+        if max_points and start is not None:
+            resolution = ((time.time() if end is None else end) - start) / max_points
+        tier = self.resolution_for(resolution, start)
+        start = 0 if start is None else int(start)
+        end = _FOREVER if end is None else int(end)
+
+        history = {}
+        for name in parameters:
+            parameter = self._parameter_ids.get(name)
+            if parameter is None:
+                row = db.execute('SELECT id FROM parameters WHERE name = ?', (name,)).fetchone()
+                parameter = row[0] if row else None
+            if tier == RAW_RESOLUTION:
+                rows = db.execute(_SELECT_READINGS, (patient, parameter, start, end)).fetchall() if parameter else []
+                history[name] = Series(np.fromiter((row[0] for row in rows), np.int64, len(rows)),
+                                       np.fromiter((row[1] for row in rows), np.float64, len(rows)))
+                continue
+            rows = db.execute(_SELECT_ROLLUPS, (patient, parameter, tier, start - start % tier, end)).fetchall() \
+                if parameter else []
+            columns = list(zip(*rows)) or [()] * 6
+            history[name] = RollupSeries(np.array(columns[0], dtype=np.int64),
+                                         *(np.array(column, dtype=np.float64) for column in columns[1:5]),
+                                         np.array(columns[5], dtype=np.int64))
+        return history
+
+    def get_news_scores(self, patient_id, start=None, end=None):
+        """Return a patient's stored NEWS scores in time order as dicts with ts, score, band and params_with_3_points."""
+        patient = self._lookup_patient(patient_id)
+        if patient is None:
+            return []
+        rows = self._reader().execute(_SELECT_NEWS_SCORES, (patient, 0 if start is None else int(start),
+                                                            _FOREVER if end is None else int(end)))
+        return [{'ts': ts, 'score': score, 'band': band,
+                 'params_with_3_points': tuple(params.split(',')) if params else ()}
+                for ts, score, band, params in rows]
+
+    def get_news_history(self, patient_id, start=None, end=None, resolution=None, max_points=None):
+        """
+        Return a patient's NEWS score over time as a Series: every stored score for raw
+        resolution, otherwise the highest score in each bucket of the chosen rollup tier.
+        Takes resolution / max_points as get_patient_history does.
+        """
+        patient = self._lookup_patient(patient_id)
+        if patient is None:
+            return Series(np.empty(0, np.int64), np.empty(0, np.float64))
+        if max_points and start is not None:
+            resolution = ((time.time() if end is None else end) - start) / max_points
+        tier = self.resolution_for(resolution, start)
+        start = 0 if start is None else int(start)
+        end = _FOREVER if end is None else int(end)
+        if tier == RAW_RESOLUTION:
+            rows = self._reader().execute('SELECT ts, score FROM news_scores WHERE patient = ? AND ts >= ? AND ts < ? '
+                                          'AND score IS NOT NULL ORDER BY ts', (patient, start, end)).fetchall()
+        else:
+            rows = self._reader().execute(_SELECT_NEWS_ROLLUPS, (patient, tier, start - start % tier, end)).fetchall()
+        return Series(np.fromiter((row[0] for row in rows), np.int64, len(rows)),
+                      np.fromiter((row[1] for row in rows), np.float64, len(rows)))
+
+    def get_alerts(self, patient_id=None, start=None, end=None):
+        """Return alert history (for one patient or all) in time order as dicts."""
+        args = [0 if start is None else int(start), _FOREVER if end is None else int(end)]
+        patient_filter = ''
+        if patient_id is not None:
+            patient = self._lookup_patient(patient_id)
+            if patient is None:
+                return []
+            patient_filter = 'AND alerts.patient = ?'
+            args.append(patient)
+        rows = self._reader().execute(_SELECT_ALERTS.format(patient_filter=patient_filter), args)
+        return [{'id': id_, 'patient_id': owner, 'ts': ts, 'level': level, 'score': score, 'message': message}
+                for id_, owner, ts, level, score, message in rows]
+
+
+def patient_data_rows(patient_id, data):
+    """
+    Turn a get_patient_data result or an observation dict into (patient_id, parameter, ts, value) rows.
+
+    Heart rate comes as an IntradaySeries of seconds since midnight on data['date'] (default
+    today); steps as the Fitbit 'activities-steps' JSON, one total per day stored at midnight.
+    Observation dicts (NEWS_DATA style) give one row per reading at data['timestamp'].
+    """
+    rows = []
+    heart_rate = data.get('heart_rate')
+    if heart_rate is not None and not isinstance(heart_rate, IntradaySeries):
+        heart_rate = parse_intraday(heart_rate)
+    if heart_rate is not None and len(heart_rate.times):
+        midnight = _midnight(data.get('date'))
+        rows.extend(zip((patient_id,) * len(heart_rate.times), ('heart_rate',) * len(heart_rate.times),
+                        (heart_rate.times.astype(np.int64) + midnight).tolist(), heart_rate.values.tolist()))
+
+    steps = data.get('steps')
+    if isinstance(steps, dict):
+        for day in steps.get('activities-steps', []):
+            rows.append((patient_id, 'steps', _midnight(day['dateTime']), float(day['value'])))
+
+    timestamp = int(data.get('timestamp') or time.time())
+    for name, value in data.items():
+        name = _OBSERVATION_ALIASES.get(name, name)
+        if name not in OBSERVATION_PARAMETERS or value is None:
+            continue
+        if name == 'consciousness':
+            value = CONSCIOUSNESS_CODES.get(str(value).upper())
+            if value is None:
+                continue
+        rows.append((patient_id, name, timestamp, reading_value(name, value)))
+    return rows
+
+
+def reading_value(parameter, value):
+    """Coerce a reading to float, raising ValueError for anything non-numeric or non-finite."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{parameter} reading {value!r} is not a number") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{parameter} reading {value!r} is not finite")
+    return number
+
+
+def consciousness_level(code):
+    """Map a stored consciousness code back to its AVPU letter."""
+    return _CONSCIOUSNESS_BY_CODE.get(int(code))
+
+
+def _midnight(day):
+    if day is None:
+        day = date.today()
+    elif isinstance(day, str):
+        day = date.fromisoformat(day)
+    return int(datetime(day.year, day.month, day.day).timestamp())
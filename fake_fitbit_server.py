@@ -0,0 +1,535 @@
+# fake_fitbit_server.py
+
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+
+# Intraday detail levels in minutes per point (1sec is served at 1-minute resolution)
+DETAIL_LEVELS = {'1sec': 1, '1min': 1, '5min': 5, '15min': 15}
+
+_DAY = r'(today|\d{4}-\d\d-\d\d)'
+_RANGE = rf'{_DAY}(?:/{_DAY})?'
+_INTRADAY = r'(?:/(1sec|1min|5min|15min))?(?:/time/(\d\d:\d\d)/(\d\d:\d\d))?'
+
+
+class _Server(ThreadingHTTPServer):
+    # Load tests open many connections at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class SyntheticPatient:
+    """
+    Seeded, plausible vital-sign trajectories for one synthetic patient.
+
+    Every patient has a resting heart rate, a daily rhythm, short bursts of activity and
+    minute-to-minute noise. Deteriorating patients, like the NEWS_DATA fixture, pick an onset
+    time; over the following four hours their pulse and breathing rate climb, their temperature
+    rises and their SpO2 falls, so a ward contains patients crossing every NEWS2 band.
+
+    The same user id and seed always give the same patient.
+    """
+
+    def __init__(self, user_id, seed, deteriorating=False):
+        rng = np.random.default_rng(seed)
+        minutes = np.arange(MINUTES_PER_DAY)
+        self.user_id = user_id
+        self.deteriorating = deteriorating
+        self.age = int(rng.integers(25, 90))
+        self.resting_heart_rate = int(rng.integers(52, 78))
+        self.onset = int(rng.integers(6 * 60, 20 * 60)) if deteriorating else None
+
+        active = rng.random(MINUTES_PER_DAY) < 0.06
+        active &= (minutes > 7 * 60) & (minutes < 22 * 60)
+        heart = (self.resting_heart_rate
+                 + 6 * np.sin((minutes - 10 * 60) / MINUTES_PER_DAY * 2 * np.pi)
+                 + np.convolve(active * rng.uniform(15, 35), np.ones(10), 'same') / 3
+                 + rng.normal(0, 2.0, MINUTES_PER_DAY))
+        self.ramp = np.zeros(MINUTES_PER_DAY)
+        if deteriorating:
+            self.ramp = np.clip((minutes - self.onset) / 240, 0, 1)
+            heart += self.ramp * rng.uniform(50, 85)
+        self.heart_rate = np.clip(np.rint(heart), 35, 220).astype(np.uint16)
+        self.steps = np.where(active & (self.ramp < 0.5), rng.integers(20, 120, MINUTES_PER_DAY), 0).astype(np.uint16)
+
+        # Nightly baselines; deterioration moves them in proportion to the ramp
+        self.temperature = rng.normal(36.7, 0.2)
+        self.spo2 = rng.uniform(95.5, 98.5)
+        self.breathing_rate = rng.uniform(13, 17)
+        self.rmssd = rng.uniform(25, 55)
+        self.fever = rng.uniform(1.8, 3.6)
+
+    def nightly(self, minute):
+        """Summary readings as of `minute` past midnight (the day's worst point for deteriorating patients)."""
+        ramp = self.ramp[min(max(minute, 0), MINUTES_PER_DAY - 1)]
+        spo2 = self.spo2 - 5.5 * ramp
+        return {
+            'temperature': round(self.temperature + self.fever * ramp, 1),
+            'spo2': {'avg': round(spo2, 1), 'min': round(spo2 - 1.8, 1), 'max': round(min(spo2 + 1.5, 100.0), 1)},
+            'breathing_rate': round(self.breathing_rate + 10 * ramp, 1),
+            'rmssd': round(self.rmssd * (1 - 0.6 * ramp), 1),
+        }
+
+
+class FakeFitbitServer:
+    """
+    Local stand-in for the Fitbit Web API for load-testing the collectors.
+
+    Serves the endpoints this project calls (heart rate and steps, intraday and daily, the
+    activity summary, temp/core, spo2, br, hrv, profile, OAuth2 token and authorize, and
+    subscriptions) for N seeded synthetic patients. Latency, random 429s, the per-user hourly
+    rate limit and token expiry can all be injected. Point the collectors at it with the
+    FITBIT_API_BASE, FITBIT_AUTHORIZE_URL and FITBIT_TOKEN_URL settings (see config.py);
+    requests are accepted over keep-alive connections like the real API.
+
+    Parameters:
+    - patients: number of synthetic patients, with user ids P00000, P00001, ...
+    - seed: seed for every patient's trajectory
+    - deteriorating_fraction: share of patients who deteriorate during the day
+    - host / port: where to listen (port 0 picks a free port)
+    - latency / latency_jitter: seconds added to every response, plus up to jitter at random
+    - throttle_rate: probability of answering any API call with a 429
+    - rate_limit: requests per user per clock hour before 429s (None for unlimited)
+    - token_lifetime: seconds an access token is valid
+    - clock: callable returning the current datetime (intraday data for today stops at its minute)
+    """
+
+    def __init__(self, patients=100, seed=42, deteriorating_fraction=0.1, host='127.0.0.1', port=0,
+                 latency=0.0, latency_jitter=0.0, throttle_rate=0.0, rate_limit=150, token_lifetime=8 * 3600,
+                 clock=None):
+        self.patient_ids = [f'P{index:05d}' for index in range(patients)]
+        self.seed = seed
+        self.deteriorating_fraction = deteriorating_fraction
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.token_lifetime = token_lifetime
+        self.clock = clock or datetime.now
+        self.counters = dict.fromkeys(('requests', 'throttled', 'rate_limited', 'expired', 'unauthorized',
+                                       'tokens_issued', 'tokens_refreshed'), 0)
+
+        self._patients = {}
+        self._access_tokens = {}  # access token -> (user_id, expires_at)
+        self._refresh_tokens = {}  # refresh token -> user_id
+        self._usage = {}  # user_id -> (hour, requests this hour)
+        self._subscriptions = {}  # (user_id, collection, subscription_id) -> subscriber_id
+        self._next_login = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._routes = [
+            ('GET', re.compile(rf'^/1/user/-/activities/heart/date/{_DAY}/1d{_INTRADAY}\.json$'), self._heart),
+            ('GET', re.compile(rf'^/1/user/-/activities/steps/date/{_DAY}/1d{_INTRADAY}\.json$'), self._steps),
+            ('GET', re.compile(rf'^/1/user/-/activities/date/{_DAY}\.json$'), self._activity_summary),
+            ('GET', re.compile(rf'^/1/user/-/temp/core/date/{_RANGE}\.json$'), self._temperature),
+            ('GET', re.compile(rf'^/1/user/-/spo2/date/{_RANGE}\.json$'), self._spo2),
+            ('GET', re.compile(rf'^/1/user/-/br/date/{_RANGE}\.json$'), self._breathing_rate),
+            ('GET', re.compile(rf'^/1/user/-/hrv/date/{_RANGE}\.json$'), self._hrv),
+            ('GET', re.compile(r'^/1/user/-/profile\.json$'), self._profile),
+            ('GET', re.compile(r'^/1/user/-(?:/(\w+))?/apiSubscriptions\.json$'), self._list_subscriptions),
+            ('POST', re.compile(r'^/1/user/-(?:/(\w+))?/apiSubscriptions/([^/]+)\.json$'), self._add_subscription),
+            ('DELETE', re.compile(r'^/1/user/-(?:/(\w+))?/apiSubscriptions/([^/]+)\.json$'), self._delete_subscription),
+        ]
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self, 'GET')
+
+            def do_POST(self):
+                server._handle(self, 'POST')
+
+            def do_DELETE(self):
+                server._handle(self, 'DELETE')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _Server((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-fitbit', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def environment(self):
+        """Settings that point config.py (and oauthlib, which refuses plain http by default) at this server."""
+        return {
+            'FITBIT_API_BASE': self.url,
+            'FITBIT_AUTHORIZE_URL': f'{self.url}/oauth2/authorize',
+            'FITBIT_TOKEN_URL': f'{self.url}/oauth2/token',
+            'OAUTHLIB_INSECURE_TRANSPORT': '1',
+        }
+
+    # Patients and tokens
+
+    def patient(self, user_id):
+        """Return the SyntheticPatient for a user id, creating it on first use."""
+        patient = self._patients.get(user_id)
+        if patient is None:
+            index = int(user_id[1:])
+            rng = random.Random(f'{self.seed}:{user_id}')
+            patient = SyntheticPatient(user_id, (self.seed, index), rng.random() < self.deteriorating_fraction)
+            self._patients[user_id] = patient
+        return patient
+
+    def issue_token(self, user_id):
+        """Create a token for a patient, as the token endpoint would, and return the token response dict."""
+        access_token, refresh_token = secrets.token_urlsafe(24), secrets.token_urlsafe(24)
+        with self._lock:
+            self._access_tokens[access_token] = (user_id, time.time() + self.token_lifetime)
+            self._refresh_tokens[refresh_token] = user_id
+            self.counters['tokens_issued'] += 1
+        return {'access_token': access_token, 'refresh_token': refresh_token, 'expires_in': self.token_lifetime,
+                'token_type': 'Bearer', 'user_id': user_id,
+                'scope': 'activity heartrate oxygen_saturation respiratory_rate temperature profile sleep'}
+
+    def patient_tokens(self, count=None):
+        """Issue an access token for each of the first `count` patients: dict of user_id -> access token."""
+        return {user_id: self.issue_token(user_id)['access_token'] for user_id in self.patient_ids[:count]}
+
+    def expire_tokens(self, user_ids=None):
+        """Expire the access tokens of some (or all) patients now; refresh tokens stay valid."""
+        with self._lock:
+            for token, (user_id, _) in list(self._access_tokens.items()):
+                if user_ids is None or user_id in user_ids:
+                    self._access_tokens[token] = (user_id, 0)
+
+    def notify(self, url, client_secret, day=None):
+        """
+        Post one signed notification per subscription to a webhook receiver, like Fitbit's notifier.
+
+        Returns:
+        - HTTP status code from the receiver, or None if there are no subscriptions
+        """
+        from webhook_receiver import send_test_notification
+
+        day = day or self.clock().date().isoformat()
+        notifications = [{'collectionType': collection or 'user', 'date': day, 'ownerId': user_id,
+                          'ownerType': 'user', 'subscriptionId': subscription_id}
+                         for user_id, collection, subscription_id in self._subscriptions]
+        if not notifications:
+            return None
+        return send_test_notification(url, notifications, client_secret)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    # Request handling
+
+    def _handle(self, request, method):
+        url = urlparse(request.path)
+        body = request.rfile.read(int(request.headers.get('Content-Length') or 0))
+        with self._lock:
+            self.counters['requests'] += 1
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + self._random.random() * self.latency_jitter)
+
+        if url.path == '/oauth2/token' and method == 'POST':
+            return self._token(request, parse_qs(body.decode()))
+        if url.path == '/oauth2/authorize' and method == 'GET':
+            return self._authorize(request, parse_qs(url.query))
+
+        user_id = self._authenticate(request)
+        if user_id is None:
+            return
+        headers = self._count_usage(request, user_id)
+        if headers is None:
+            return
+
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                status, payload = handler(user_id, *match.groups())
+                return self._send(request, status, payload, headers)
+        self._send(request, 404, {'errors': [{'errorType': 'not_found', 'message': url.path}], 'success': False},
+                   headers)
+
+    def _authenticate(self, request):
+        authorization = request.headers.get('Authorization', '')
+        token = authorization[7:] if authorization.startswith('Bearer ') else None
+        with self._lock:
+            user_id, expires_at = self._access_tokens.get(token, (None, None))
+            if user_id is None:
+                self.counters['unauthorized'] += 1
+            elif expires_at <= time.time():
+                self.counters['expired'] += 1
+        if user_id is None:
+            self._send(request, 401, {'errors': [{'errorType': 'invalid_token',
+                                                  'message': 'Access token invalid'}], 'success': False})
+            return None
+        if expires_at <= time.time():
+            self._send(request, 401, {'errors': [{'errorType': 'expired_token',
+                                                  'message': f'Access token expired: {token}'}], 'success': False})
+            return None
+        return user_id
+
+    def _count_usage(self, request, user_id):
+        # Fixed hourly window per user, reported in Fitbit-Rate-Limit-* headers
+        now = time.time()
+        hour, reset = int(now // 3600), int(3600 - now % 3600)
+        with self._lock:
+            window, used = self._usage.get(user_id, (hour, 0))
+            if window != hour:
+                used = 0
+            self._usage[user_id] = (hour, used + 1)
+            throttled = self._random.random() < self.throttle_rate
+            limited = self.rate_limit is not None and used >= self.rate_limit
+            if throttled:
+                self.counters['throttled'] += 1
+            elif limited:
+                self.counters['rate_limited'] += 1
+        headers = {}
+        if self.rate_limit is not None:
+            headers = {'Fitbit-Rate-Limit-Limit': str(self.rate_limit),
+                       'Fitbit-Rate-Limit-Remaining': str(max(self.rate_limit - used - 1, 0)),
+                       'Fitbit-Rate-Limit-Reset': str(reset)}
+        if throttled or limited:
+            headers['Retry-After'] = '1' if throttled else str(reset)
+            self._send(request, 429, {'errors': [{'errorType': 'system', 'message': 'Too Many Requests'}],
+                                      'success': False}, headers)
+            return None
+        return headers
+
+    def _send(self, request, status, payload, headers=None):
+        body = b'' if payload is None else json.dumps(payload).encode()
+        request.send_response(status)
+        if payload is not None:
+            request.send_header('Content-Type', 'application/json;charset=UTF-8')
+        request.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _token(self, request, form):
+        grant_type = form.get('grant_type', [''])[0]
+        if grant_type == 'authorization_code':
+            code = form.get('code', [''])[0]
+            user_id = code[len('code-'):] if code.startswith('code-') else None
+        elif grant_type == 'refresh_token':
+            with self._lock:
+                user_id = self._refresh_tokens.pop(form.get('refresh_token', [''])[0], None)
+                if user_id is not None:
+                    self.counters['tokens_refreshed'] += 1
+        else:
+            user_id = None
+        if user_id not in self.patient_ids:
+            return self._send(request, 400 if grant_type == 'authorization_code' else 401,
+                              {'errors': [{'errorType': 'invalid_grant', 'message': 'Invalid grant'}],
+                               'success': False})
+        self._send(request, 200, self.issue_token(user_id))
+
+    def _authorize(self, request, query):
+        # No login page: each authorization is granted for the next patient in turn
+        with self._lock:
+            user_id = self.patient_ids[self._next_login % len(self.patient_ids)]
+            self._next_login += 1
+        params = {'code': f'code-{user_id}'}
+        if 'state' in query:
+            params['state'] = query['state'][0]
+        redirect_uri = query.get('redirect_uri', ['http://localhost:8501/'])[0]
+        request.send_response(302)
+        request.send_header('Location', f'{redirect_uri}?{urlencode(params)}#_=_')
+        request.send_header('Content-Length', '0')
+        request.end_headers()
+
+    # Endpoints
+
+    def _day(self, day):
+        today = self.clock().date()
+        return today if day == 'today' else date.fromisoformat(day)
+
+    def _minutes_available(self, day):
+        # Today's data stops at the current minute; past days are complete, future days empty
+        now = self.clock()
+        if day == now.date():
+            return now.hour * 60 + now.minute + 1
+        return MINUTES_PER_DAY if day < now.date() else 0
+
+    def _days(self, start, end):
+        start = self._day(start)
+        end = self._day(end) if end else start
+        return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+    def _nightly(self, patient, day):
+        # Yesterday and before read as the patient's baseline; today reflects any deterioration so far
+        minute = self._minutes_available(day) - 1 if day == self.clock().date() else -1
+        return patient.nightly(minute)
+
+    def _intraday(self, series, day, detail_level, start, end):
+        available = self._minutes_available(day)
+        first = int(start[:2]) * 60 + int(start[3:]) if start else 0
+        last = min(int(end[:2]) * 60 + int(end[3:]) + 1 if end else MINUTES_PER_DAY, available)
+        step = DETAIL_LEVELS[detail_level]
+        return [{'time': f'{minute // 60:02d}:{minute % 60:02d}:00', 'value': int(series[minute])}
+                for minute in range(first - first % step, last, step)]
+
+    def _heart(self, user_id, day, detail_level, start, end):
+        patient, day = self.patient(user_id), self._day(day)
+        payload = {'activities-heart': [{'dateTime': day.isoformat(), 'value': {
+            'customHeartRateZones': [], 'heartRateZones': [],
+            'restingHeartRate': patient.resting_heart_rate}}]}
+        if detail_level:
+            payload['activities-heart-intraday'] = {
+                'dataset': self._intraday(patient.heart_rate, day, detail_level, start, end),
+                'datasetInterval': DETAIL_LEVELS[detail_level], 'datasetType': 'minute'}
+        return 200, payload
+
+    def _steps(self, user_id, day, detail_level, start, end):
+        patient, day = self.patient(user_id), self._day(day)
+        total = int(patient.steps[:self._minutes_available(day)].sum())
+        payload = {'activities-steps': [{'dateTime': day.isoformat(), 'value': str(total)}]}
+        if detail_level:
+            payload['activities-steps-intraday'] = {
+                'dataset': self._intraday(patient.steps, day, detail_level, start, end),
+                'datasetInterval': DETAIL_LEVELS[detail_level], 'datasetType': 'minute'}
+        return 200, payload
+
+    def _activity_summary(self, user_id, day):
+        patient, day = self.patient(user_id), self._day(day)
+        steps = int(patient.steps[:self._minutes_available(day)].sum())
+        return 200, {'activities': [], 'goals': {'steps': 10000}, 'summary': {
+            'steps': steps, 'restingHeartRate': patient.resting_heart_rate,
+            'sedentaryMinutes': MINUTES_PER_DAY - int(np.count_nonzero(patient.steps)),
+            'fairlyActiveMinutes': 0, 'lightlyActiveMinutes': int(np.count_nonzero(patient.steps)),
+            'veryActiveMinutes': 0}}
+
+    def _temperature(self, user_id, start, end):
+        patient = self.patient(user_id)
+        return 200, {'tempCore': [{'dateTime': f'{day.isoformat()}T06:00:00',
+                                   'value': self._nightly(patient, day)['temperature']}
+                                  for day in self._days(start, end)]}
+
+    def _spo2(self, user_id, start, end):
+        patient = self.patient(user_id)
+        return 200, [{'dateTime': day.isoformat(), 'value': self._nightly(patient, day)['spo2']}
+                     for day in self._days(start, end)]
+
+    def _breathing_rate(self, user_id, start, end):
+        patient = self.patient(user_id)
+        return 200, {'br': [{'dateTime': day.isoformat(),
+                             'value': {'breathingRate': self._nightly(patient, day)['breathing_rate']}}
+                            for day in self._days(start, end)]}
+
+    def _hrv(self, user_id, start, end):
+        patient = self.patient(user_id)
+        return 200, {'hrv': [{'dateTime': day.isoformat(),
+                              'value': {'dailyRmssd': self._nightly(patient, day)['rmssd'],
+                                        'deepRmssd': round(self._nightly(patient, day)['rmssd'] * 0.9, 1)}}
+                             for day in self._days(start, end)]}
+
+    def _profile(self, user_id):
+        patient = self.patient(user_id)
+        return 200, {'user': {'encodedId': user_id, 'displayName': f'Patient {user_id}', 'age': patient.age,
+                              'timezone': 'Europe/London', 'locale': 'en_GB'}}
+
+    def _subscription_json(self, user_id, collection, subscription_id, subscriber_id):
+        return {'collectionType': collection or 'user', 'ownerId': user_id, 'ownerType': 'user',
+                'subscriberId': subscriber_id, 'subscriptionId': subscription_id}
+
+    def _list_subscriptions(self, user_id, collection):
+        return 200, {'apiSubscriptions': [
+            self._subscription_json(owner, owner_collection, subscription_id, subscriber_id)
+            for (owner, owner_collection, subscription_id), subscriber_id in self._subscriptions.items()
+            if owner == user_id and (collection is None or owner_collection == collection)]}
+
+    def _add_subscription(self, user_id, collection, subscription_id):
+        key = (user_id, collection, subscription_id)
+        with self._lock:
+            existed = key in self._subscriptions
+            subscriber_id = self._subscriptions.setdefault(key, '1')
+        return (200 if existed else 201), self._subscription_json(user_id, collection, subscription_id, subscriber_id)
+
+    def _delete_subscription(self, user_id, collection, subscription_id):
+        with self._lock:
+            self._subscriptions.pop((user_id, collection, subscription_id), None)
+        return 204, None
+
+
+def measure_throughput(server, patients=None, cycles=3, **collector_options):
+    """
+    Fetch every endpoint for every patient with AsyncDataCollector and report the rate.
+
+    Returns:
+    - dict with patients, requests, errors and the best cycle's seconds and patients per second
+    """
+    from async_collector import collect_ward
+
+    tokens = server.patient_tokens(patients)
+    best = None
+    for _ in range(cycles):
+        started = time.perf_counter()
+        ward = collect_ward(tokens, api_base=server.url, **collector_options)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    errors = sum(len(patient['errors']) for patient in ward.values())
+    return {'patients': len(tokens), 'requests': server.stats()['requests'], 'errors': errors,
+            'seconds': round(best, 3), 'patients_per_second': round(len(tokens) / best, 1)}
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Fitbit API stand-in with synthetic patients.")
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--deteriorating', type=float, default=0.1, help="share of patients who deteriorate")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra seconds at random")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="probability of a random 429")
+    parser.add_argument('--rate-limit', type=int, default=150, help="requests per user per hour (0 for none)")
+    parser.add_argument('--token-lifetime', type=int, default=8 * 3600)
+    parser.add_argument('--load-test', action='store_true', help="fetch the whole ward and report throughput")
+    args = parser.parse_args()
+
+    server = FakeFitbitServer(patients=args.patients, seed=args.seed, deteriorating_fraction=args.deteriorating,
+                              host=args.host, port=args.port, latency=args.latency, latency_jitter=args.jitter,
+                              throttle_rate=args.throttle_rate, rate_limit=args.rate_limit or None,
+                              token_lifetime=args.token_lifetime)
+    with server:
+        if args.load_test:
+            print(measure_throughput(server))
+        else:
+            print(f"Fake Fitbit API for {args.patients} patients at {server.url}; point the app at it with:")
+            for name, value in server.environment().items():
+                print(f"  export {name}={value}")
+            try:
+                while True:
+                    time.sleep(60)
+                    print(server.stats())
+            except KeyboardInterrupt:
+                pass
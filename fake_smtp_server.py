@@ -0,0 +1,171 @@
+# fake_smtp_server.py
+
+import argparse
+import email
+import socketserver
+import threading
+import time
+from email import policy
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server.owner
+        self.reply(f'220 {server.hostname} fake SMTP ready')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode('utf-8', 'replace').strip().partition(' ')
+            command = command.upper()
+            if command == 'EHLO':
+                self.reply(f'250-{server.hostname}')
+                self.reply('250 8BITMIME')
+            elif command == 'HELO':
+                self.reply(f'250 {server.hostname}')
+            elif command == 'MAIL':
+                sender, recipients = _address(argument), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                recipients.append(_address(argument))
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(line[1:] if line.startswith(b'..') else line)
+                if server.latency:
+                    time.sleep(server.latency)
+                if server._take_failure():
+                    self.reply('451 Requested action aborted: local error in processing')
+                else:
+                    server._deliver(sender, recipients, b''.join(lines))
+                    self.reply('250 OK: queued')
+                sender, recipients = None, []
+            elif command == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+def _address(argument):
+    # "FROM:<a@b>" / "TO:<a@b>"
+    return argument.partition(':')[2].strip().strip('<>').split('>')[0]
+
+
+class FakeSMTPServer:
+    """
+    Local SMTP stand-in that keeps every message it accepts, for testing email notifications.
+
+    Messages are parsed into email.message.EmailMessage objects and kept, with their envelope,
+    in `messages` as (sender, recipients, message) tuples. fail_next(n) makes the next n
+    deliveries fail with a transient 451 reply, and `latency` slows each delivery down, so
+    retry and backoff paths can be exercised.
+
+    Parameters:
+    - host / port: where to listen (port 0 picks a free one)
+    - latency: seconds added to every delivery
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.hostname = 'fake-smtp.local'
+        self.latency = latency
+        self.messages = []
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._received = threading.Condition(self._lock)
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.owner = self
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-smtp', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def fail_next(self, n=1):
+        """Reject the next n messages with a transient error."""
+        with self._lock:
+            self._failures += n
+
+    def wait_for(self, count, timeout=5.0):
+        """Wait until at least `count` messages have arrived; returns True if they did."""
+        with self._received:
+            return self._received.wait_for(lambda: len(self.messages) >= count, timeout)
+
+    def inbox(self, address):
+        """Messages delivered to one recipient address."""
+        with self._lock:
+            return [message for _, recipients, message in self.messages if address in recipients]
+
+    def _take_failure(self):
+        with self._lock:
+            if self._failures:
+                self._failures -= 1
+                return True
+            return False
+
+    def _deliver(self, sender, recipients, data):
+        message = email.message_from_bytes(data, policy=policy.default)
+        with self._received:
+            self.messages.append((sender, recipients, message))
+            self._received.notify_all()
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local SMTP stand-in that prints the messages it accepts.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    with FakeSMTPServer(args.host, args.port) as server:
+        print(f"Fake SMTP server on {server.host}:{server.port}; set ALERT_SMTP_HOST/ALERT_SMTP_PORT to use it")
+        seen = 0
+        try:
+            while True:
+                server.wait_for(seen + 1, timeout=1.0)
+                for sender, recipients, message in server.messages[seen:]:
+                    print(f"{sender} -> {', '.join(recipients)}: {message['Subject']}")
+                seen = len(server.messages)
+        except KeyboardInterrupt:
+            pass
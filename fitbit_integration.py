@@ -0,0 +1,143 @@
+# fitbit_integration.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import FITBIT_API_BASE
+
+# Endpoints fetched for every patient on each polling cycle
+PATIENT_ENDPOINTS = {
+    'heart_rate': '/1/user/-/activities/heart/date/today/1d/1min.json',
+    'steps': '/1/user/-/activities/steps/date/today/1d.json',
+}
+
+# Connection pool and retry settings for the shared session. 429 is deliberately not
+# retried here: it goes straight back to the caller so RateLimitBudget can defer the fetch.
+POOL_SIZE = 32
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return this process's shared keep-alive session for the Fitbit API.
+
+    Every request made through it reuses pooled TLS connections, and idempotent GETs are
+    retried with exponential backoff on connection errors and 5xx responses. Retry-After is
+    not honoured (it can ask for an hour's sleep) and a 429 is returned at once, so the
+    rate-limit budget sees it and defers the user instead of blocking a worker. A new session
+    is created after a fork so processes never share sockets.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                retry = Retry(total=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF_FACTOR,
+                              status_forcelist=RETRY_STATUSES, allowed_methods=frozenset({'GET'}),
+                              respect_retry_after_header=False, raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session, _session_pid = session, pid
+    return _session
+
+
+def daily_endpoints(today=None):
+    """Daily summary endpoints shown by the API tester, for yesterday..today."""
+    today = today or date.today()
+    yesterday = (today - timedelta(days=1)).isoformat()
+    today = today.isoformat()
+    return {
+        'temp': f'/1/user/-/temp/core/date/{yesterday}/{today}.json',
+        'activities': f'/1/user/-/activities/date/{today}.json',
+        'spo2': f'/1/user/-/spo2/date/{yesterday}/{today}.json',
+        'br': f'/1/user/-/br/date/{yesterday}/{today}.json',
+        'heart': f'/1/user/-/activities/heart/date/{today}/1d.json',
+        'hrv': f'/1/user/-/hrv/date/{yesterday}/{today}.json',
+    }
+
+
+class FitbitClient:
+    """
+    Minimal Fitbit Web API client for one user's bearer token, on the shared pooled session.
+
+    Parameters:
+    - access_token: OAuth2 access token for the user
+    - api_base: API root URL
+    - timeout: seconds per request
+    - max_workers: parallel requests used by fetch_many
+    - user_id / rate_limits: if given, every request is taken from rate_limits (a
+      rate_limiter.RateLimitBudget) for this user first, raising rate_limiter.RateLimited
+      rather than sending it when the budget is spent, and every response's rate-limit
+      headers are fed back into it
+    - cache: optional response_cache.ResponseCache for slowly changing endpoints
+    - band: the patient's NEWS band, which decides whether requests may use the reserved
+      part of the budget (see rate_limiter.RESERVED_FOR_BANDS)
+    """
+
+    def __init__(self, access_token, api_base=FITBIT_API_BASE, timeout=10, max_workers=8, user_id=None, rate_limits=None,
+                 cache=None, band=None):
+        self.access_token = access_token
+        self.api_base = api_base.rstrip('/')
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.user_id = user_id
+        self.rate_limits = rate_limits
+        self.cache = cache
+        self.band = band
+
+    def url(self, path):
+        return path if path.startswith('http') else self.api_base + path
+
+    def get(self, path, use_cache=True, **kwargs):
+        """GET an API path (or full URL) and return the requests.Response."""
+        if use_cache and self.cache is not None:
+            return self.cache.get(self, path)
+        headers = {'Authorization': f'Bearer {self.access_token}', **kwargs.pop('headers', {})}
+        if self.rate_limits is not None:
+            self.rate_limits.acquire(self.user_id, self.band)
+        response = get_session().get(self.url(path), headers=headers, timeout=self.timeout, **kwargs)
+        if self.rate_limits is not None:
+            self.rate_limits.observe(self.user_id, response.headers, response.status_code)
+        return response
+
+    def get_json(self, path):
+        """GET an API path and return the decoded JSON, raising requests.HTTPError on failure."""
+        response = self.get(path)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_many(self, paths):
+        """
+        GET several API paths in parallel.
+
+        Parameters:
+        - paths: dict of name -> path
+
+        Returns:
+        - Dict of name -> requests.Response, or the RequestException raised for that path
+        """
+        def fetch(path):
+            try:
+                return self.get(path)
+            except requests.exceptions.RequestException as e:
+                return e
+
+        if len(paths) <= 1:
+            return {name: fetch(path) for name, path in paths.items()}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths))) as pool:
+            futures = {name: pool.submit(fetch, path) for name, path in paths.items()}
+            return {name: future.result() for name, future in futures.items()}
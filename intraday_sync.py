@@ -0,0 +1,173 @@
+# intraday_sync.py
+
+import json
+import re
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+# Intraday series we fetch incrementally: name -> API resource
+INTRADAY_SERIES = {
+    'heart_rate': 'activities/heart',
+}
+
+# One day of an intraday series as parallel arrays: seconds since midnight (uint32) and values (uint16)
+IntradaySeries = namedtuple('IntradaySeries', ['times', 'values'])
+
+TIME_DTYPE = np.uint32
+VALUE_DTYPE = np.uint16
+
+_DATASET_TIME = re.compile(rb'"time": ?"(\d\d:\d\d:\d\d)"')
+_DATASET_VALUE = re.compile(rb'"value": ?(\d+)\s*[,}]')
+# Weights of the digits of 'HH:MM:SS' (colons weighted 0) to turn them into seconds since midnight
+_CLOCK_DIGIT_WEIGHTS = np.array([36000, 3600, 0, 600, 60, 0, 10, 1], dtype=TIME_DTYPE)
+_EMPTY_SERIES = IntradaySeries(np.empty(0, TIME_DTYPE), np.empty(0, VALUE_DTYPE))
+
+
+def intraday_path(resource, day, start, end, detail_level='1min'):
+    """API path for one intraday window, e.g. activities/heart on 2024-05-01 from 09:15 to 23:59."""
+    return f'/1/user/-/{resource}/date/{day}/1d/{detail_level}/time/{start}/{end}.json'
+
+
+def seconds_since_midnight(clock):
+    """'HH:MM:SS' -> seconds since midnight."""
+    hours, minutes, seconds = clock.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def parse_intraday(payload, resource='activities-heart'):
+    """
+    Parse an intraday response into an IntradaySeries without building a dict per point.
+
+    A day of 1-minute data is 1,440 {'time': ..., 'value': ...} dicts when decoded with json;
+    here the dataset section of the raw body is scanned once for times and once for values,
+    and the digits go straight into typed arrays, which take 6 bytes per point instead of a
+    few hundred. Bodies the scan cannot pair up exactly fall back to json.
+
+    Parameters:
+    - payload: raw response body (bytes or str), or an already decoded response dict
+    - resource: response key prefix, e.g. 'activities-heart' for 'activities-heart-intraday'
+
+    Returns:
+    - IntradaySeries of numpy arrays, in the order the points were sent
+    """
+    if isinstance(payload, dict):
+        dataset = payload.get(f'{resource}-intraday', {}).get('dataset') or []
+        return series_from_dataset(dataset)
+    if isinstance(payload, str):
+        payload = payload.encode()
+
+    start = payload.find(f'"{resource}-intraday"'.encode())
+    if start < 0:
+        return _EMPTY_SERIES
+    start = payload.find(b'"dataset"', start)
+    end = payload.find(b']', start)
+    if start < 0 or end < 0:
+        return _EMPTY_SERIES
+    section = payload[start:end]
+    clocks = _DATASET_TIME.findall(section)
+    values = _DATASET_VALUE.findall(section)
+    if not len(clocks) == len(values) == section.count(b'"time"') == section.count(b'"value"'):
+        # Unusual spacing or non-integer values: fall back to a full decode
+        return parse_intraday(json.loads(payload), resource)
+    if not clocks:
+        return _EMPTY_SERIES
+    digits = np.frombuffer(b''.join(clocks), dtype=np.uint8).reshape(-1, 8) - ord('0')
+    return IntradaySeries(digits.astype(TIME_DTYPE) @ _CLOCK_DIGIT_WEIGHTS,
+                          np.fromstring(b' '.join(values), dtype=VALUE_DTYPE, sep=' '))
+
+
+def series_from_dataset(dataset):
+    """Convert a decoded list of {'time': 'HH:MM:SS', 'value': ...} points to an IntradaySeries."""
+    times = np.fromiter((seconds_since_midnight(point['time']) for point in dataset), TIME_DTYPE, len(dataset))
+    values = np.fromiter((point['value'] for point in dataset), VALUE_DTYPE, len(dataset))
+    return IntradaySeries(times, values)
+
+
+class IntradaySync:
+    """
+    Keeps a high-water mark per patient and series so polls only ask for new intraday readings.
+
+    Instead of downloading the whole day's 1-minute series on every poll, callers ask
+    windows() for the time ranges after the last reading already held, fetch just those, and
+    hand the responses to merge(), which adds the new points to the local history without
+    duplicates. The minute holding the high-water mark is fetched again each time because
+    Fitbit may still revise the latest minute; merge() replaces it rather than duplicating it.
+
+    History is kept per (patient, series, date) as an IntradaySeries of typed numpy arrays,
+    in time order.
+    """
+
+    def __init__(self):
+        self.high_water = {}  # (patient_id, series) -> (date, seconds since midnight)
+        self.history = {}  # (patient_id, series, date) -> (times, values)
+
+    def windows(self, patient_id, series, now=None):
+        """
+        Return the (date, start 'HH:MM', end 'HH:MM') windows still to fetch, oldest first.
+
+        With no high-water mark yet this is the whole of today. If the last sync was on an
+        earlier day, the rest of that day is fetched before today (days in between are skipped).
+        """
+        now = now or datetime.now()
+        today = now.date()
+        mark = self.high_water.get((patient_id, series))
+        if mark is None:
+            return [(today.isoformat(), '00:00', '23:59')]
+
+        mark_day, mark_seconds = mark
+        start = f'{mark_seconds // 3600:02d}:{mark_seconds % 3600 // 60:02d}'
+        windows = [(mark_day, start, '23:59')]
+        if mark_day != today.isoformat():
+            windows.append((today.isoformat(), '00:00', '23:59'))
+        return windows
+
+    def merge(self, patient_id, series, day, dataset):
+        """
+        Add fetched points for one day to the history and advance the high-water mark.
+
+        Parameters:
+        - day: ISO date the points belong to
+        - dataset: IntradaySeries from parse_intraday, or the list of {'time': 'HH:MM:SS',
+          'value': ...} dicts from a decoded intraday response
+
+        Returns:
+        - Number of points that were not already held
+        """
+        if not isinstance(dataset, IntradaySeries):
+            dataset = series_from_dataset(dataset)
+        if not len(dataset.times):
+            return 0
+        key = (patient_id, series, day)
+        times, values = self.history.get(key, _EMPTY_SERIES)
+
+        # Drop anything we hold from the first fetched point onwards, then append the fetched points
+        keep = int(np.searchsorted(times, dataset.times[0], side='left'))
+        added = len(dataset.times) - (len(times) - keep)
+        times = np.concatenate((times[:keep], dataset.times))
+        values = np.concatenate((values[:keep], dataset.values))
+        self.history[key] = IntradaySeries(times, values)
+
+        last = int(times[-1])
+        mark = self.high_water.get((patient_id, series))
+        if mark is None or (day, last) > mark:
+            self.high_water[(patient_id, series)] = (day, last)
+        return max(added, 0)
+
+    def latest(self, patient_id, series):
+        """Return (date, seconds since midnight, value) of the newest point held, or None."""
+        mark = self.high_water.get((patient_id, series))
+        if mark is None:
+            return None
+        times, values = self.history[(patient_id, series, mark[0])]
+        return mark[0], int(times[-1]), int(values[-1])
+
+    def series(self, patient_id, series, day):
+        """Return the IntradaySeries held for one patient, series and ISO date (empty if none)."""
+        return self.history.get((patient_id, series, day), _EMPTY_SERIES)
+
+    def forget_before(self, day):
+        """Drop history for dates before `day` (ISO date) to bound memory."""
+        for key in [key for key in self.history if key[2] < day]:
+            del self.history[key]
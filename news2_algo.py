@@ -1,4 +1,109 @@
-def calculate_news_score(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp=None, consciousness=None, on_oxygen=None):
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+# Parameter order used for sub-scores (scalar and batch) and the batch missing mask.
+# Names match those reported in params_with_3_points by calculate_news_score.
+NEWS_PARAMETERS = ("respiration_rate", "SpO2", "temperature", "pulse", "systolic_bp", "consciousness")
+
+# Declarative NEWS2 scoring bands for the numeric parameters. Each band is (upper bound, points) and
+# covers readings above the previous band's bound up to and including its own; the last band is open.
+# Whole-number bounds match the NEWS2 chart for integer readings and leave no gaps for fractional ones
+# (e.g. a respiration rate of 20.5 scores as 21-24, a temperature of 36.05 as 36.1-38.0).
+NEWS_BANDS = {
+    "respiration_rate": ((8, 3), (11, 1), (20, 0), (24, 2), (None, 3)),
+    "SpO2": ((91, 3), (93, 2), (95, 1), (None, 0)),
+    "temperature": ((35.0, 3), (36.0, 1), (38.0, 0), (39.0, 1), (None, 2)),
+    "pulse": ((40, 3), (50, 1), (90, 0), (110, 1), (130, 2), (None, 3)),
+    "systolic_bp": ((90, 3), (100, 2), (110, 1), (219, 0), (None, 3)),
+}
+
+# Consciousness is scored on the AVPU scale: anything other than Alert scores 3.
+CONSCIOUSNESS_POINTS = {'A': 0, 'V': 3, 'P': 3, 'U': 3}
+
+# Clinical response for the aggregate score, shared by the UI and anything else that needs the band.
+ClinicalBand = namedtuple("ClinicalBand", ["name", "min_score", "colour", "monitoring", "response"])
+CLINICAL_BANDS = (
+    ClinicalBand("zero", 0, "green", "Minimum 12 hourly", "Continue routine NEWS monitoring"),
+    ClinicalBand("low", 1, "gray", "Minimum 4–6 hourly", "Inform registered nurse, who must assess the patient"),
+    ClinicalBand("medium", 5, "orange", "Minimum 1 hourly", "Urgent assessment by a clinician"),  # orange for amber
+    ClinicalBand("high", 7, "red", "Continuous monitoring of vital signs", "Emergency registrar assessment, consider level 2/3"),
+)
+
+# Tables compiled once from NEWS_BANDS: bisect boundaries and points for any reading, and a
+# direct-index table (reading -> points) covering every whole number up to the last boundary.
+_BAND_BOUNDS = {parameter: [bound for bound, _ in bands[:-1]] for parameter, bands in NEWS_BANDS.items()}
+_BAND_POINTS = {parameter: [points for _, points in bands] for parameter, bands in NEWS_BANDS.items()}
+# Temperature is read to 0.1 degrees, so it always goes through the bisect.
+_BAND_LOOKUP = {
+    parameter: bytes(_BAND_POINTS[parameter][bisect_left(_BAND_BOUNDS[parameter], value)]
+                     for value in range(int(_BAND_BOUNDS[parameter][-1]) + 2))
+    if parameter != "temperature" else b""
+    for parameter in NEWS_BANDS
+}
+_BAND_BOUNDS_ARRAY = {parameter: np.array(bounds, dtype=np.float64) for parameter, bounds in _BAND_BOUNDS.items()}
+_BAND_POINTS_ARRAY = {parameter: np.array(points, dtype=np.int8) for parameter, points in _BAND_POINTS.items()}
+_CLINICAL_BAND_MINIMA = [band.min_score for band in CLINICAL_BANDS]
+
+
+class NEWSResult:
+    """
+    Outcome of scoring one set of observations with score_news.
+
+    Has the same shape whether or not the observations could be scored, holds no copy of the
+    inputs and shares its sub-score bytes between equal results, so millions of them can be
+    kept for history and trend views. Treat instances as read-only: the scoring cache hands
+    the same object to every caller with the same readings.
+
+    Attributes:
+    - score: aggregate NEWS2 score, or None if a required parameter was missing
+    - band: name of the ClinicalBand for the score, or None
+    - sub_scores: bytes of per-parameter points, in NEWS_PARAMETERS order
+    - threes: bitmask of parameters that scored 3 (bit i is NEWS_PARAMETERS[i])
+    - missing: bitmask of parameters that were not provided, using the same bits
+    """
+    __slots__ = ("score", "band", "sub_scores", "threes", "missing")
+
+    def __init__(self, score, band, sub_scores, threes, missing):
+        self.score = score
+        self.band = band
+        self.sub_scores = _SHARED_SUB_SCORES.setdefault(sub_scores, sub_scores)
+        self.threes = threes
+        self.missing = missing
+
+    @property
+    def message(self):
+        """The "NEWS2 Score is: ..." text, formatted once per distinct score and missing set."""
+        key = (self.score, self.missing & _OPTIONAL_MASK)
+        message = _MESSAGES.get(key)
+        if message is None:
+            message = _MESSAGES[key] = _format_message(*key)
+        return message
+
+    @property
+    def param_received_3(self):
+        return self.threes != 0
+
+    @property
+    def params_with_3_points(self):
+        """Tuple of NEWS_PARAMETERS names that scored 3."""
+        return _PARAMETER_NAMES_BY_MASK[self.threes]
+
+    def __eq__(self, other):
+        if not isinstance(other, NEWSResult):
+            return NotImplemented
+        return (self.score, self.sub_scores, self.missing) == (other.score, other.sub_scores, other.missing)
+
+    def __hash__(self):
+        return hash((self.score, self.sub_scores, self.missing))
+
+    def __repr__(self):
+        return (f"NEWSResult(score={self.score!r}, band={self.band!r}, sub_scores={list(self.sub_scores)}, "
+                f"params_with_3_points={self.params_with_3_points!r})")
+
+
+def score_news(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp=None, consciousness=None, on_oxygen=None):
     """
     Calculate the NEWS (National Early Warning Score) based on the available physiological parameters.
     
@@ -9,162 +114,307 @@ def calculate_news_score(respiration_rate, SpO2_scale1, temperature, pulse, syst
     - pulse: beats per minute
     - systolic_bp: mmHg (optional)
     - consciousness: 'A' for Alert, 'V' for Voice, 'P' for Pain, 'U' for Unresponsive (optional)
-    - on_oxygen: boolean (optional)
+    - on_oxygen: boolean (optional, not scored)
     
     Returns:
-    - Tuple: (score, message, param_received_3, params_with_3_points, respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen)
+    - NEWSResult; its score is None if respiration rate, SpO2, temperature or pulse is missing
     """
-    required_params = [respiration_rate, SpO2_scale1, temperature, pulse]
-    if any(param is None for param in required_params):
-        return None, "Missing too many parameters, couldn't calculate NEWS score"
+    missing = 0
+    if systolic_bp is None:
+        missing |= 0b010000
+    if consciousness is None:
+        missing |= 0b100000
+    if respiration_rate is None or SpO2_scale1 is None or temperature is None or pulse is None:
+        for index, param in enumerate((respiration_rate, SpO2_scale1, temperature, pulse)):
+            if param is None:
+                missing |= 1 << index
+        return NEWSResult(None, None, _NO_SUB_SCORES, 0, missing)
 
-    # Error checking for required parameters
-    if not isinstance(respiration_rate, (int, float)) or respiration_rate < 0:
+    # Error checking for required parameters. The checks are written as "not value >= 0" so
+    # that NaN, which fails every comparison, is rejected rather than bisected into 3 points.
+    if not isinstance(respiration_rate, (int, float)) or not respiration_rate >= 0:
         raise ValueError("Respiration rate must be a non-negative number")
     if not isinstance(SpO2_scale1, (int, float)) or not 0 <= SpO2_scale1 <= 100:
         raise ValueError("SpO2 must be a number between 0 and 100")
-    if not isinstance(temperature, (int, float)):
+    if not isinstance(temperature, (int, float)) or temperature != temperature:
         raise ValueError("Temperature must be a number")
-    if not isinstance(pulse, (int, float)) or pulse < 0:
+    if not isinstance(pulse, (int, float)) or not pulse >= 0:
         raise ValueError("Pulse must be a non-negative number")
 
-    score = 0
-    param_received_3 = False
-    params_with_3_points = []
-    
-    # Scoring logic for required parameters
-    # Respiratory rate
-    if respiration_rate <= 8 or respiration_rate >= 25:
-        score += 3
-        param_received_3 = True
-        params_with_3_points.append("respiration_rate")
-    elif 21 <= respiration_rate <= 24:
-        score += 2
-    elif 9 <= respiration_rate <= 11:
-        score += 1
-    elif 12 <= respiration_rate <= 20:
-        score += 0
-    else:
-        print(f"Error: Unexpected value for respiration rate: {respiration_rate}")
-    
-    # Oxygen saturation
-    if SpO2_scale1 <= 91:
-        score += 3
-        param_received_3 = True
-        params_with_3_points.append("SpO2")
-    elif 92 <= SpO2_scale1 <= 93:
-        score += 2
-    elif 94 <= SpO2_scale1 <= 95:
-        score += 1
-    elif SpO2_scale1 >= 96:
-        score += 0
-    else:
-        print(f"Error: Unexpected value for SpO2: {SpO2_scale1}")
-    
-    # Temperature
-    if temperature <= 35.0:
-        score += 3
-        param_received_3 = True
-        params_with_3_points.append("temperature")
-    elif 35.1 <= temperature <= 36.0:
-        score += 1
-    elif 36.1 <= temperature <= 38.0:
-        score += 0
-    elif 38.1 <= temperature <= 39.0:
-        score += 1
-    elif temperature >= 39.1:
-        score += 2
-    else:
-        print(f"Error: Unexpected value for temperature: {temperature}")
-    
-    # Pulse
-    if pulse <= 40 or pulse >= 131:
-        score += 3
-        param_received_3 = True
-        params_with_3_points.append("pulse")
-    elif 111 <= pulse <= 130:
-        score += 2
-    elif 41 <= pulse <= 50 or 91 <= pulse <= 110:
-        score += 1
-    elif 51 <= pulse <= 90:
-        score += 0
-    else:
-        print(f"Error: Unexpected value for pulse: {pulse}")
+    sub_scores = [
+        _respiration_rate_points(respiration_rate),
+        _spo2_points(SpO2_scale1),
+        _temperature_points(temperature),
+        _pulse_points(pulse),
+        0,
+        0,
+    ]
 
     # Systolic blood pressure (optional)
-    bp_consciousness_missing = []
     if systolic_bp is not None:
-        if not isinstance(systolic_bp, (int, float)) or systolic_bp < 0:
+        if not isinstance(systolic_bp, (int, float)) or not systolic_bp >= 0:
             raise ValueError("Systolic blood pressure must be a non-negative number")
-        if systolic_bp <= 90 or systolic_bp >= 220:
-            score += 3
-            param_received_3 = True
-            params_with_3_points.append("systolic_bp")
-        elif 91 <= systolic_bp <= 100:
-            score += 2
-        elif 101 <= systolic_bp <= 110:
-            score += 1
-        elif 111 <= systolic_bp <= 219:
-            score += 0
-        else:
-            print(f"Error: Unexpected value for systolic blood pressure: {systolic_bp}")
-    else:
-        bp_consciousness_missing.append("bp")
+        sub_scores[4] = _systolic_bp_points(systolic_bp)
 
     # Consciousness (optional)
     if consciousness is not None:
-        if not isinstance(consciousness, str) or consciousness.upper() not in ['A', 'V', 'P', 'U']:
-            raise ValueError("Consciousness must be 'A', 'V', 'P', or 'U'")
-        if consciousness.upper() == 'A':
-            score += 0
-        elif consciousness.upper() in ['V', 'P', 'U']:
-            score += 3
-            param_received_3 = True
-            params_with_3_points.append("consciousness")
-        else:
-            print(f"Error: Unexpected value for consciousness: {consciousness}")
-    else:
-        bp_consciousness_missing.append("consciousness")
+        sub_scores[5] = _consciousness_points(consciousness)
+
+    score = sum(sub_scores)
+    threes = 0
+    if 3 in sub_scores:
+        for index, points in enumerate(sub_scores):
+            if points == 3:
+                threes |= 1 << index
+
+    return NEWSResult(score, _BAND_NAME_BY_SCORE[score], bytes(sub_scores), threes, missing)
 
-    # Prepare the result message
+
+def calculate_news_score(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp=None, consciousness=None, on_oxygen=None):
+    """
+    Tuple form of score_news, kept for existing callers.
+
+    Parameters are the same as for score_news.
+
+    Returns:
+    - Tuple: (score, message, param_received_3, params_with_3_points, respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen)
+    - Tuple: (None, message) if a required parameter is missing
+    """
+    result = score_news(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen)
+    if result.score is None:
+        return None, result.message
+    return (result.score, result.message, result.param_received_3, list(result.params_with_3_points),
+            respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen)
+
+
+def _format_message(score, optional_missing):
+    if score is None:
+        return "Missing too many parameters, couldn't calculate NEWS score"
+    bp_consciousness_missing = [name for bit, name in ((0b010000, "bp"), (0b100000, "consciousness"))
+                                if optional_missing & bit]
     if not bp_consciousness_missing:
-        message = f"NEWS2 Score is: {score}"
+        return f"NEWS2 Score is: {score}"
+    missing = " and ".join(bp_consciousness_missing)
+    return f"NEWS2 Score is: {score} (excluding {missing})"
+
+
+def clinical_band(score):
+    """Return the ClinicalBand entry from CLINICAL_BANDS that applies to an aggregate NEWS score."""
+    return CLINICAL_BANDS[bisect_right(_CLINICAL_BAND_MINIMA, score) - 1]
+
+
+def parameter_points(parameter, value):
+    """
+    Validate a single reading and return the NEWS2 points it scores on its own.
+
+    Parameters:
+    - parameter: one of NEWS_PARAMETERS ('SpO2_scale1' is accepted for 'SpO2')
+    - value: the reading, checked the same way calculate_news_score checks it
+
+    Returns:
+    - int: points for this parameter (0-3)
+    """
+    try:
+        check, error, points_for = _PARAMETER_SCORERS[_PARAMETER_ALIASES.get(parameter, parameter)]
+    except KeyError:
+        raise ValueError(f"Unknown NEWS parameter: {parameter}") from None
+    if not check(value):
+        raise ValueError(error)
+    return points_for(value)
+
+
+def _compile_band_scorer(parameter):
+    """Build the points function for one numeric parameter from its compiled NEWS_BANDS tables."""
+    bounds, points, table = _BAND_BOUNDS[parameter], _BAND_POINTS[parameter], _BAND_LOOKUP[parameter]
+    table_size = len(table)
+
+    def band_points(value):
+        # Whole-number readings index the lookup table directly; anything else bisects the bounds
+        if type(value) is int and value < table_size:
+            return table[value]
+        return points[bisect_left(bounds, value)]
+
+    return band_points
+
+
+_respiration_rate_points = _compile_band_scorer("respiration_rate")
+_spo2_points = _compile_band_scorer("SpO2")
+_temperature_points = _compile_band_scorer("temperature")
+_pulse_points = _compile_band_scorer("pulse")
+_systolic_bp_points = _compile_band_scorer("systolic_bp")
+
+
+def _consciousness_points(consciousness):
+    try:
+        return _AVPU_CODES[consciousness]
+    except (KeyError, TypeError):
+        raise ValueError("Consciousness must be 'A', 'V', 'P', or 'U'") from None
+
+
+# Per-parameter validation and scoring used by parameter_points: (check, error message, points function).
+_PARAMETER_SCORERS = {
+    "respiration_rate": (lambda value: isinstance(value, (int, float)) and value >= 0,
+                         "Respiration rate must be a non-negative number", _respiration_rate_points),
+    "SpO2": (lambda value: isinstance(value, (int, float)) and 0 <= value <= 100,
+             "SpO2 must be a number between 0 and 100", _spo2_points),
+    "temperature": (lambda value: isinstance(value, (int, float)) and value == value,
+                    "Temperature must be a number", _temperature_points),
+    "pulse": (lambda value: isinstance(value, (int, float)) and value >= 0,
+              "Pulse must be a non-negative number", _pulse_points),
+    "systolic_bp": (lambda value: isinstance(value, (int, float)) and value >= 0,
+                    "Systolic blood pressure must be a non-negative number", _systolic_bp_points),
+    # _consciousness_points raises its own ValueError for anything outside AVPU
+    "consciousness": (lambda value: True, "", _consciousness_points),
+}
+_PARAMETER_ALIASES = {"SpO2_scale1": "SpO2"}
+
+
+# Shared state for NEWSResult: interned sub-score bytes, formatted messages and lookup tables
+# for the band name by score and the parameter names by 3-point bitmask.
+_NO_SUB_SCORES = bytes(len(NEWS_PARAMETERS))
+_SHARED_SUB_SCORES = {}
+_MESSAGES = {}
+_OPTIONAL_MASK = 0b110000  # systolic_bp, consciousness
+_BAND_NAME_BY_SCORE = tuple(clinical_band(score).name for score in range(3 * len(NEWS_PARAMETERS) + 1))
+_PARAMETER_NAMES_BY_MASK = tuple(
+    tuple(name for index, name in enumerate(NEWS_PARAMETERS) if mask >> index & 1)
+    for mask in range(1 << len(NEWS_PARAMETERS))
+)
+
+
+def calculate_news_scores_batch(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp=None, consciousness=None, on_oxygen=None):
+    """
+    Calculate NEWS scores for many observations at once from column arrays.
+
+    Gives exactly the same scores as calculate_news_score applied row by row, but
+    looks every band up in NEWS_BANDS with NumPy so that a million rows take milliseconds.
+
+    Parameters:
+    - respiration_rate, SpO2_scale1, temperature, pulse: array-likes of equal length,
+      with NaN (or None) marking a missing reading
+    - systolic_bp: array-like with NaN/None for missing, or None if not recorded at all (optional)
+    - consciousness: array-like of 'A'/'V'/'P'/'U' with None for missing, or None (optional)
+    - on_oxygen: accepted for symmetry with calculate_news_score; not scored (optional)
+
+    Returns:
+    - Dict of arrays, one entry per row:
+      - 'score': int16 total NEWS score, -1 where a required parameter is missing
+        (calculate_news_score returns None for those rows)
+      - 'sub_scores': int8 array of shape (n, 6), columns ordered as NEWS_PARAMETERS
+      - 'param_received_3': bool, True where any parameter scored 3
+      - 'missing': bool array of shape (n, 6), True where a parameter was not provided
+    """
+    rr = _as_float_column(respiration_rate)
+    n = rr.shape[0]
+    spo2 = _as_float_column(SpO2_scale1, n)
+    temp = _as_float_column(temperature, n)
+    hr = _as_float_column(pulse, n)
+    sbp = _as_float_column(systolic_bp, n)
+    avpu = _consciousness_column(consciousness, n)
+
+    missing = np.column_stack([np.isnan(rr), np.isnan(spo2), np.isnan(temp), np.isnan(hr),
+                               np.isnan(sbp), avpu == _AVPU_MISSING])
+    scorable = ~missing[:, :4].any(axis=1)
+
+    # Error checking, applied only to rows that would be scored
+    if (scorable & (rr < 0)).any():
+        raise ValueError("Respiration rate must be a non-negative number")
+    if (scorable & ((spo2 < 0) | (spo2 > 100))).any():
+        raise ValueError("SpO2 must be a number between 0 and 100")
+    if (scorable & (hr < 0)).any():
+        raise ValueError("Pulse must be a non-negative number")
+    if (scorable & ~missing[:, 4] & (sbp < 0)).any():
+        raise ValueError("Systolic blood pressure must be a non-negative number")
+    if (scorable & (avpu == _AVPU_INVALID)).any():
+        raise ValueError("Consciousness must be 'A', 'V', 'P', or 'U'")
+
+    sub_scores = np.empty((n, 6), dtype=np.int8)
+    for column, (parameter, values) in enumerate(zip(NEWS_PARAMETERS, (rr, spo2, temp, hr, sbp))):
+        points = _BAND_POINTS_ARRAY[parameter]
+        sub_scores[:, column] = points[np.searchsorted(_BAND_BOUNDS_ARRAY[parameter], values, side="left")]
+    sub_scores[:, 5] = avpu
+    sub_scores[missing] = 0
+    sub_scores[~scorable] = 0
+
+    score = sub_scores.sum(axis=1, dtype=np.int16)
+    score[~scorable] = -1
+
+    return {
+        "score": score,
+        "sub_scores": sub_scores,
+        "param_received_3": (sub_scores == 3).any(axis=1),
+        "missing": missing,
+    }
+
+
+def _as_float_column(values, length=None):
+    """Convert a column (or None for "not recorded") to a float64 array with NaN for missing."""
+    if values is None:
+        return np.full(length, np.nan)
+    column = np.asarray(values)
+    if column.dtype == object:
+        column = np.array([np.nan if value is None else value for value in column], dtype=np.float64)
     else:
-        missing = " and ".join(bp_consciousness_missing)
-        message = f"NEWS2 Score is: {score} (excluding {missing})"
+        column = column.astype(np.float64, copy=False)
+    if column.ndim != 1 or (length is not None and column.shape[0] != length):
+        raise ValueError("All parameter arrays must be one-dimensional and of equal length")
+    return column
+
+
+# Consciousness codes used by the batch API: the AVPU sub-score, or a sentinel.
+_AVPU_MISSING = -1
+_AVPU_INVALID = -2
+_AVPU_CODES = {**CONSCIOUSNESS_POINTS, **{letter.lower(): points for letter, points in CONSCIOUSNESS_POINTS.items()}}
+_AVPU_BY_CODEPOINT = np.full(128, _AVPU_INVALID, dtype=np.int8)
+for _letter, _code in _AVPU_CODES.items():
+    _AVPU_BY_CODEPOINT[ord(_letter)] = _code
+
+
+def _consciousness_column(values, length):
+    """Map a consciousness column to int8 sub-scores, using the _AVPU_* sentinels for missing/invalid."""
+    if values is None:
+        return np.full(length, _AVPU_MISSING, dtype=np.int8)
+    column = np.asarray(values)
+    if column.ndim != 1 or column.shape[0] != length:
+        raise ValueError("All parameter arrays must be one-dimensional and of equal length")
+    if column.dtype.kind == "U" and column.dtype.itemsize == 4:
+        # Single-character strings: look the code points up directly, no per-row Python calls
+        codepoints = column.view(np.uint32)
+        return np.where(codepoints < 128, _AVPU_BY_CODEPOINT[np.minimum(codepoints, 127)], _AVPU_INVALID).astype(np.int8)
+    codes = {**_AVPU_CODES, None: _AVPU_MISSING}
+    return np.fromiter((codes.get(value, _AVPU_INVALID) if isinstance(value, (str, type(None))) else _AVPU_INVALID
+                        for value in column.tolist()), dtype=np.int8, count=length)
 
-    return score, message, param_received_3, params_with_3_points, respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen
 
 # Example usage
 if __name__ == "__main__":
     # Test with all parameters
-    score, message, param_received_3, params_with_3_points, *_ = calculate_news_score(18, 95, 37.5, 80, 120, 'A', False)
-    print(message)
-    print(f"Any parameter received 3 points: {param_received_3}")
-    print(f"Parameters that received 3 points: {params_with_3_points}")
+    result = score_news(18, 95, 37.5, 80, 120, 'A', False)
+    print(result.message)
+    print(f"Any parameter received 3 points: {result.param_received_3}")
+    print(f"Parameters that received 3 points: {list(result.params_with_3_points)}")
 
     # Test with high respiration rate
-    score, message, param_received_3, params_with_3_points, *_ = calculate_news_score(26, 95, 37.5, 80, 120, 'A', False)
-    print(message)
-    print(f"Any parameter received 3 points: {param_received_3}")
-    print(f"Parameters that received 3 points: {params_with_3_points}")
+    result = score_news(26, 95, 37.5, 80, 120, 'A', False)
+    print(result.message)
+    print(f"Any parameter received 3 points: {result.param_received_3}")
+    print(f"Parameters that received 3 points: {list(result.params_with_3_points)}")
 
     # Test without blood pressure
-    score, message = calculate_news_score(18, 99, 37.5, 80, consciousness='A', on_oxygen=True)
-    print(message)
+    print(score_news(18, 99, 37.5, 80, consciousness='A', on_oxygen=True).message)
 
     # Test without consciousness
-    score, message = calculate_news_score(18, 95, 41, 80, systolic_bp=120, on_oxygen=False)
-    print(message)
+    print(score_news(18, 95, 41, 80, systolic_bp=120, on_oxygen=False).message)
 
     # Test without both blood pressure and consciousness
-    score, message = calculate_news_score(11, 95, 37.5, 80, on_oxygen=True)
-    print(message)
+    print(score_news(11, 95, 37.5, 80, on_oxygen=True).message)
 
     # Test without oxygen status
-    score, message = calculate_news_score(18, 95, 37.5, 80, systolic_bp=120, consciousness='A')
-    print(message)
+    print(score_news(18, 95, 37.5, 80, systolic_bp=120, consciousness='A').message)
 
     # Test with missing required parameter
-    score, message = calculate_news_score(None, 95, 37.5, 80)
+    print(score_news(None, 95, 37.5, 80).message)
+
+    # Legacy tuple form
+    score, message, param_received_3, params_with_3_points, *_ = calculate_news_score(18, 95, 37.5, 80, 120, 'A', False)
     print(message)
@@ -0,0 +1,167 @@
+# news2_cache.py
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from news2_algo import NEWS_BANDS, score_news
+
+# Resolution each vital is rounded to when building a cache key: whole numbers for the
+# integer-valued vitals and 0.1 degrees for temperature, as charted on NEWS2.
+DEFAULT_QUANTIZATION = {"respiration_rate": 0, "SpO2_scale1": 0, "temperature": 1, "pulse": 0, "systolic_bp": 0}
+
+EVICTION_POLICIES = ("lru", "fifo")
+
+_VITAL_NAMES = ("respiration_rate", "SpO2_scale1", "temperature", "pulse", "systolic_bp")
+
+# Band boundaries per vital, plus the edges of the range score_news accepts, so a rounded key
+# never lands in a different band, or on the other side of validation, from its reading
+_VALID_RANGES = {"respiration_rate": (0, None), "SpO2_scale1": (0, 100), "temperature": (None, None),
+                 "pulse": (0, None), "systolic_bp": (0, None)}
+_KEY_EDGES = {name: sorted({bound for bound, _ in NEWS_BANDS[name.replace("_scale1", "")] if bound is not None}
+                           | {edge for edge in _VALID_RANGES[name] if edge is not None})
+              for name in _VITAL_NAMES}
+
+
+class NEWSScoreCache:
+    """
+    Opt-in bounded cache in front of news2_algo.score_news.
+
+    Monitor streams repeat the same vital vector many times in a row, and steady patients
+    look the same tick after tick. The cache keys each call on the vital vector (on_oxygen
+    is dropped because it is not scored) and returns the shared NEWSResult for it, so
+    repeated scoring and message formatting become dictionary lookups.
+
+    The cache is transparent: it always returns what score_news returns for the exact
+    readings, and a miss scores the exact readings. Only the key is normalised, so nearby
+    readings can share an entry: each number is rounded to its chart resolution unless that
+    would move it across a NEWS2 band boundary or the edge of the accepted range (e.g. 36.04
+    degrees keys as 36.0 would score differently, so it keeps its own key), and AVPU is
+    upper-cased. Pass quantization={} to key on the exact readings.
+
+    Parameters:
+    - maxsize: maximum number of entries kept (a reading that shares a normalised key is
+      also kept under its exact readings, so exact repeats skip the normalisation)
+    - eviction: 'lru' to evict the least recently used vector, 'fifo' to evict the oldest
+    - quantization: dict of parameter name -> decimal places to round to
+    """
+
+    def __init__(self, maxsize=4096, eviction="lru", quantization=None):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {EVICTION_POLICIES}")
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.quantization = DEFAULT_QUANTIZATION if quantization is None else dict(quantization)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru = eviction == "lru"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def score(self, respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp=None, consciousness=None, on_oxygen=None):
+        """
+        Score a set of observations, reusing the result for a previously seen vector.
+
+        Parameters and return value are the same as for news2_algo.score_news.
+        """
+        # Exact repeats hit on the readings themselves; only a miss pays for building the normalised key
+        readings = (respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness)
+        try:
+            return self._hit(readings)
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable reading: not cacheable, let score_news report it
+            return score_news(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen)
+        key = self._key(*readings)
+        if key != readings:
+            try:
+                result = self._hit(key)
+            except KeyError:
+                pass
+            else:
+                self._store(readings, result)
+                return result
+
+        # Misses score the exact readings; invalid readings raise here and are never cached
+        result = score_news(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen)
+        with self._lock:
+            self.misses += 1
+        self._store(key, result)
+        if key != readings:
+            self._store(readings, result)
+        return result
+
+    def _hit(self, key):
+        with self._lock:
+            result = self._entries[key]
+            if self._lru:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return result
+
+    def _store(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _key(self, *readings):
+        quantization = self.quantization
+        *vitals, consciousness = readings
+        if quantization:
+            vitals = [_key_value(name, value, quantization.get(name)) for name, value in zip(_VITAL_NAMES, vitals)]
+        return (*vitals, consciousness.upper() if isinstance(consciousness, str) else consciousness)
+
+    def stats(self):
+        """Return a dict with hits, misses, evictions, hit_rate, currsize and maxsize."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "currsize": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        """Drop every cached result and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+def _key_value(name, value, digits):
+    # Only plain, valid, finite numbers are rounded; anything else keys as itself, so score_news
+    # sees and validates it. A rounded value is only used if it is in the same band (and on the
+    # same side of the accepted range) as the reading, so every reading sharing a key scores alike.
+    if digits is None or type(value) is not float:
+        return value
+    low, high = _VALID_RANGES[name]
+    if value != value or value in (float('inf'), float('-inf')) \
+            or (low is not None and value < low) or (high is not None and value > high):
+        return value
+    rounded = round(value) if digits == 0 else round(value, digits)
+    if rounded == value:
+        return value
+    edges = _KEY_EDGES[name]
+    if bisect_left(edges, rounded) != bisect_left(edges, value):
+        return value
+    return rounded
+
+
+# Example usage
+if __name__ == "__main__":
+    from streamlit_app_fe import NEWS_DATA
+
+    cache = NEWSScoreCache(maxsize=128)
+    for _ in range(100):
+        for data in NEWS_DATA:
+            cache.score(**data)
+    print(cache.stats())
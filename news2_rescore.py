@@ -0,0 +1,275 @@
+# news2_rescore.py
+
+"""
+Re-score exported observation files offline, e.g. for audits or after a change to the NEWS2 rules.
+
+Reads a CSV (with a header row) or JSON-lines file in chunks, scores each chunk with
+news2_algo.calculate_news_scores_batch on a process pool, and streams the input rows back
+out in their original order with the NEWS2 columns appended. Rows that cannot be scored,
+including CSV rows that are malformed or have the wrong number of fields and JSON lines
+that are not valid JSON objects, get a news2_error message instead of stopping the run.
+The parent process only cuts the input into chunks of raw text on record boundaries;
+parsing, scoring and formatting all happen in the workers. Only a bounded number of
+chunks is in flight at once, so memory stays flat however large the file is.
+
+Usage:
+    python news2_rescore.py observations.csv rescored.csv --workers 8
+    python news2_rescore.py observations.jsonl rescored.jsonl --chunk-size 50000
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from news2_algo import CLINICAL_BANDS, NEWS_PARAMETERS, calculate_news_scores_batch, score_news
+
+INPUT_COLUMNS = ("respiration_rate", "SpO2_scale1", "temperature", "pulse", "systolic_bp", "consciousness", "on_oxygen")
+NUMERIC_COLUMNS = INPUT_COLUMNS[:5]
+OUTPUT_COLUMNS = ("news2_score", "news2_band", "param_received_3", "params_with_3_points", "news2_error")
+
+_BAND_MINIMA = np.array([band.min_score for band in CLINICAL_BANDS])
+_BAND_NAMES = np.array([band.name for band in CLINICAL_BANDS], dtype=object)
+_NAMES_BY_MASK = [";".join(name for index, name in enumerate(NEWS_PARAMETERS) if mask >> index & 1)
+                  for mask in range(1 << len(NEWS_PARAMETERS))]
+
+
+def rescore_file(input_path, output_path, file_format=None, chunk_size=100_000, workers=None, progress=sys.stderr):
+    """
+    Score every row of an observations file and write the rows back out with NEWS2 columns.
+
+    Parameters:
+    - input_path / output_path: CSV or JSON-lines files
+    - file_format: 'csv' or 'jsonl'; guessed from the input file extension if None
+    - chunk_size: rows per chunk sent to a worker
+    - workers: worker processes (defaults to the number of CPUs)
+    - progress: stream for rows/sec progress lines, or None for silence
+
+    Returns:
+    - Dict with 'rows', 'seconds' and 'rows_per_second'
+    """
+    file_format = file_format or _guess_format(input_path)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+    started = time.perf_counter()
+    rows = 0
+
+    with open(input_path, newline="", encoding="utf-8") as source, \
+            open(output_path, "w", newline="", encoding="utf-8") as target, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        quoted = file_format == "csv"
+        header = None
+        line = 1  # line number of the next chunk's first line
+        if quoted:
+            text, count = _read_records(source, 1, quoted)
+            header = next(csv.reader(io.StringIO(text, newline="")), [])
+            csv.writer(target, lineterminator="\n").writerow(header + list(OUTPUT_COLUMNS))
+            line += count
+
+        pending = deque()
+        while True:
+            text, count = _read_records(source, chunk_size, quoted)
+            if text:
+                pending.append(pool.submit(_score_chunk, file_format, header, text, line))
+                line += count
+            # Write finished chunks in input order, and wait whenever too many are in flight
+            while pending and (len(pending) >= max_in_flight or not text or pending[0].done()):
+                chunk_rows, text = pending.popleft().result()
+                target.write(text)
+                rows += chunk_rows
+                if progress is not None:
+                    elapsed = time.perf_counter() - started
+                    print(f"{rows} rows, {rows / elapsed:,.0f} rows/s", file=progress)
+            if not text:
+                break
+
+    seconds = time.perf_counter() - started
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else 0.0}
+
+
+def _read_records(source, count, quoted):
+    """
+    Read about `count` lines of raw text, ending on a record boundary.
+
+    With quoted (CSV), lines are added until every double quote is paired, so a quoted field
+    containing newlines never straddles two chunks. Returns (text, lines read).
+    """
+    lines = list(islice(source, count))
+    text = "".join(lines)
+    read = len(lines)
+    if quoted and text.count('"') % 2:
+        more = []
+        for line in source:
+            more.append(line)
+            if line.count('"') % 2:
+                break
+        text += "".join(more)
+        read += len(more)
+    return text, read
+
+
+def _parse_csv(header, text, first_line):
+    # Rows of one chunk, skipping blank lines; index -> error for rows that cannot be used
+    reader = csv.reader(io.StringIO(text, newline=""))
+    rows, errors = [], {}
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return rows, errors
+        except csv.Error as e:
+            errors[len(rows)] = f"Malformed CSV at line {first_line + reader.line_num - 1}: {e}"
+            rows.append([])
+            continue
+        if not row:
+            continue
+        if len(row) != len(header):
+            errors[len(rows)] = f"Row has {len(row)} fields, expected {len(header)}"
+        rows.append(row)
+
+
+def _parse_jsonl(text, first_line):
+    # Records of one chunk, skipping blank lines; index -> error for lines that are not JSON objects
+    records, errors = [], {}
+    for offset, line in enumerate(io.StringIO(text, newline="")):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            errors[len(records)] = f"Invalid JSON at line {first_line + offset}: {e}"
+            record = {}
+        else:
+            if not isinstance(record, dict):
+                errors[len(records)] = f"Line {first_line + offset} is not a JSON object"
+                record = {}
+        records.append(record)
+    return records, errors
+
+
+def _score_chunk(file_format, header, text, first_line):
+    """
+    Worker: parse, score and format one chunk of raw input text; returns (row count, output text).
+
+    first_line is the chunk's first line number in the input file, for error messages.
+    """
+    if file_format == "csv":
+        rows, errors = _parse_csv(header, text, first_line)
+        good = [row for index, row in enumerate(rows) if index not in errors] if errors else rows
+        positions = {name: header.index(name) for name in INPUT_COLUMNS if name in header}
+        columns = [_csv_column(name, [row[positions[name]] for row in good]) if name in positions
+                   else [_parse_value(name, None)] * len(good)
+                   for name in INPUT_COLUMNS]
+    else:
+        rows, errors = _parse_jsonl(text, first_line)
+        good = [record for index, record in enumerate(rows) if index not in errors] if errors else rows
+        columns = [[_parse_value(name, record.get(name)) for record in good] for name in INPUT_COLUMNS]
+    try:
+        scored = calculate_news_scores_batch(*columns)
+        output = _batch_output(scored)
+    except (TypeError, ValueError):
+        # At least one invalid row: score row by row so only the invalid rows are flagged
+        output = [_row_output(*row) for row in zip(*columns)]
+    if errors:
+        # Rows that could not be parsed are reported in place, in input order
+        output = iter(output)
+        output = [(None, None, None, "", errors[index]) if index in errors else next(output)
+                  for index in range(len(rows))]
+
+    if file_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for row, extra in zip(rows, output):
+            # Pad short rows so the NEWS2 columns still line up under their headers
+            writer.writerow(row + [""] * (len(header) - len(row)) + list(extra))
+        return len(rows), buffer.getvalue()
+
+    return len(rows), "".join(
+        json.dumps({**record, **dict(zip(OUTPUT_COLUMNS, extra))}) + "\n" for record, extra in zip(rows, output))
+
+
+def _batch_output(scored):
+    score = scored["score"]
+    bands = _BAND_NAMES[np.searchsorted(_BAND_MINIMA, np.maximum(score, 0), side="right") - 1]
+    threes = ((scored["sub_scores"] == 3) << np.arange(len(NEWS_PARAMETERS))).sum(axis=1)
+    output = []
+    for row_score, band, mask in zip(score.tolist(), bands.tolist(), threes.tolist()):
+        if row_score < 0:
+            output.append((None, None, None, "", "Missing too many parameters"))
+        else:
+            output.append((row_score, band, mask != 0, _NAMES_BY_MASK[mask], ""))
+    return output
+
+
+def _row_output(respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen):
+    vitals = [None if isinstance(value, float) and math.isnan(value) else value
+              for value in (respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp)]
+    try:
+        result = score_news(*vitals, consciousness, on_oxygen)
+    except (TypeError, ValueError) as e:
+        return None, None, None, "", str(e)
+    if result.score is None:
+        return None, None, None, "", "Missing too many parameters"
+    return result.score, result.band, result.param_received_3, ";".join(result.params_with_3_points), ""
+
+
+def _csv_column(name, values):
+    # Numeric columns are converted by NumPy in one pass; fall back to per-value parsing on bad input
+    if name in NUMERIC_COLUMNS:
+        try:
+            return np.fromiter((float(value) if value else math.nan for value in values), np.float64, len(values))
+        except ValueError:
+            pass
+    return [_parse_value(name, value) for value in values]
+
+
+def _parse_value(name, value):
+    # CSV gives strings, JSON gives typed values; empty or absent readings become NaN/None
+    if value is None or value == "":
+        return None if name in ("consciousness", "on_oxygen") else math.nan
+    if name == "consciousness":
+        return value
+    if name == "on_oxygen":
+        return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "y")
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _guess_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return "csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score exported NEWS2 observations in parallel.")
+    parser.add_argument("input", help="CSV (with header) or JSON-lines file of observations")
+    parser.add_argument("output", help="Where to write the rescored rows")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Input/output format (default: from extension)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows per chunk (default: 100000)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    args = parser.parse_args(argv)
+
+    summary = rescore_file(args.input, args.output, args.format, args.chunk_size, args.workers,
+                           progress=None if args.quiet else sys.stderr)
+    print(f"Rescored {summary['rows']} rows in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
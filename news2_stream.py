@@ -0,0 +1,161 @@
+# news2_stream.py
+
+from collections import namedtuple
+
+from intraday_sync import IntradaySeries, parse_intraday
+from news2_algo import NEWS_PARAMETERS, NEWSResult, clinical_band, parameter_points
+
+# Emitted by StreamingNEWSScorer when something clinically meaningful changes.
+# params_with_3_points is a tuple in NEWS_PARAMETERS order; previous_* are None for the first score.
+NEWSEvent = namedtuple("NEWSEvent", ["patient_id", "score", "band", "params_with_3_points",
+                                     "previous_score", "previous_band", "previous_params_with_3_points"])
+
+_PARAMETER_INDEX = {parameter: index for index, parameter in enumerate(NEWS_PARAMETERS)}
+_PARAMETER_INDEX["SpO2_scale1"] = _PARAMETER_INDEX["SpO2"]
+_REQUIRED_MASK = 0b001111  # respiration_rate, SpO2, temperature, pulse
+
+
+class StreamingNEWSScorer:
+    """
+    Keeps the current NEWS2 sub-scores for one patient and updates them one reading at a time.
+
+    Vitals arrive at different rates (heart rate every minute, SpO2, breathing rate and
+    temperature nightly), so instead of re-scoring the whole vector on every tick the scorer
+    swaps the changed parameter's points in and out of a running total. update() returns a
+    NEWSEvent only when the total, the clinical band or the set of parameters scoring 3
+    changes, and None otherwise, so callers can skip the ticks where nothing changed.
+
+    As with calculate_news_score, there is no score until respiration rate, SpO2,
+    temperature and pulse have all been received.
+    """
+
+    def __init__(self, patient_id):
+        self.patient_id = patient_id
+        self.readings = dict.fromkeys(NEWS_PARAMETERS)
+        self.on_oxygen = None
+        self.score = None
+        self.band = None
+        self.params_with_3_points = ()
+        self._sub_scores = [0] * len(NEWS_PARAMETERS)
+        self._total = 0
+        self._present = 0
+        self._threes = 0
+        self._emitted_threes = 0
+
+    def update(self, parameter, value):
+        """
+        Apply a new reading for one parameter.
+
+        Parameters:
+        - parameter: one of NEWS_PARAMETERS ('SpO2_scale1' is accepted for 'SpO2'), or 'on_oxygen'
+        - value: the new reading, or None if the parameter is no longer available
+
+        Returns:
+        - NEWSEvent if the score, band or parameters scoring 3 changed, otherwise None
+        """
+        self._apply(parameter, value)
+        return self._emit()
+
+    def update_many(self, **readings):
+        """Apply several readings at once (keyword names as for update) and emit at most one event."""
+        for parameter, value in readings.items():
+            self._apply(parameter, value)
+        return self._emit()
+
+    def update_from_patient_data(self, data):
+        """
+        Apply the latest heart rate from a DataCollector/DataCollectorFitbit get_patient_data result.
+
+        Returns:
+        - NEWSEvent or None, as for update
+        """
+        heart_rate = (data or {}).get('heart_rate')
+        if heart_rate is None:
+            return None
+        if not isinstance(heart_rate, IntradaySeries):
+            heart_rate = parse_intraday(heart_rate)
+        if not len(heart_rate.values):
+            return None
+        return self.update("pulse", int(heart_rate.values[-1]))
+
+    def result(self):
+        """Current state as a NEWSResult, the same shape score_news returns."""
+        missing = ~self._present & ((1 << len(NEWS_PARAMETERS)) - 1)
+        if self.score is None:
+            return NEWSResult(None, None, bytes(len(NEWS_PARAMETERS)), 0, missing)
+        return NEWSResult(self.score, self.band, bytes(self._sub_scores), self._threes, missing)
+
+    def _apply(self, parameter, value):
+        if parameter == "on_oxygen":
+            # Recorded for display; NEWS2 scale 1 as implemented here does not score it
+            self.on_oxygen = value
+            return
+        try:
+            index = _PARAMETER_INDEX[parameter]
+        except KeyError:
+            raise ValueError(f"Unknown NEWS parameter: {parameter}") from None
+
+        bit = 1 << index
+        points = 0 if value is None else parameter_points(parameter, value)
+        self._total += points - self._sub_scores[index]
+        self._sub_scores[index] = points
+        self.readings[NEWS_PARAMETERS[index]] = value
+        if value is None:
+            self._present &= ~bit
+        else:
+            self._present |= bit
+        if points == 3:
+            self._threes |= bit
+        else:
+            self._threes &= ~bit
+
+    def _emit(self):
+        if self._present & _REQUIRED_MASK != _REQUIRED_MASK:
+            score, band, threes = None, None, 0
+        else:
+            score, band, threes = self._total, clinical_band(self._total).name, self._threes
+
+        if score == self.score and band == self.band and threes == self._emitted_threes:
+            return None
+
+        event = NEWSEvent(self.patient_id, score, band,
+                          tuple(name for index, name in enumerate(NEWS_PARAMETERS) if threes >> index & 1),
+                          self.score, self.band, self.params_with_3_points)
+        self.score, self.band, self.params_with_3_points = score, band, event.params_with_3_points
+        self._emitted_threes = threes
+        return event
+
+
+class WardNEWSScorer:
+    """
+    Holds one StreamingNEWSScorer per patient so a whole ward can be fed from a single stream.
+
+    Scorers are created on first use; update() returns the same NEWSEvent-or-None as the
+    per-patient scorer.
+    """
+
+    def __init__(self):
+        self.scorers = {}
+
+    def scorer(self, patient_id):
+        scorer = self.scorers.get(patient_id)
+        if scorer is None:
+            scorer = self.scorers[patient_id] = StreamingNEWSScorer(patient_id)
+        return scorer
+
+    def update(self, patient_id, parameter, value):
+        return self.scorer(patient_id).update(parameter, value)
+
+    def update_many(self, patient_id, **readings):
+        return self.scorer(patient_id).update_many(**readings)
+
+
+# Example usage
+if __name__ == "__main__":
+    scorer = StreamingNEWSScorer("TEST001")
+    print(scorer.update_many(respiration_rate=18, SpO2_scale1=99, temperature=36.6, pulse=54, systolic_bp=123, consciousness='A'))
+
+    # Minute-by-minute heart rate: only the readings that change the band or the 3-point set emit events
+    for pulse in (55, 56, 92, 95, 131, 135, 80):
+        event = scorer.update("pulse", pulse)
+        print(f"pulse={pulse}: {event if event else 'no change'}")
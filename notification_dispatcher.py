@@ -0,0 +1,441 @@
+# notification_dispatcher.py
+
+import heapq
+import itertools
+import queue
+import random
+import smtplib
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from email.message import EmailMessage
+
+from alert_system import ALERT_LEVELS_BY_NAME
+from config import ALERT_EMAIL_FROM, ALERT_RECIPIENTS, ALERT_SMTP_HOST, ALERT_SMTP_PORT
+
+# A snapshot of an Alert at the moment it was notified; `enqueued` is time.monotonic() and is
+# what delivery latency is measured from
+Notification = namedtuple("Notification", ["alert_id", "patient_id", "level", "severity", "reason", "message",
+                                           "created_at", "enqueued"])
+
+# Who is told about alerts of at least min_severity, and how
+Recipient = namedtuple("Recipient", ["name", "channel", "address", "min_severity"])
+
+OVERFLOW_POLICIES = ('drop', 'escalate')
+
+
+def notification_from_alert(alert):
+    return Notification(alert.id, alert.patient_id, alert.level.name, alert.severity, alert.reason, alert.message,
+                        time.time(), time.monotonic())
+
+
+def parse_recipients(spec=ALERT_RECIPIENTS):
+    """
+    Parse a recipient list such as "email:ward7@example.nhs.uk:medium,sms:+447700900123:high".
+
+    The level is the lowest alert level (see alert_system.ALERT_LEVELS) the recipient is sent;
+    it defaults to every level.
+    """
+    recipients = []
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        channel, _, rest = entry.partition(':')
+        address, _, level = rest.rpartition(':')
+        if level not in ALERT_LEVELS_BY_NAME:
+            address, level = rest, None
+        min_severity = ALERT_LEVELS_BY_NAME[level].severity if level else 1
+        recipients.append(Recipient(address, channel, address, min_severity))
+    return recipients
+
+
+def summary_line(notifications):
+    """One-line summary of a batch, e.g. "NEWS2 HIGH alert: patient P1" or "3 NEWS2 alerts, highest HIGH: patient P1"."""
+    top = max(notifications, key=lambda n: (n.severity, -n.enqueued))
+    level = top.level.replace('_', '-').upper()
+    if len(notifications) == 1:
+        return f"NEWS2 {level} alert: patient {top.patient_id}"
+    return f"{len(notifications)} NEWS2 alerts, highest {level}: patient {top.patient_id}"
+
+
+def _by_urgency(notifications):
+    return sorted(notifications, key=lambda n: (-n.severity, n.enqueued))
+
+
+class Channel:
+    """
+    One transport (email, SMS, in-app ...). Subclasses set `name` and implement send(), which
+    delivers a coalesced batch of Notifications to one address and raises on failure.
+    """
+    name = None
+
+    def send(self, address, notifications):
+        raise NotImplementedError
+
+
+class SMTPChannel(Channel):
+    """Sends each batch as one email. Point host/port at fake_smtp_server.FakeSMTPServer for testing."""
+    name = 'email'
+
+    def __init__(self, host=ALERT_SMTP_HOST, port=ALERT_SMTP_PORT, sender=ALERT_EMAIL_FROM,
+                 username=None, password=None, starttls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, address, notifications):
+        message = EmailMessage()
+        message['Subject'] = summary_line(notifications)
+        message['From'] = self.sender
+        message['To'] = address
+        lines = []
+        for notification in _by_urgency(notifications):
+            raised = time.strftime('%H:%M:%S', time.localtime(notification.created_at))
+            lines.append(f"[{raised}] ({notification.reason}) {notification.message}")
+        message.set_content("\n".join(lines) + "\n")
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+class MemoryChannel(Channel):
+    """
+    Keeps what it is sent in per-address inboxes in memory.
+
+    Used as the in-app channel (the dashboard reads inbox()) and as an SMS sink for tests:
+    with max_length set, each batch is flattened to one text of at most that many characters.
+    fail_next(n) makes the next n sends raise, to exercise retries.
+    """
+
+    def __init__(self, name='in_app', max_length=None, keep=1000):
+        self.name = name
+        self.max_length = max_length
+        self.sent = 0
+        self._inboxes = defaultdict(lambda: deque(maxlen=keep))
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def fail_next(self, n=1):
+        with self._lock:
+            self._failures += n
+
+    def send(self, address, notifications):
+        with self._lock:
+            if self._failures:
+                self._failures -= 1
+                raise ConnectionError(f"{self.name} delivery to {address} failed")
+            if self.max_length is None:
+                item = _by_urgency(notifications)
+            else:
+                item = "; ".join([summary_line(notifications)] + [n.message for n in _by_urgency(notifications)])
+                if len(item) > self.max_length:
+                    item = item[:self.max_length - 1] + "…"
+            self._inboxes[address].append((time.time(), item))
+            self.sent += 1
+
+    def inbox(self, address):
+        """(time, item) pairs delivered to an address, oldest first."""
+        with self._lock:
+            return list(self._inboxes.get(address, ()))
+
+
+class _Batch:
+    __slots__ = ("recipient", "notifications", "attempts", "due", "open", "escalation")
+
+    def __init__(self, recipient, escalation=False):
+        self.recipient = recipient
+        self.notifications = []
+        self.attempts = 0
+        self.due = None
+        self.open = True  # still collecting notifications in its coalescing window
+        self.escalation = escalation
+
+
+class NotificationDispatcher:
+    """
+    Delivers alert notifications in the background so the scoring loop never waits on SMTP or
+    an SMS gateway.
+
+    dispatch() snapshots an Alert, routes it to every recipient whose min_severity it meets and
+    returns at once. Notifications for the same recipient that arrive within coalesce_window
+    seconds go out together as one message; anything at urgent_severity or above (high, by
+    default) sends the recipient's batch straight away. A pool of worker threads does the
+    sending. A failed send is retried with exponential backoff (backoff, 2 x backoff, ... up to
+    max_backoff seconds, with jitter) up to max_attempts times, after which the notifications
+    are forwarded to the escalation recipients.
+
+    At most max_pending notifications are held. When full, the lowest-severity, oldest pending
+    notification is dropped to make room, or the new one is dropped if nothing pending is less
+    severe. With overflow='escalate' the escalation recipients are also told that notifications
+    are being dropped (at most once per coalesce window). Delivery latency (dispatch to sent)
+    is recorded for every notification; see stats().
+
+    Parameters:
+    - channels: Channel instances, one per transport name
+    - recipients: Recipients to route alerts to (default: parse_recipients() of config.ALERT_RECIPIENTS)
+    - escalation: Recipients told about undeliverable notifications and overflow
+    - workers: sending threads
+    - max_pending: bound on notifications waiting to be sent
+    - coalesce_window: seconds a recipient's notifications are collected before sending
+    - urgent_severity: severity that sends immediately
+    - max_attempts / backoff / max_backoff: retry policy
+    - overflow: 'drop' or 'escalate'
+    """
+
+    def __init__(self, channels, recipients=None, escalation=(), workers=4, max_pending=10_000, coalesce_window=5.0,
+                 urgent_severity=3, max_attempts=5, backoff=1.0, max_backoff=60.0, overflow='drop'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.channels = {channel.name: channel for channel in channels}
+        self.recipients = list(parse_recipients() if recipients is None else recipients)
+        self.escalation = list(escalation)
+        for recipient in self.recipients + self.escalation:
+            if recipient.channel not in self.channels:
+                raise ValueError(f"no channel for {recipient.channel!r} (recipient {recipient.name})")
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self.urgent_severity = urgent_severity
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.overflow = overflow
+        self.counters = dict.fromkeys(('dispatched', 'unrouted', 'queued', 'sent', 'batches', 'send_failures',
+                                       'retries', 'failed', 'dropped', 'escalated', 'peak_pending'), 0)
+        self.latency = {'last': 0.0, 'max': 0.0, 'total': 0.0}
+        self.last_error = None
+
+        self._recent_latencies = deque(maxlen=10_000)
+        self._buckets = {}  # (channel, address) -> open _Batch
+        self._timers = []  # (due, seq, batch); entries whose due no longer matches are stale
+        # (severity, enqueued, seq, batch, notification) for every notification in an open,
+        # non-escalation batch, least severe and oldest first; entries of closed batches are stale
+        self._droppable = []
+        self._seq = itertools.count()
+        self._pending = 0
+        self._last_overflow_notice = None
+        self._closing = False
+        self._cond = threading.Condition()
+        self._ready = queue.Queue()
+        self._threads = [threading.Thread(target=self._run_timers, name='notify-timers', daemon=True)]
+        self._threads += [threading.Thread(target=self._run_worker, name=f'notify-{i}', daemon=True)
+                          for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def pending(self):
+        """Notifications accepted and not yet sent, failed or dropped."""
+        return self._pending
+
+    def dispatch(self, alert):
+        """
+        Queue an Alert (or a Notification) for every matching recipient without blocking.
+
+        Returns:
+        - the number of recipients it was queued for
+        """
+        notification = alert if isinstance(alert, Notification) else notification_from_alert(alert)
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("dispatcher is closed")
+            self.counters['dispatched'] += 1
+            targets = [r for r in self.recipients if notification.severity >= r.min_severity]
+            if not targets:
+                self.counters['unrouted'] += 1
+            for recipient in targets:
+                self._enqueue(recipient, notification)
+            return len(targets)
+
+    def flush(self, timeout=None):
+        """Send every open batch now and wait until nothing is pending; returns False on timeout."""
+        with self._cond:
+            now = time.monotonic()
+            for batch in self._buckets.values():
+                self._schedule(batch, now)
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout=None):
+        """Flush, then stop the timer and worker threads."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for _ in range(len(self._threads) - 1):
+            self._ready.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        return flushed
+
+    # Queueing
+
+    def _enqueue(self, recipient, notification, escalation=False):
+        # Escalations are never refused, so overflow can always be reported
+        if not escalation and self._pending >= self.max_pending:
+            if not self._make_room(notification):
+                return
+        key = (recipient.channel, recipient.address, escalation)
+        batch = self._buckets.get(key)
+        now = time.monotonic()
+        if batch is None:
+            batch = self._buckets[key] = _Batch(recipient, escalation)
+            self._schedule(batch, now + self.coalesce_window)
+        batch.notifications.append(notification)
+        if not escalation:
+            heapq.heappush(self._droppable, (notification.severity, notification.enqueued, next(self._seq), batch,
+                                             notification))
+            # Rebuild the heap if closed batches have left it mostly stale
+            if len(self._droppable) > 2 * self._pending + 64:
+                self._droppable = [entry for entry in self._droppable if entry[3].open]
+                heapq.heapify(self._droppable)
+        self._pending += 1
+        self.counters['queued'] += 1
+        self.counters['peak_pending'] = max(self.counters['peak_pending'], self._pending)
+        if notification.severity >= self.urgent_severity and batch.due > now:
+            self._schedule(batch, now)
+
+    def _make_room(self, notification):
+        # Drop the least severe, oldest notification still waiting in a coalescing window
+        droppable = self._droppable
+        while droppable and not droppable[0][3].open:
+            heapq.heappop(droppable)
+        self.counters['dropped'] += 1
+        if self.overflow == 'escalate':
+            self._report_overflow()
+        if not droppable or droppable[0][0] >= notification.severity:
+            return False
+        _, _, _, batch, queued = heapq.heappop(droppable)
+        batch.notifications = [pending for pending in batch.notifications if pending is not queued]
+        self._pending -= 1
+        if not batch.notifications:
+            del self._buckets[(batch.recipient.channel, batch.recipient.address, False)]
+            batch.open, batch.due = False, None
+        return True
+
+    def _report_overflow(self):
+        now = time.monotonic()
+        if self._last_overflow_notice is not None and now - self._last_overflow_notice < self.coalesce_window:
+            return
+        self._last_overflow_notice = now
+        message = (f"Alert notification queue is full ({self.max_pending} pending): "
+                   f"{self.counters['dropped']} notifications dropped so far")
+        notice = Notification(None, None, 'high', self.urgent_severity, 'overflow', message, time.time(), now)
+        for recipient in self.escalation:
+            self._enqueue(recipient, notice, escalation=True)
+            self.counters['escalated'] += 1
+
+    def _schedule(self, batch, due):
+        batch.due = due
+        heapq.heappush(self._timers, (due, next(self._seq), batch))
+        self._cond.notify_all()
+
+    # Background threads
+
+    def _run_timers(self):
+        # Hand batches to the workers as their coalescing window or retry backoff ends
+        with self._cond:
+            while True:
+                while self._timers and self._timers[0][2].due != self._timers[0][0]:
+                    heapq.heappop(self._timers)
+                if not self._timers:
+                    if self._closing:
+                        return
+                    self._cond.wait()
+                    continue
+                due, _, batch = self._timers[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._timers)
+                batch.due = None
+                if batch.open:
+                    batch.open = False
+                    del self._buckets[(batch.recipient.channel, batch.recipient.address, batch.escalation)]
+                self._ready.put(batch)
+
+    def _run_worker(self):
+        while True:
+            batch = self._ready.get()
+            if batch is None:
+                return
+            recipient = batch.recipient
+            try:
+                self.channels[recipient.channel].send(recipient.address, batch.notifications)
+            except Exception as e:
+                self._send_failed(batch, e)
+                continue
+            now = time.monotonic()
+            with self._cond:
+                for notification in batch.notifications:
+                    latency = now - notification.enqueued
+                    self._recent_latencies.append(latency)
+                    self.latency['last'] = latency
+                    self.latency['max'] = max(self.latency['max'], latency)
+                    self.latency['total'] += latency
+                self.counters['sent'] += len(batch.notifications)
+                self.counters['batches'] += 1
+                self._pending -= len(batch.notifications)
+                self._cond.notify_all()
+
+    def _send_failed(self, batch, error):
+        recipient = batch.recipient
+        with self._cond:
+            batch.attempts += 1
+            self.counters['send_failures'] += 1
+            self.last_error = error
+            if batch.attempts < self.max_attempts:
+                delay = min(self.backoff * 2 ** (batch.attempts - 1), self.max_backoff) * random.uniform(0.5, 1.0)
+                self.counters['retries'] += 1
+                self._schedule(batch, time.monotonic() + delay)
+                return
+            print(f"Giving up on {len(batch.notifications)} notifications to {recipient.name} "
+                  f"({recipient.channel}) after {batch.attempts} attempts: {error}")
+            self.counters['failed'] += len(batch.notifications)
+            self._pending -= len(batch.notifications)
+            if not batch.escalation:
+                for notification in batch.notifications:
+                    for escalation in self.escalation:
+                        self._enqueue(escalation, notification, escalation=True)
+                        self.counters['escalated'] += 1
+            self._cond.notify_all()
+
+    def stats(self):
+        """Queue depth, delivery counts and delivery latency (seconds) for monitoring."""
+        with self._cond:
+            sent = self.counters['sent']
+            recent = sorted(self._recent_latencies)
+
+            def percentile(p):
+                return recent[min(int(p * len(recent)), len(recent) - 1)] if recent else 0.0
+
+            return {**self.counters, 'pending': self._pending, 'open_batches': len(self._buckets),
+                    'latency_last': self.latency['last'], 'latency_max': self.latency['max'],
+                    'latency_mean': self.latency['total'] / sent if sent else 0.0,
+                    'latency_p50': percentile(0.5), 'latency_p95': percentile(0.95)}
+
+
+# Example usage
+if __name__ == "__main__":
+    from alert_system import AlertSystem
+    from fake_smtp_server import FakeSMTPServer
+
+    with FakeSMTPServer() as smtp:
+        sms = MemoryChannel('sms', max_length=160)
+        dispatcher = NotificationDispatcher(
+            [SMTPChannel(smtp.host, smtp.port), sms],
+            recipients=parse_recipients("email:ward7@example.nhs.uk:low_medium,sms:+447700900123:high"),
+            coalesce_window=0.5)
+        alerts = AlertSystem(dispatcher=dispatcher)
+        for patient_id, score in [("P1", 5), ("P2", 6), ("P3", 7)]:
+            alerts.generate_alert(patient_id, score)
+        dispatcher.close(timeout=5)
+        for sender, recipients, message in smtp.messages:
+            print(f"Email to {recipients}: {message['Subject']}")
+        print("SMS:", sms.inbox('+447700900123'))
+        print(dispatcher.stats())
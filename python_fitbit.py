@@ -24,39 +24,57 @@ from fitbit.api import FitbitOauth2Client
 from oauthlib.oauth2.rfc6749.errors import TokenExpiredError
 from dotenv import load_dotenv
 
+from config import FITBIT_API_BASE, FITBIT_AUTHORIZE_URL, FITBIT_SUBSCRIBER_ID, FITBIT_TOKEN_URL
+from intraday_sync import INTRADAY_SERIES, IntradaySync, parse_intraday
+from rate_limiter import get_rate_limit_budget
+from token_store import get_token_store
+
 load_dotenv()
 
 class DataCollectorFitbit:
-    def __init__(self):
+    def __init__(self, token_store=None):
         self.client_id = os.getenv('FITBIT_CLIENT_ID')
         self.client_secret = os.getenv('FITBIT_CLIENT_SECRET')
         self.redirect_uri = 'https://localhost:8501/'
         self.client = None
         self.user_id = None
+        self.token_store = token_store
+        self.intraday = IntradaySync()
+
+    def _store(self):
+        if self.token_store is None:
+            self.token_store = get_token_store()
+        return self.token_store
 
     def get_user_id(self):
         if not self.client:
             raise Exception("Not authorized. Please authorize first.")
         
         if not self.user_id:
-            try:
-                profile = self.client.user_profile_get()
-                self.user_id = profile['user']['encodedId']
-            except TokenExpiredError:
-                self.refresh_token()
-                profile = self.client.user_profile_get()
-                self.user_id = profile['user']['encodedId']
+            self._use_fresh_token()
+            profile = self._call_with_refresh(self.client.user_profile_get)
+            self.user_id = profile['user']['encodedId']
         
         return self.user_id
 
     def get_auth_url(self):
-        oauth = FitbitOauth2Client(self.client_id, self.client_secret)
+        oauth = self._oauth_client()
         return oauth.authorize_token_url(redirect_uri=self.redirect_uri, scope=['activity', 'heartrate', 'sleep', 'profile'])[0]
 
     def complete_authorization(self, auth_code):
-        oauth = FitbitOauth2Client(self.client_id, self.client_secret)
+        oauth = self._oauth_client()
         token = oauth.fetch_access_token(auth_code, self.redirect_uri)
-        self.client = Fitbit(self.client_id, self.client_secret, oauth2=True, access_token=token['access_token'], refresh_token=token['refresh_token'])
+        self.user_id = token.get('user_id') or self.user_id
+        token = self._store().save(self.user_id, token)
+        self.client = Fitbit(self.client_id, self.client_secret, oauth2=True, access_token=token['access_token'],
+                             refresh_token=token['refresh_token'], expires_at=token['expires_at'],
+                             refresh_cb=lambda new_token: self._store().save(self.user_id, new_token))
+        self.client.API_ENDPOINT = FITBIT_API_BASE
+        self._point_at_endpoints(self.client.client)
+        # python-fitbit refreshes by itself on a 401 expired_token; send that through the store too
+        self.client.client.refresh_token = self.refresh_token
+        # Keep the shared rate-limit budget in step with every response's Fitbit-Rate-Limit-* headers
+        self.client.client.session.hooks['response'].append(self._observe_rate_limit)
         return token
 
     def subscribe_to_updates(self):
@@ -67,11 +85,10 @@ class DataCollectorFitbit:
             user_id = self.get_user_id()
             # The subscription ID should be unique for each subscription
             subscription_id = f"sub_{user_id}"
-            response = self.client.subscription(subscription_id, 'activities')
+            # Notifications go to the subscriber endpoint configured for the app (see webhook_receiver.py)
+            response = self._call_with_refresh(self.client.subscription, subscription_id, FITBIT_SUBSCRIBER_ID,
+                                               collection='activities')
             return user_id, response
-        except TokenExpiredError:
-            self.refresh_token()
-            return self.subscribe_to_updates()
         except Exception as e:
             print(f"Subscription error: {e}")
             raise
@@ -81,28 +98,63 @@ class DataCollectorFitbit:
         if not self.client:
             raise Exception("Not authorized. Please authorize first.")
 
-        try:
-            # Fetch heart rate data
-            heart_rate_data = self.client.intraday_time_series('activities/heart', detail_level='1min')
+        self._use_fresh_token()
 
-            # Fetch steps data
-            steps_data = self.client.time_series('activities/steps', period='1d')
+        # Fetch only the heart rate readings since the last sync and merge them into the local history
+        for day, start, end in self.intraday.windows(patient_id, 'heart_rate'):
+            heart_rate_data = self._call_with_refresh(self.client.intraday_time_series, INTRADAY_SERIES['heart_rate'],
+                                                      base_date=day, detail_level='1min', start_time=start, end_time=end)
+            self.intraday.merge(patient_id, 'heart_rate', day, parse_intraday(heart_rate_data))
 
-            # You can add more data points as needed
+        # Fetch steps data
+        steps_data = self._call_with_refresh(self.client.time_series, 'activities/steps', period='1d')
 
-            return {
-                'patient_id': patient_id,
-                'heart_rate': heart_rate_data,
-                'steps': steps_data,
-            }
-        except TokenExpiredError:
-            self.refresh_token()
-            return self.get_patient_data(patient_id)
+        # You can add more data points as needed
+
+        return {
+            'patient_id': patient_id,
+            'date': day,
+            'heart_rate': self.intraday.series(patient_id, 'heart_rate', day),
+            'steps': steps_data,
+        }
 
     def refresh_token(self):
-        token = self.client.client.refresh_token()
+        # Goes through the shared store so concurrent callers share one refresh of the single-use refresh token
+        token = self._store().refresh(self.user_id, force=True)
         self.client.client.session.token = token
 
+    def _oauth_client(self):
+        return self._point_at_endpoints(FitbitOauth2Client(self.client_id, self.client_secret))
+
+    @staticmethod
+    def _point_at_endpoints(oauth):
+        # python-fitbit hard-codes api.fitbit.com; use the configured endpoints so a local stand-in can be used
+        oauth.authorization_url = FITBIT_AUTHORIZE_URL
+        oauth.request_token_url = oauth.access_token_url = oauth.refresh_token_url = FITBIT_TOKEN_URL
+        # No automatic refresh inside requests_oauthlib: an expired token raises TokenExpiredError
+        # and every refresh goes through the single-flight TokenStore (see _call_with_refresh)
+        oauth.session.auto_refresh_url = None
+        return oauth
+
+    def _observe_rate_limit(self, response, *args, **kwargs):
+        get_rate_limit_budget().observe(self.user_id, response.headers, response.status_code)
+
+    def _use_fresh_token(self):
+        """Load the user's token from the store, which refreshes it shortly before it expires."""
+        if self.user_id is not None:
+            self.client.client.session.token = self._store().get_token(self.user_id)
+
+    def _call_with_refresh(self, method, *args, **kwargs):
+        # Every API call is one request; raises rate_limiter.RateLimited instead of sending it into a 429.
+        # An expired token is caught before anything is sent, so the retry uses the same request.
+        get_rate_limit_budget().acquire(self.user_id)
+        # Proactive refresh makes expiry rare; if the API still says expired, refresh once and retry once
+        try:
+            return method(*args, **kwargs)
+        except TokenExpiredError:
+            self.refresh_token()
+            return method(*args, **kwargs)
+
 def test_data_collector_fitbit():
     collector = DataCollectorFitbit()
     auth_url = collector.get_auth_url()
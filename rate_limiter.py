@@ -0,0 +1,349 @@
+# rate_limiter.py
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from config import FITBIT_APP_REQUESTS_PER_HOUR
+
+# Fitbit allows about 150 requests per user per hour
+USER_REQUESTS_PER_HOUR = 150
+
+# Poll order by NEWS band: red first, then amber, then everyone else (unknown counts as low risk)
+BAND_PRIORITY = {'high': 0, 'medium': 1, 'low': 2, 'zero': 3, None: 2}
+
+# Bands that may spend the last part of a budget; lower-risk patients are deferred instead
+RESERVED_FOR_BANDS = ('high', 'medium')
+
+# Seconds between runs of a scheduled PriorityFetchQueue (high-band patients are polled every minute)
+_RUN_INTERVAL = 10
+
+# Share of each budget kept back for RESERVED_FOR_BANDS
+DEFAULT_RESERVE_FRACTION = 0.2
+
+
+def reserve_for(band, reserve_fraction=DEFAULT_RESERVE_FRACTION):
+    """Fraction of a budget that a fetch for a patient in `band` must leave unspent."""
+    return 0.0 if band in RESERVED_FOR_BANDS else reserve_fraction
+
+
+class RateLimited(requests.exceptions.RequestException):
+    """Raised instead of sending a request the user's (or the app's) budget cannot cover."""
+
+    def __init__(self, user_id, wait):
+        super().__init__(f"Rate limit budget for user {user_id} exhausted; retry in {wait:.0f}s")
+        self.user_id = user_id
+        self.wait = wait
+
+
+class TokenBucket:
+    """
+    Request budget that refills continuously up to its capacity.
+
+    Once the server has reported its own window (see sync), the bucket follows it instead:
+    nothing is refilled until the reported reset, and then the whole capacity comes back.
+
+    Parameters:
+    - capacity: maximum number of requests that can be made in a burst
+    - period: seconds for the bucket to refill from empty to full
+    """
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.period = period
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.reset_at = None
+
+    def _refill(self, now):
+        if self.reset_at is not None:
+            if now >= self.reset_at:
+                self.tokens = self.capacity
+                self.reset_at = None
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        self._refill(time.monotonic())
+        return self.tokens
+
+    def try_acquire(self, count=1, reserve=0.0):
+        """Take `count` requests if that leaves at least `reserve` in the bucket; return whether it did."""
+        self._refill(time.monotonic())
+        if self.tokens - count < reserve:
+            return False
+        self.tokens -= count
+        return True
+
+    def release(self, count=1):
+        """Give back requests taken by try_acquire that were not used."""
+        self.tokens = min(self.capacity, self.tokens + count)
+
+    def wait_time(self, count=1):
+        """Seconds until `count` requests will be available."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= count:
+            return 0.0
+        if self.reset_at is not None:
+            return self.reset_at - now
+        return (count - self.tokens) / self.rate
+
+    def sync(self, remaining, reset_seconds=None, limit=None):
+        """Align the bucket with the server: `remaining` requests until the window resets in `reset_seconds`."""
+        now = time.monotonic()
+        if limit:
+            self.capacity = float(limit)
+            self.rate = self.capacity / self.period
+        self.tokens = min(self.capacity, float(remaining))
+        self.reset_at = now + reset_seconds if reset_seconds else None
+        self.updated = now
+
+
+class RateLimitBudget:
+    """
+    Per-user and per-app request budgets, kept in step with Fitbit's rate-limit headers.
+
+    Every response carries Fitbit-Rate-Limit-Limit / -Remaining / -Reset for the user the token
+    belongs to; observe() feeds them into that user's bucket, and a 429 empties it until the
+    reset (or Retry-After). The app bucket caps the total request rate across all users; Fitbit
+    reports no app-wide headers, so it is enforced locally and only refills with time.
+
+    Clients call acquire() before every request. A PriorityFetchQueue pays for a whole fetch up
+    front (see prepaid()), and requests made for that user while it runs draw on the payment.
+
+    Parameters:
+    - user_capacity / user_period: default per-user budget before any headers have been seen
+    - app_capacity / app_period: total budget across all users (None for no app-wide limit)
+    """
+
+    def __init__(self, user_capacity=USER_REQUESTS_PER_HOUR, user_period=3600, app_capacity=None, app_period=3600):
+        self.user_capacity = user_capacity
+        self.user_period = user_period
+        self.app = TokenBucket(app_capacity, app_period) if app_capacity else None
+        self.users = {}
+        self.throttled = 0
+        self.refused = 0
+        self._prepaid = {}  # user_id -> requests already taken from the buckets by prepaid()
+        self._lock = threading.Lock()
+
+    def _user(self, user_id):
+        bucket = self.users.get(user_id)
+        if bucket is None:
+            bucket = self.users[user_id] = TokenBucket(self.user_capacity, self.user_period)
+        return bucket
+
+    def try_acquire(self, user_id, count=1, reserve_fraction=0.0):
+        """
+        Reserve `count` requests for a user if both the user and app budgets allow it.
+
+        Parameters:
+        - reserve_fraction: fraction of each budget that must remain afterwards (keeps headroom for higher priorities)
+        """
+        with self._lock:
+            user = self._user(user_id)
+            if not user.try_acquire(count, reserve_fraction * user.capacity):
+                return False
+            if self.app is not None and not self.app.try_acquire(count, reserve_fraction * self.app.capacity):
+                user.release(count)
+                return False
+            return True
+
+    def acquire(self, user_id, band=None, count=1):
+        """
+        Take `count` requests for a user before sending them, from a prepaid() fetch if one is
+        running for the user, otherwise from the budgets (leaving the reserve unless `band` may
+        spend it).
+
+        Raises:
+        - RateLimited if the budget cannot cover the requests
+        """
+        with self._lock:
+            prepaid = self._prepaid.get(user_id, 0)
+            if prepaid >= count:
+                self._prepaid[user_id] = prepaid - count
+                return
+        if not self.try_acquire(user_id, count, reserve_for(band)):
+            with self._lock:
+                self.refused += 1
+            raise RateLimited(user_id, self.wait_time(user_id, count, reserve_for(band)))
+
+    @contextmanager
+    def prepaid(self, user_id, count):
+        """
+        Let acquire() draw up to `count` requests for a user that the caller has already taken
+        with try_acquire(); whatever is not used is given back to the budgets on exit.
+        """
+        with self._lock:
+            self._prepaid[user_id] = self._prepaid.get(user_id, 0) + count
+        try:
+            yield
+        finally:
+            with self._lock:
+                left = self._prepaid.pop(user_id, 0)
+                unused = min(count, left)
+                if left > unused:
+                    self._prepaid[user_id] = left - unused
+                if unused:
+                    self._user(user_id).release(unused)
+                    if self.app is not None:
+                        self.app.release(unused)
+
+    def wait_time(self, user_id, count=1, reserve_fraction=0.0):
+        """Seconds until `count` requests for a user will be available above the reserve."""
+        with self._lock:
+            user = self._user(user_id)
+            wait = user.wait_time(min(count + reserve_fraction * user.capacity, user.capacity))
+            if self.app is not None:
+                wait = max(wait, self.app.wait_time(min(count + reserve_fraction * self.app.capacity, self.app.capacity)))
+            return wait
+
+    def observe(self, user_id, headers, status_code=200):
+        """Update a user's budget from a response's rate-limit headers (and a 429 status)."""
+        remaining = headers.get('Fitbit-Rate-Limit-Remaining')
+        reset = headers.get('Fitbit-Rate-Limit-Reset')
+        limit = headers.get('Fitbit-Rate-Limit-Limit')
+        with self._lock:
+            user = self._user(user_id)
+            if status_code == 429:
+                self.throttled += 1
+                retry_after = headers.get('Retry-After', reset)
+                user.sync(0, float(retry_after) if retry_after else self.user_period, limit)
+            elif remaining is not None:
+                user.sync(remaining, float(reset) if reset else None, limit)
+
+
+class PriorityFetchQueue:
+    """
+    Queue of pending fetches that spends the rate-limit budget on the sickest patients first.
+
+    Fetches are ordered by NEWS band (red, amber, then low risk) and then by how long they have
+    been waiting. run() executes as many as the budget allows; low-risk fetches may not use the
+    last `reserve_fraction` of a budget, and anything that cannot run (or that runs out of budget
+    part way, raising RateLimited) stays queued, in order, for the next cycle instead of
+    triggering a 429.
+
+    To route a Scheduler's patient jobs through the queue, pass patient_job() as the job
+    function to Scheduler.add_patient_job and start the queue with schedule().
+
+    Parameters:
+    - budget: RateLimitBudget to draw from
+    - reserve_fraction: share of each budget kept back for amber and red patients
+    """
+
+    def __init__(self, budget, reserve_fraction=DEFAULT_RESERVE_FRACTION):
+        self.budget = budget
+        self.reserve_fraction = reserve_fraction
+        self.deferred = 0
+        self._heap = []
+        self._keys = set()  # keys of queued fetches, so a patient is queued at most once
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def submit(self, user_id, fetch, band=None, cost=1, key=None):
+        """
+        Queue a fetch for a patient.
+
+        Parameters:
+        - user_id: Fitbit user whose budget the fetch uses
+        - fetch: callable taking no arguments that performs the request(s)
+        - band: the patient's current NEWS band name ('high', 'medium', 'low', 'zero' or None)
+        - cost: number of API requests the fetch makes
+        - key: if given, the fetch is not queued while another with the same key is waiting
+
+        Returns:
+        - whether the fetch was queued
+        """
+        entry = (BAND_PRIORITY.get(band, BAND_PRIORITY[None]), time.monotonic(), next(self._counter), user_id, fetch,
+                 band, cost, key)
+        with self._lock:
+            if key is not None:
+                if key in self._keys:
+                    return False
+                self._keys.add(key)
+            heapq.heappush(self._heap, entry)
+            return True
+
+    def run(self, max_fetches=None):
+        """
+        Run queued fetches in priority order while the budget allows.
+
+        Returns:
+        - List of (user_id, band, result or exception) for the fetches that ran
+        """
+        with self._lock:
+            entries = [heapq.heappop(self._heap) for _ in range(len(self._heap))]
+
+        done, kept = [], []
+        for entry in entries:
+            _, _, _, user_id, fetch, band, cost, key = entry
+            if (max_fetches is not None and len(done) >= max_fetches) or \
+                    not self.budget.try_acquire(user_id, cost, reserve_for(band, self.reserve_fraction)):
+                kept.append(entry)
+                continue
+            try:
+                with self.budget.prepaid(user_id, cost):
+                    result = fetch()
+            except RateLimited:
+                kept.append(entry)
+                continue
+            except Exception as e:
+                result = e
+            done.append((user_id, band, result))
+            if key is not None:
+                with self._lock:
+                    self._keys.discard(key)
+
+        with self._lock:
+            self.deferred += len(kept)
+            for entry in kept:
+                heapq.heappush(self._heap, entry)
+        return done
+
+    def patient_job(self, scheduler, fetch, user_id_of=None, cost=1):
+        """
+        Job function for Scheduler.add_patient_job that queues fetch(patient_id) here, at the
+        patient's current band, instead of calling it straight away.
+
+        Parameters:
+        - scheduler: the Scheduler running the patient jobs (asked for each patient's band)
+        - fetch: called as fetch(patient_id) when the queue runs
+        - user_id_of: maps a patient id to their Fitbit user id (default: the same id)
+        - cost: number of API requests one fetch makes
+        """
+        def queue_fetch(patient_id):
+            user_id = user_id_of(patient_id) if user_id_of is not None else patient_id
+            self.submit(user_id, lambda: fetch(patient_id), band=scheduler.patient_band(patient_id), cost=cost,
+                        key=scheduler.patient_job_name(patient_id))
+        return queue_fetch
+
+    def schedule(self, scheduler, interval=_RUN_INTERVAL):
+        """
+        Run the queue every `interval` seconds on a Scheduler (see scheduler.py), starting now.
+
+        Returns:
+        - the Job
+        """
+        return scheduler.add_job('rate-limiter:fetch-queue', self.run, interval, job_class='fetch-queue')
+
+
+_default_budget = None
+_default_budget_lock = threading.Lock()
+
+
+def get_rate_limit_budget():
+    """Return the process-wide RateLimitBudget shared by all collectors."""
+    global _default_budget
+    with _default_budget_lock:
+        if _default_budget is None:
+            _default_budget = RateLimitBudget(app_capacity=FITBIT_APP_REQUESTS_PER_HOUR)
+        return _default_budget
@@ -0,0 +1,210 @@
+# response_cache.py
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import requests
+
+from config import RESPONSE_CACHE_PATH
+
+# Seconds a cached response stays fresh, by endpoint. The nightly summaries change at most once
+# a day; the activity summary and daily heart rate move during the day so they expire sooner.
+# Endpoints not listed here are not cached.
+DEFAULT_TTLS = (
+    (re.compile(r'/temp/core/date/'), 6 * 3600),
+    (re.compile(r'/spo2/date/'), 6 * 3600),
+    (re.compile(r'/br/date/'), 6 * 3600),
+    (re.compile(r'/hrv/date/'), 6 * 3600),
+    (re.compile(r'/activities/date/'), 15 * 60),
+    (re.compile(r'/activities/heart/date/[^/]+/1d\.json'), 15 * 60),
+)
+
+# Stale entries are kept this long past their expiry so they can still be revalidated, then
+# deleted (URLs carry the date, so old days are never asked for again). Checked at most hourly.
+KEEP_STALE_SECONDS = 2 * 86400
+_PRUNE_INTERVAL = 3600
+
+
+class ResponseCache:
+    """
+    Persistent HTTP response cache for slowly changing Fitbit endpoints.
+
+    A fresh entry (within its endpoint's TTL) is served from disk with no network call, so a
+    Streamlit rerun or repeated button press costs nothing for data that cannot have changed.
+    Once stale, the request is revalidated with If-None-Match / If-Modified-Since when the
+    stored response had an ETag or Last-Modified header, and a 304 just renews the entry.
+    Concurrent identical requests share one in-flight fetch.
+
+    Entries are keyed on the user and the URL, so patients never see each other's data.
+    Entries that have been stale for keep_stale seconds are deleted by prune(), which storing
+    a response runs at most hourly.
+
+    Parameters:
+    - path: SQLite file for the cache
+    - ttls: sequence of (compiled regex, seconds) matched against the URL; first match wins
+    - keep_stale: seconds a stale entry is kept for revalidation before it is pruned
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttls=DEFAULT_TTLS, keep_stale=KEEP_STALE_SECONDS):
+        self.path = path
+        self.ttls = ttls
+        self.keep_stale = keep_stale
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.pruned = 0
+        self._next_prune = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )''')
+            db.execute('CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)')
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def ttl(self, url):
+        for pattern, seconds in self.ttls:
+            if pattern.search(url):
+                return seconds
+        return None
+
+    def get(self, client, path):
+        """
+        Return the response for `path` via `client` (a FitbitClient), from cache when possible.
+
+        Returns:
+        - requests.Response (rebuilt from disk for cache hits)
+        """
+        url = client.url(path)
+        ttl = self.ttl(url)
+        if ttl is None:
+            return client.get(path, use_cache=False)
+
+        owner = client.user_id or hashlib.sha256(client.access_token.encode()).hexdigest()
+        key = f'{owner} {url}'
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            response = self._get(client, path, url, key, ttl)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _get(self, client, path, url, key, ttl):
+        with self._connect() as db:
+            row = db.execute('SELECT status, headers, body, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is not None and row[3] > time.time():
+            with self._lock:
+                self.hits += 1
+            return _rebuild(url, row[0], json.loads(row[1]), row[2])
+
+        conditional = {}
+        if row is not None:
+            headers = json.loads(row[1])
+            if 'ETag' in headers:
+                conditional['If-None-Match'] = headers['ETag']
+            if 'Last-Modified' in headers:
+                conditional['If-Modified-Since'] = headers['Last-Modified']
+
+        response = client.get(path, headers=conditional, use_cache=False)
+        if response.status_code == 304 and row is not None:
+            with self._lock:
+                self.revalidated += 1
+            with self._connect() as db:
+                db.execute('UPDATE responses SET expires_at = ? WHERE key = ?', (time.time() + ttl, key))
+            return _rebuild(url, row[0], json.loads(row[1]), row[2])
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200:
+            headers = {name: response.headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified')
+                       if name in response.headers}
+            with self._connect() as db:
+                db.execute('INSERT OR REPLACE INTO responses (key, url, status, headers, body, expires_at) '
+                           'VALUES (?, ?, ?, ?, ?, ?)',
+                           (key, url, 200, json.dumps(headers), response.content, time.time() + ttl))
+            self._maybe_prune()
+        return response
+
+    def prune(self, now=None):
+        """Delete entries that have been stale for more than keep_stale seconds; returns how many."""
+        now = time.time() if now is None else now
+        with self._connect() as db:
+            deleted = db.execute('DELETE FROM responses WHERE expires_at < ?', (now - self.keep_stale,)).rowcount
+        with self._lock:
+            self.pruned += deleted
+            self._next_prune = time.time() + _PRUNE_INTERVAL
+        return deleted
+
+    def _maybe_prune(self):
+        with self._lock:
+            due = time.time() >= self._next_prune
+            if due:
+                self._next_prune = time.time() + _PRUNE_INTERVAL
+        if due:
+            self.prune()
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute('DELETE FROM responses')
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses,
+                    'pruned': self.pruned}
+
+
+def _rebuild(url, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers.update(headers)
+    response.headers['X-Cache'] = 'HIT'
+    response._content = body
+    response.encoding = 'utf-8'
+    return response
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide ResponseCache backed by config.RESPONSE_CACHE_PATH."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -1,52 +1,555 @@
-import schedule
+import heapq
+import itertools
+import random
 import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Callable
 import threading
 
-class Scheduler:
+from news2_algo import CLINICAL_BANDS, clinical_band
+
+# Polling interval in seconds for each NEWS2 band, following the monitoring frequency in
+# CLINICAL_BANDS: 12-hourly, 4-6-hourly (the shorter end), hourly, and continuous, which for
+# a Fitbit is as often as it syncs intraday data (every minute).
+BAND_INTERVALS = {
+    "zero": 12 * 3600,
+    "low": 4 * 3600,
+    "medium": 3600,
+    "high": 60,
+}
+assert set(BAND_INTERVALS) == {band.name for band in CLINICAL_BANDS}
+_BAND_BY_INTERVAL = {interval: band for band, interval in BAND_INTERVALS.items()}
+
+# What to do when a job comes due while its previous run is still going (or still waiting
+# for a worker): drop the new run, fold every missed run into one run straight after the
+# current one, or run each missed run in turn.
+OVERRUN_POLICIES = ('skip', 'coalesce', 'queue')
+
+# Histogram bucket upper bounds (seconds) for scheduling lag and run duration
+TIMING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds, with the same semantics as a Prometheus histogram."""
+    __slots__ = ("bounds", "counts", "sum", "count", "max")
+
+    def __init__(self, bounds=TIMING_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        value = max(value, 0.0)
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the +Inf bucket), or 0.0 if empty."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        cumulative = list(itertools.accumulate(self.counts))
+        return {'count': self.count, 'sum': self.sum, 'max': self.max,
+                'mean': self.sum / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99),
+                'buckets': list(zip(self.bounds + (float('inf'),), cumulative))}
+
+
+class _ClassStats:
+    __slots__ = ("counters", "lag", "duration")
+
     def __init__(self):
+        # runs: started; overruns: came due while the previous run was still going; skipped:
+        # dropped by the skip policy (or when coalesced into a catch-up run already owed);
+        # missed: whole periods passed over because the scheduler itself fell behind
+        self.counters = dict.fromkeys(('runs', 'completed', 'failures', 'timeouts', 'overruns', 'skipped',
+                                       'missed'), 0)
+        self.lag = Histogram()
+        self.duration = Histogram()
+
+
+def _timed_call(function, args, kwargs):
+    # Runs on the worker (thread or process): time the call itself, so lag includes waiting for
+    # a class slot and a free worker, and hand back the exception rather than raising it
+    started = time.monotonic()
+    try:
+        function(*args, **kwargs)
+        error = None
+    except Exception as e:
+        error = e
+    return started, time.monotonic(), error
+
+
+class Job:
+    """
+    A function the Scheduler calls every `interval` seconds.
+
+    Runs are kept on a fixed grid (interval after the previous scheduled time, not after the
+    previous run finished), so a job does not drift. With jitter, each run is moved randomly
+    into the following jitter x interval seconds of its slot, so thousands of patient jobs
+    with the same interval do not all fire in the same second.
+
+    job_class groups jobs that share a concurrency limit (e.g. everything calling the Fitbit
+    API), overrun is one of OVERRUN_POLICIES and timeout is how many seconds a run may take.
+    """
+    __slots__ = ("name", "function", "args", "kwargs", "interval", "jitter", "job_class", "overrun", "timeout",
+                 "next_run", "base", "last_run", "runs", "cancelled", "active", "owed", "failures", "overruns",
+                 "skipped", "last_lag", "last_duration")
+
+    def __init__(self, name, function, interval, jitter, args, kwargs, job_class='default', overrun='skip',
+                 timeout=None):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.jitter = jitter
+        self.job_class = job_class
+        self.overrun = overrun
+        self.timeout = timeout
+        self.next_run = None  # time.monotonic() deadline
+        self.base = None  # the grid slot next_run was jittered from
+        self.last_run = None
+        self.runs = 0
+        self.cancelled = False
+        self.active = None  # the _Run in progress or waiting for a worker
+        self.owed = 0  # runs held back by the overrun policy
+        self.failures = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_lag = None
+        self.last_duration = None
+
+    def to_dict(self):
+        return {'name': self.name, 'job_class': self.job_class, 'interval': self.interval,
+                'overrun': self.overrun, 'runs': self.runs, 'failures': self.failures, 'overruns': self.overruns,
+                'skipped': self.skipped, 'owed': self.owed, 'running': self.active is not None,
+                'last_lag': self.last_lag, 'last_duration': self.last_duration}
+
+    def __repr__(self):
+        return f"Job({self.name!r}, every {self.interval:g}s, runs={self.runs})"
+
+
+class _Run:
+    __slots__ = ("job", "scheduled", "started", "deadline", "future", "abandoned")
+
+    def __init__(self, job, scheduled):
+        self.job = job
+        self.scheduled = scheduled
+        self.started = None
+        self.deadline = None
+        self.future = None
+        self.abandoned = False
+
+    def __repr__(self):
+        state = 'abandoned' if self.abandoned else 'waiting' if self.started is None else 'running'
+        return f"_Run({self.job.name!r}, {state})"
+
+
+class Scheduler:
+    """
+    Runs many independent periodic jobs (one per patient, typically) off a single min-heap of
+    deadlines.
+
+    The scheduler thread sleeps on a condition variable until the earliest deadline, so it uses
+    no CPU while idle however many jobs there are, and is woken early only when jobs are added,
+    removed or rescheduled. Intervals are in seconds and may be fractional. Patient jobs can
+    follow the patient's NEWS2 band (see BAND_INTERVALS and set_patient_band()).
+
+    The scheduler thread only decides what is due; runs execute on a thread pool (or a process
+    pool, for CPU-bound jobs with picklable functions), so one slow Fitbit fetch does not hold
+    up every other job. Each job class can be capped at a number of concurrent runs; due runs
+    beyond the cap wait their turn in order. A run that exceeds its job's timeout is abandoned:
+    Python cannot interrupt a running thread, so the call carries on in the background and its
+    result is discarded, but its class slot is released and the job is free to run again.
+
+    Every run's lag (start time minus the time it was due) and duration go into per-class
+    histograms, alongside counts of overruns, skipped and missed runs, failures and timeouts;
+    read them with snapshot(), or serve them to Prometheus with scheduler_metrics.MetricsServer.
+    """
+
+    def __init__(self, write_queue=None, workers=8, executor='thread', class_limits=None):
+        """
+        Parameters:
+        - write_queue: optional write_behind.WriteBehindQueue the fetch function writes into;
+          stop_scheduler flushes it so nothing fetched is lost
+        - workers: size of the worker pool
+        - executor: 'thread' or 'process'
+        - class_limits: {job_class: maximum concurrent runs}; classes not listed share the pool freely
+        """
+        if executor not in ('thread', 'process'):
+            raise ValueError("executor must be 'thread' or 'process'")
         self.running = False
         self.thread = None
+        self.write_queue = write_queue
+        self.workers = workers
+        self.executor = executor
+        self.class_limits = dict(class_limits or {})
+        self.jobs = {}
+        self._heap = []  # (next_run, seq, job); entries whose next_run no longer matches are stale
+        self._timeouts = []  # (deadline, seq, _Run)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = None
+        self._active = defaultdict(int)  # job class -> runs executing
+        self._waiting = defaultdict(deque)  # job class -> _Runs waiting for a slot
+        self._abandoned = set()  # timed-out _Runs whose call has not returned yet
+        self._stats = defaultdict(_ClassStats)  # job class -> counters and histograms
+        self._started_at = time.time()
+
+    # Jobs
+
+    def add_job(self, name, function: Callable, interval, *args, jitter=0.0, first_run=None, job_class='default',
+                overrun='skip', timeout=None, **kwargs):
+        """
+        Add (or replace) a job.
+
+        Parameters:
+        - name: unique job name
+        - function: called as function(*args, **kwargs)
+        - interval: seconds between runs
+        - jitter: fraction of the interval each run may be delayed by at random (0 to 1)
+        - first_run: seconds from now until the first run (default: one jittered slot from now,
+          i.e. straight away without jitter)
+        - job_class: concurrency class (see class_limits)
+        - overrun: 'skip', 'coalesce' or 'queue' (see OVERRUN_POLICIES)
+        - timeout: seconds a run may take before it is abandoned (default: no limit)
 
-    def start_scheduler(self, fetch_function: Callable, frequency_minutes: int):
+        Returns:
+        - the Job
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun must be one of {OVERRUN_POLICIES}")
+        job = Job(name, function, interval, jitter, args, kwargs, job_class, overrun, timeout)
+        with self._cond:
+            old = self.jobs.get(name)
+            if old is not None:
+                old.cancelled = True
+            self.jobs[name] = job
+            self._push(job, time.monotonic() + (first_run or 0.0))
+        return job
+
+    def remove_job(self, name):
+        """Remove a job; returns it, or None if there was none."""
+        with self._cond:
+            job = self.jobs.pop(name, None)
+            if job is not None:
+                job.cancelled = True
+                self._cond.notify_all()
+            return job
+
+    def reschedule(self, name, interval):
+        """
+        Change a job's interval. If that brings its next run forward, it moves straight away;
+        otherwise the new interval applies from the next run.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        with self._cond:
+            job = self.jobs[name]
+            if interval == job.interval:
+                return job
+            job.interval = interval
+            if job.next_run is not None:
+                slot = (job.last_run if job.last_run is not None else time.monotonic()) + interval
+                if slot < job.base:
+                    self._push(job, max(slot, time.monotonic()))
+            return job
+
+    # Patient jobs
+
+    @staticmethod
+    def patient_job_name(patient_id):
+        return f"patient:{patient_id}"
+
+    def add_patient_job(self, patient_id, function: Callable, band="zero", jitter=0.1, spread=True,
+                        job_class='patient', overrun='skip', timeout=None):
+        """
+        Poll one patient at the interval for their NEWS2 band; function is called as function(patient_id).
+
+        With spread, the first run is placed at random within the first interval, so adding a
+        whole ward at once does not poll every patient at the same moment.
+        """
+        interval = BAND_INTERVALS[band]
+        first_run = random.uniform(0, interval) if spread else None
+        return self.add_job(self.patient_job_name(patient_id), function, interval, patient_id,
+                            jitter=jitter, first_run=first_run, job_class=job_class, overrun=overrun,
+                            timeout=timeout)
+
+    def set_patient_band(self, patient_id, band_or_score):
+        """
+        Follow a patient's NEWS2 band (a band name or an aggregate score): a deteriorating
+        patient is polled more often at once, an improving one less often from their next poll.
+        """
+        band = band_or_score if isinstance(band_or_score, str) else clinical_band(band_or_score).name
+        return self.reschedule(self.patient_job_name(patient_id), BAND_INTERVALS[band])
+
+    def patient_band(self, patient_id):
+        """The NEWS2 band a patient's job is polled at, or None if there is no such job."""
+        job = self.jobs.get(self.patient_job_name(patient_id))
+        return None if job is None else _BAND_BY_INTERVAL.get(job.interval)
+
+    # Running
+
+    def start(self):
+        """Start the scheduler thread."""
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+            pool_type = ThreadPoolExecutor if self.executor == 'thread' else ProcessPoolExecutor
+            self._pool = pool_type(max_workers=self.workers)
+        self.thread = threading.Thread(target=self._run_scheduler, name='scheduler', daemon=True)
+        self.thread.start()
+
+    def start_scheduler(self, fetch_function: Callable, frequency_minutes: float):
         """
         Start the scheduler to fetch data from API at specified intervals.
 
         Parameters:
         - fetch_function: The function to call for fetching data
-        - frequency_minutes: How often to fetch data (in minutes)
+        - frequency_minutes: How often to fetch data (in minutes; fractions for sub-minute periods)
         """
-        if not isinstance(frequency_minutes, int) or frequency_minutes < 1 or frequency_minutes > 120:
-            raise ValueError("Frequency must be an integer between 1 and 120 minutes")
+        if not isinstance(frequency_minutes, (int, float)) or frequency_minutes <= 0:
+            raise ValueError("Frequency must be a positive number of minutes")
 
         print(f"Scheduling data fetch every {frequency_minutes} minutes")
-        schedule.every(frequency_minutes).minutes.do(fetch_function)
-
-        self.running = True
-        self.thread = threading.Thread(target=self._run_scheduler)
-        self.thread.start()
+        self.add_job('fetch', fetch_function, frequency_minutes * 60, first_run=frequency_minutes * 60,
+                     job_class='fetch')
+        self.start()
 
     def _run_scheduler(self):
-        while self.running:
-            schedule.run_pending()
-            time.sleep(1)
+        with self._cond:
+            while self.running:
+                job, due = self._next_due()
+                if job is None:
+                    self._expire_runs()
+                    deadlines = [entries[0][0] for entries in (self._heap, self._timeouts) if entries]
+                    self._cond.wait(min(deadlines) - time.monotonic() if deadlines else None)
+                    continue
+                stats = self._stats[job.job_class].counters
+                if job.active is None:
+                    self._submit(job, due)
+                else:
+                    job.overruns += 1
+                    stats['overruns'] += 1
+                    if job.overrun == 'queue':
+                        job.owed += 1
+                    elif job.overrun == 'coalesce' and not job.owed:
+                        job.owed = 1
+                    else:
+                        job.skipped += 1
+                        stats['skipped'] += 1
+                slot = job.base + job.interval
+                now = time.monotonic()
+                if slot <= now:
+                    # Missed whole periods (the scheduler or the machine fell behind): skip them
+                    missed = int((now - slot) // job.interval) + 1
+                    stats['missed'] += missed
+                    slot += missed * job.interval
+                self._push(job, slot)
 
-    def stop_scheduler(self):
-        """Stop the scheduler."""
-        self.running = False
+    def _submit(self, job, scheduled):
+        # Start a run now, or queue it behind its class's concurrency limit
+        run = job.active = _Run(job, scheduled)
+        job.last_run = scheduled
+        limit = self.class_limits.get(job.job_class)
+        if limit is not None and self._active[job.job_class] >= limit:
+            self._waiting[job.job_class].append(run)
+        else:
+            self._start(run)
+
+    def _start(self, run):
+        job = run.job
+        self._active[job.job_class] += 1
+        job.runs += 1
+        self._stats[job.job_class].counters['runs'] += 1
+        run.started = time.monotonic()
+        if job.timeout is not None:
+            run.deadline = run.started + job.timeout
+            heapq.heappush(self._timeouts, (run.deadline, next(self._seq), run))
+        run.future = self._pool.submit(_timed_call, job.function, job.args, job.kwargs)
+        run.future.add_done_callback(lambda future: self._finished(run, future))
+
+    def _finished(self, run, future):
+        with self._cond:
+            if run.abandoned:
+                self._abandoned.discard(run)
+                if not future.cancelled():
+                    late = time.monotonic() - run.deadline
+                    print(f"Scheduled job {run.job.name} finished {late:.1f}s after its timeout")
+                self._cond.notify_all()
+                return
+            if not future.cancelled():
+                job, stats = run.job, self._stats[run.job.job_class]
+                try:
+                    started, finished, error = future.result()
+                except Exception as e:  # e.g. the function could not be pickled for a process pool
+                    started = finished = time.monotonic()
+                    error = e
+                job.last_lag, job.last_duration = started - run.scheduled, finished - started
+                stats.lag.observe(job.last_lag)
+                stats.duration.observe(job.last_duration)
+                stats.counters['completed'] += 1
+                if error is not None:
+                    job.failures += 1
+                    stats.counters['failures'] += 1
+                    print(f"Scheduled job {job.name} failed: {error}")
+            self._release(run)
+
+    def _expire_runs(self):
+        now = time.monotonic()
+        while self._timeouts and self._timeouts[0][0] <= now:
+            _, _, run = heapq.heappop(self._timeouts)
+            if run.job.active is run and not run.future.done():
+                print(f"Scheduled job {run.job.name} timed out after {run.job.timeout}s")
+                run.job.failures += 1
+                self._stats[run.job.job_class].counters['timeouts'] += 1
+                run.abandoned = True
+                if not run.future.cancel():
+                    self._abandoned.add(run)
+                self._release(run)
+
+    def _release(self, run):
+        # Free the run's class slot, start the next waiting run of that class and any run the
+        # job's overrun policy held back
+        job = run.job
+        job.active = None
+        self._active[job.job_class] -= 1
+        waiting = self._waiting[job.job_class]
+        limit = self.class_limits.get(job.job_class)
+        while waiting and self.running and (limit is None or self._active[job.job_class] < limit):
+            self._start(waiting.popleft())
+        if job.owed and not job.cancelled and self.running:
+            job.owed -= 1
+            self._submit(job, time.monotonic())
+        self._cond.notify_all()
+
+    def _next_due(self):
+        # Pop the earliest job whose deadline has passed, skipping stale heap entries
+        heap = self._heap
+        while heap:
+            due, _, job = heap[0]
+            if job.cancelled or due != job.next_run:
+                heapq.heappop(heap)
+                continue
+            if due > time.monotonic():
+                return None, None
+            heapq.heappop(heap)
+            job.next_run = None
+            return job, due
+        return None, None
+
+    def _push(self, job, slot):
+        job.base = slot
+        job.next_run = slot + random.uniform(0, job.jitter * job.interval) if job.jitter else slot
+        heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+        # Rebuild the heap if reschedules have left it mostly stale
+        if len(self._heap) > 2 * len(self.jobs) + 64:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled and entry[0] == entry[2].next_run]
+            heapq.heapify(self._heap)
+        self._cond.notify_all()
+
+    # Instrumentation
+
+    def snapshot(self, per_job=False):
+        """
+        Scheduler metrics as a dict: per job class, the counters described in _ClassStats,
+        current jobs / active / waiting runs and the lag and duration histograms (see
+        Histogram.snapshot). With per_job, also each job's own counters and last lag and duration.
+        """
+        with self._cond:
+            jobs_by_class = defaultdict(int)
+            for job in self.jobs.values():
+                jobs_by_class[job.job_class] += 1
+            classes = {}
+            for job_class in set(jobs_by_class) | set(self._stats) | set(self.class_limits):
+                stats = self._stats[job_class]
+                classes[job_class] = {**stats.counters, 'jobs': jobs_by_class[job_class],
+                                      'active': self._active[job_class], 'waiting': len(self._waiting[job_class]),
+                                      'limit': self.class_limits.get(job_class),
+                                      'lag': stats.lag.snapshot(), 'duration': stats.duration.snapshot()}
+            snapshot = {'time': time.time(), 'uptime': time.time() - self._started_at, 'running': self.running,
+                        'executor': self.executor, 'workers': self.workers, 'jobs': len(self.jobs),
+                        'timers': len(self._heap), 'classes': classes}
+            if per_job:
+                snapshot['job_details'] = [job.to_dict() for job in self.jobs.values()]
+            return snapshot
+
+    def stop_scheduler(self, timeout=None):
+        """
+        Stop the scheduler: start no more runs, wait up to `timeout` seconds for the runs in
+        progress (including runs abandoned after their job's timeout) to finish, then flush the
+        write queue in whatever time is left. Once the deadline has passed the worker pool is
+        shut down without waiting; calls still going carry on in the background.
+
+        Returns:
+        - True if everything finished and was flushed in time, False while anything is still running
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        with self._cond:
+            self.running = False
+            for job in self.jobs.values():
+                job.cancelled = True
+            self.jobs.clear()
+            self._heap.clear()
+            # Runs still waiting for a class slot never start
+            for waiting in self._waiting.values():
+                for run in waiting:
+                    run.job.active = None
+                waiting.clear()
+            self._cond.notify_all()
         if self.thread:
-            self.thread.join()
-        schedule.clear()
+            self.thread.join(remaining())
+        with self._cond:
+            drained = self._cond.wait_for(lambda: not any(self._active.values()) and not self._abandoned,
+                                          remaining())
+            in_progress = sum(self._active.values()) + len(self._abandoned)
+        if self._pool is not None:
+            self._pool.shutdown(wait=drained, cancel_futures=True)
+            self._pool = None
+        if not drained:
+            print(f"Scheduler stopped with {in_progress} runs still in progress")
+        flushed = True
+        if self.write_queue is not None:
+            flushed = self.write_queue.flush(remaining())
         print("Scheduler stopped.")
+        return drained and flushed
 
 if __name__ == "__main__":
     # Example usage
     def dummy_fetch_function():
         print("Fetching data from Fitbit API...")
-    
+
+    def poll_patient(patient_id):
+        print(f"Polling {patient_id}")
+
     scheduler = Scheduler()
     try:
-        scheduler.start_scheduler(dummy_fetch_function, 1)
+        scheduler.start_scheduler(dummy_fetch_function, 0.25)
+        scheduler.add_patient_job("TEST001", poll_patient, band="zero")
+        scheduler.set_patient_band("TEST001", 7)  # deteriorating: polled every minute from now on
         # Simulate running for a while
         time.sleep(30)
         scheduler.stop_scheduler()
@@ -57,6 +560,5 @@ if __name__ == "__main__":
 """
 TODO:
 - Add function to set total schedule duration
-- Test it in seconds
 - What additions do we need to make to the requeiremnts doc?
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,169 @@
+# scheduler_metrics.py
+
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from config import SCHEDULER_METRICS_HOST, SCHEDULER_METRICS_PORT
+
+PREFIX = 'news_scheduler'
+
+# Snapshot counter -> (metric name, help text)
+_COUNTERS = {
+    'runs': ('runs_total', "Runs started."),
+    'completed': ('runs_completed_total', "Runs that finished (successfully or not) before any timeout."),
+    'failures': ('run_failures_total', "Runs that raised an exception."),
+    'timeouts': ('run_timeouts_total', "Runs abandoned after exceeding their job's timeout."),
+    'overruns': ('overruns_total', "Times a job came due while its previous run was still going."),
+    'skipped': ('skipped_runs_total', "Runs dropped by the overrun policy."),
+    'missed': ('missed_periods_total', "Whole periods passed over because the scheduler fell behind."),
+}
+
+_GAUGES = {
+    'jobs': ('jobs', "Jobs registered."),
+    'active': ('active_runs', "Runs executing now."),
+    'waiting': ('waiting_runs', "Due runs waiting for a slot under the class concurrency limit."),
+}
+
+_HISTOGRAMS = {
+    'lag': ('lag_seconds', "Delay between the time a run was due and the time it started."),
+    'duration': ('run_duration_seconds', "How long runs took."),
+}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text(snapshot):
+    """Render a Scheduler.snapshot() in the Prometheus text exposition format (version 0.0.4)."""
+    classes = sorted(snapshot['classes'].items())
+    lines = [f"# HELP {PREFIX}_up Whether the scheduler is running.", f"# TYPE {PREFIX}_up gauge",
+             f"{PREFIX}_up {int(snapshot['running'])}",
+             f"# HELP {PREFIX}_workers Worker pool size.", f"# TYPE {PREFIX}_workers gauge",
+             f"{PREFIX}_workers {snapshot['workers']}"]
+
+    for metrics, kind in ((_COUNTERS, 'counter'), (_GAUGES, 'gauge')):
+        for key, (name, help_text) in metrics.items():
+            lines += [f"# HELP {PREFIX}_{name} {help_text}", f"# TYPE {PREFIX}_{name} {kind}"]
+            for job_class, values in classes:
+                lines.append(f'{PREFIX}_{name}{{job_class="{_label(job_class)}"}} {_number(values[key])}')
+
+    lines += [f"# HELP {PREFIX}_class_limit Concurrent runs allowed per job class.",
+              f"# TYPE {PREFIX}_class_limit gauge"]
+    for job_class, values in classes:
+        if values['limit'] is not None:
+            lines.append(f'{PREFIX}_class_limit{{job_class="{_label(job_class)}"}} {values["limit"]}')
+
+    for key, (name, help_text) in _HISTOGRAMS.items():
+        lines += [f"# HELP {PREFIX}_{name} {help_text}", f"# TYPE {PREFIX}_{name} histogram"]
+        for job_class, values in classes:
+            histogram, label = values[key], f'job_class="{_label(job_class)}"'
+            for bound, count in histogram['buckets']:
+                lines.append(f'{PREFIX}_{name}_bucket{{{label},le="{_number(bound)}"}} {count}')
+            lines.append(f'{PREFIX}_{name}_sum{{{label}}} {_number(histogram["sum"])}')
+            lines.append(f'{PREFIX}_{name}_count{{{label}}} {histogram["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint for a Scheduler's metrics.
+
+    GET /metrics returns prometheus_text(scheduler.snapshot()) for a Prometheus scrape job;
+    GET /snapshot returns the snapshot, with per-job details, as JSON.
+
+    Parameters:
+    - scheduler: the Scheduler to report on
+    - host / port: where to listen (port 0 picks a free one)
+    """
+
+    def __init__(self, scheduler, host=SCHEDULER_METRICS_HOST, port=SCHEDULER_METRICS_PORT):
+        self.scheduler = scheduler
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host = '127.0.0.1' if self.host in ('0.0.0.0', '') else self.host
+        return f'http://{host}:{self.port}'
+
+    def start(self):
+        """Start serving on a background thread."""
+        scheduler = self.scheduler
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == '/metrics':
+                    self._reply(prometheus_text(scheduler.snapshot()), 'text/plain; version=0.0.4; charset=utf-8')
+                elif path == '/snapshot':
+                    self._reply(json.dumps(scheduler.snapshot(per_job=True), default=str), 'application/json')
+                else:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+
+            def _reply(self, text, content_type):
+                body = text.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='scheduler-metrics', daemon=True)
+        self._thread.start()
+        print(f"Serving scheduler metrics at {self.url}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+# Example usage
+if __name__ == "__main__":
+    import random
+    import time
+
+    import requests
+
+    from scheduler import Scheduler
+
+    def poll_patient(patient_id):
+        time.sleep(random.uniform(0.01, 0.2))
+
+    scheduler = Scheduler(workers=4, class_limits={'patient': 2})
+    scheduler.start()
+    for patient_id in range(20):
+        scheduler.add_job(f"patient:{patient_id}", poll_patient, 0.5, patient_id, jitter=0.1, job_class='patient')
+    with MetricsServer(scheduler, port=0) as server:
+        time.sleep(3)
+        print(requests.get(f"{server.url}/metrics", timeout=5).text)
+    scheduler.stop_scheduler(timeout=5)
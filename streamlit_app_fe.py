@@ -1,6 +1,6 @@
 import streamlit as st
 from data_collector import test_data_collector
-from news2_algo import calculate_news_score
+from news2_cache import NEWSScoreCache
 import json
 from streamlit_ui_utils import display_news_score_and_suggestions, render_devices
 import time
@@ -31,6 +31,11 @@ NEWS_DATA = [
     {"respiration_rate": 18, "SpO2_scale1": 95, "temperature": 37, "pulse": 80, "systolic_bp": 350, "consciousness": 'A', "on_oxygen": False},
 ]
 
+@st.cache_resource
+def get_news_cache():
+    # One scoring cache per server process, shared by every session and rerun
+    return NEWSScoreCache(maxsize=1024)
+
 def main():
     update_frequency = 5
     # Set page title
@@ -70,16 +75,14 @@ def main():
 
                 for i, data in enumerate(NEWS_DATA):
                     # Calculate NEWS score
-                    news_score, message, param_received_3, params_with_3_points, respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp, consciousness, on_oxygen = calculate_news_score(**data)
+                    result = get_news_cache().score(**data)
                     
                     # Update the NEWS score in the device state
-                    st.session_state[f"device_{st.session_state.selected_device}_state"]["news_score"] = news_score
+                    st.session_state[f"device_{st.session_state.selected_device}_state"]["news_score"] = result.score
                     
                     # Display NEWS score and clinical suggestions
                     with news_placeholder.container():
-                        display_news_score_and_suggestions(news_score, message, param_received_3, params_with_3_points,
-                                                           respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp,
-                                                           consciousness, on_oxygen, update_frequency)
+                        display_news_score_and_suggestions(result, **data, update_frequency=update_frequency)
                     
                     # If it's not the last iteration, show the spinner
                     if i < len(NEWS_DATA) - 1:
@@ -1,5 +1,4 @@
 import streamlit as st
-import requests
 import os
 import base64
 import hashlib
@@ -7,7 +6,11 @@ import random
 import string
 from dotenv import load_dotenv
 from urllib.parse import quote, parse_qs, urlparse
-from datetime import date, timedelta
+
+from config import FITBIT_AUTHORIZE_URL, FITBIT_TOKEN_URL
+from fitbit_integration import FitbitClient, daily_endpoints, get_session
+from rate_limiter import get_rate_limit_budget
+from response_cache import get_response_cache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -46,7 +49,7 @@ scope = 'activity heartrate location oxygen_saturation temperature'
 encoded_scope = quote(scope)
 
 # Request authorization
-auth_url = f"https://www.fitbit.com/oauth2/authorize?client_id={client_id}&response_type=code&code_challenge={st.session_state.code_challenge}&code_challenge_method=S256&scope={encoded_scope}&redirect_uri={quote(redirect_uri)}"
+auth_url = f"{FITBIT_AUTHORIZE_URL}?client_id={client_id}&response_type=code&code_challenge={st.session_state.code_challenge}&code_challenge_method=S256&scope={encoded_scope}&redirect_uri={quote(redirect_uri)}"
 st.write("Please authorize the application by clicking the link below:")
 st.markdown(f"[Authorize Fitbit]({auth_url})")
 
@@ -66,7 +69,7 @@ if st.button("Exchange Code for Tokens"):
             auth_code = query_params.get('code', [auth_code])[0]
         
         # Exchange the authorization code for access and refresh tokens
-        token_url = 'https://api.fitbit.com/oauth2/token'
+        token_url = FITBIT_TOKEN_URL
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
         }
@@ -86,7 +89,7 @@ if st.button("Exchange Code for Tokens"):
         st.write(f"Client ID: {client_id}")
         
         try:
-            response = requests.post(token_url, headers=headers, data=data)
+            response = get_session().post(token_url, headers=headers, data=data)
             st.write(f"Response status code: {response.status_code}")
             st.write(f"Response content: {response.text}")
             
@@ -97,25 +100,29 @@ if st.button("Exchange Code for Tokens"):
                 # Store access token in session state
                 st.session_state.access_token = tokens['access_token']
                 
-                # Function to make authenticated GET requests
-                def authenticated_get(url):
-                    headers = {'Authorization': f'Bearer {st.session_state.access_token}'}
-                    response = requests.get(url, headers=headers)
+                # Fetch every endpoint in parallel over the shared keep-alive session; the daily
+                # summaries are served from the on-disk cache until they can have changed
+                client = FitbitClient(st.session_state.access_token, user_id=tokens.get('user_id'),
+                                      rate_limits=get_rate_limit_budget(), cache=get_response_cache())
+                endpoints = daily_endpoints()
+                responses = client.fetch_many(endpoints)
+
+                # Return the JSON for one of the fetched endpoints, reporting failures
+                def authenticated_get(name):
+                    response = responses[name]
+                    if isinstance(response, Exception):
+                        st.error(f"Failed to retrieve data from {client.url(endpoints[name])}: {response}")
+                        return None
                     if response.status_code == 200:
                         return response.json()
                     else:
-                        st.error(f"Failed to retrieve data from {url}")
+                        st.error(f"Failed to retrieve data from {response.url}")
                         st.write(f"Status Code: {response.status_code}")
                         st.write(response.text)
                         return None
 
-                # Get today's date and yesterday's date
-                today = date.today().isoformat()
-                yesterday = (date.today() - timedelta(days=1)).isoformat()
-
                 # Fetch and display temperature data
-                temp_url = f'https://api.fitbit.com/1/user/-/temp/core/date/{yesterday}/{today}.json'
-                temp_data = authenticated_get(temp_url)
+                temp_data = authenticated_get('temp')
                 if temp_data and 'tempCore' in temp_data:
                     st.subheader("Temperature Data")
                     for day in temp_data['tempCore']:
@@ -124,8 +131,7 @@ if st.button("Exchange Code for Tokens"):
                     st.write("No temperature data available")
 
                 # Fetch and display activity data
-                activity_url = f'https://api.fitbit.com/1/user/-/activities/date/{today}.json'
-                activity_data = authenticated_get(activity_url)
+                activity_data = authenticated_get('activities')
                 if activity_data and 'summary' in activity_data:
                     st.subheader("Activity Data")
                     summary = activity_data['summary']
@@ -134,24 +140,21 @@ if st.button("Exchange Code for Tokens"):
                     st.write(f"Active Minutes: {summary.get('veryActiveMinutes', 'N/A')}")
 
                 # Fetch and display SpO2 data
-                spo2_url = f'https://api.fitbit.com/1/user/-/spo2/date/{yesterday}/{today}.json'
-                spo2_data = authenticated_get(spo2_url)
+                spo2_data = authenticated_get('spo2')
                 if spo2_data and 'value' in spo2_data:
                     st.subheader("SpO2 Data")
                     for day in spo2_data['value']:
                         st.write(f"Date: {day['dateTime']}, Average: {day['value'].get('avg', 'N/A')}%")
 
                 # Fetch and display breathing rate data
-                breathing_url = f'https://api.fitbit.com/1/user/-/br/date/{yesterday}/{today}.json'
-                breathing_data = authenticated_get(breathing_url)
+                breathing_data = authenticated_get('br')
                 if breathing_data and 'br' in breathing_data:
                     st.subheader("Breathing Rate Data")
                     for day in breathing_data['br']:
                         st.write(f"Date: {day['dateTime']}, Rate: {day['value'].get('breathingRate', 'N/A')} breaths/min")
 
                 # Fetch and display heart rate data
-                heart_rate_url = f'https://api.fitbit.com/1/user/-/activities/heart/date/{today}/1d.json'
-                heart_rate_data = authenticated_get(heart_rate_url)
+                heart_rate_data = authenticated_get('heart')
                 if heart_rate_data and 'activities-heart' in heart_rate_data:
                     st.subheader("Heart Rate Data")
                     for day in heart_rate_data['activities-heart']:
@@ -159,8 +162,7 @@ if st.button("Exchange Code for Tokens"):
                             st.write(f"Date: {day['dateTime']}, Resting Heart Rate: {day['value']['restingHeartRate']} bpm")
 
                 # Fetch and display HRV data
-                hrv_url = f'https://api.fitbit.com/1/user/-/hrv/date/{yesterday}/{today}.json'
-                hrv_data = authenticated_get(hrv_url)
+                hrv_data = authenticated_get('hrv')
                 if hrv_data and 'hrv' in hrv_data:
                     st.subheader("HRV Data")
                     for day in hrv_data['hrv']:
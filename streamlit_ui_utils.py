@@ -4,11 +4,14 @@
 from datetime import datetime
 import streamlit as st
 
+from news2_algo import clinical_band
+from vitals_ring import get_ring
 
-def render_devices():
+
+def render_devices(device_count=12):
     st.header("Devices")
     cols = st.columns(4)
-    for i in range(12):
+    for i in range(device_count):
         device_id = f"Device{i+1}"
 
         if f"device_{device_id}_state" not in st.session_state:
@@ -17,6 +20,11 @@ def render_devices():
         with cols[i % 4]:
             button_color = "green" if st.session_state[f"device_{device_id}_state"]["patient_attached"] else "gray"
             news_score = st.session_state[f"device_{device_id}_state"].get("news_score")
+            if news_score is None:
+                # Fall back to the latest score the ingest process wrote to the device's ring
+                ring = get_ring(device_id)
+                if ring is not None and len(ring):
+                    news_score = ring.last()["news_score"]
             
             button_label = f"Device {i+1}"
             if news_score is not None:
@@ -28,24 +36,26 @@ def render_devices():
                 st.session_state.selected_device = device_id
 
 
-def display_news_score_and_suggestions(news_score, message, param_received_3, params_with_3_points,
-                                       respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp,
+def display_news_score_and_suggestions(result, respiration_rate, SpO2_scale1, temperature, pulse, systolic_bp,
                                        consciousness, on_oxygen, update_frequency):
-    # Determine color based on NEWS score
-    if news_score == 0:
-        color = "green"
-    elif 1 <= news_score <= 4:
-        color = "gray"
-    elif news_score == 5 or news_score == 6:
-        color = "orange"  # Using orange for amber
-    else:  # 7 or more
-        color = "red"
+    """
+    Render a NEWSResult from news2_algo.score_news with the readings it was scored from.
+    """
+    if result.score is None:
+        st.warning(result.message)
+        return
+
+    params_with_3_points = result.params_with_3_points
+
+    # Colour, monitoring frequency and clinical response all come from the NEWS2 band table
+    band = clinical_band(result.score)
+    color = band.colour
 
     # Create two columns for NEWS Score and Clinical Suggestions
     col1, col2 = st.columns(2)
 
     with col1:
-        st.markdown(f"<h3 style='color: {color};'>{message}</h3>", unsafe_allow_html=True)
+        st.markdown(f"<h3 style='color: {color};'>{result.message}</h3>", unsafe_allow_html=True)
 
         # Update this section to use the current time
         last_reading_time = datetime.now()
@@ -59,18 +69,8 @@ def display_news_score_and_suggestions(news_score, message, param_received_3, pa
         suggestion_container = st.empty()
         
         # Prepare the content
-        if news_score == 0:
-            monitoring = "Minimum 12 hourly"
-            response = "Continue routine NEWS monitoring"
-        elif 1 <= news_score <= 4:
-            monitoring = "Minimum 4–6 hourly"
-            response = "Inform registered nurse, who must assess the patient"
-        elif news_score == 5 or news_score == 6:
-            monitoring = "Minimum 1 hourly"
-            response = "Urgent assessment by a clinician"
-        else:  # 7 or more
-            monitoring = "Continuous monitoring of vital signs"
-            response = "Emergency registrar assessment, consider level 2/3"
+        monitoring = band.monitoring
+        response = band.response
 
         # Update the container with the new content
         suggestion_container.markdown(f"""
@@ -99,7 +99,7 @@ def display_news_score_and_suggestions(news_score, message, param_received_3, pa
     # Create the critical alert placeholder here
     critical_alert_placeholder = st.empty()
 
-    if param_received_3:
+    if result.param_received_3:
         critical_alert_content = "#### ⚠️ Critical Alert - parameters with a score of 3:\n\n"
         for param in params_with_3_points:
             critical_alert_content += f"- {param.replace('_', ' ').title()}\n"
@@ -0,0 +1,49 @@
+# test_alert_system.py
+
+from alert_system import DEFAULT_HOLD, AlertSystem
+
+
+def quiet_alerts(**kwargs):
+    alerts = AlertSystem(**kwargs)
+    alerts.notify_staff = lambda alert: None
+    return alerts
+
+
+def test_alert_raised_again_inside_cooldown_is_sent():
+    # medium's cooldown (1800 s) outlasts the hold, so the second alert is raised inside it
+    alerts = quiet_alerts()
+    first = alerts.evaluate('p', 5, now=0)[0]
+    alerts.evaluate('p', 0, now=60)
+    alerts.tick(60 + DEFAULT_HOLD + 1)
+    assert first.resolved_at is not None
+
+    second = alerts.evaluate('p', 5, now=1000)[0]
+    assert second.id != first.id and second.reason == 'raised'
+    assert second.notifications == 1
+    assert second.remind_at == 1000 + second.level.repeat_after
+    assert alerts.tick(1e7) == [second]
+
+
+def test_repeat_of_the_same_alert_inside_cooldown_is_suppressed():
+    alerts = quiet_alerts(hold=60)
+    alert = alerts.evaluate('p', 5, now=0)[0]
+    alerts.evaluate('p', 7, now=10)  # escalated to high
+    alerts.evaluate('p', 5, now=20)
+    alerts.tick(81)  # lowered back to medium
+    assert alerts.evaluate('p', 7, now=100) == []
+    assert alert.notifications == 2
+    assert alerts.counters['suppressed'] == 1
+
+
+def test_suppressed_escalation_after_acknowledgement_is_reminded():
+    alerts = quiet_alerts(hold=60)
+    alert = alerts.evaluate('p', 5, now=0)[0]
+    alerts.evaluate('p', 7, now=10)
+    alerts.evaluate('p', 5, now=20)
+    alerts.tick(81)
+    alerts.acknowledge(alert.id, now=90)
+    assert alerts.evaluate('p', 7, now=100) == []
+    high_cooldown = alert.level.cooldown
+    assert alert.remind_at == 10 + high_cooldown
+    assert alerts.tick(10 + high_cooldown) == [alert]
+    assert alert.reason == 'reminder'
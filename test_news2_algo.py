@@ -0,0 +1,38 @@
+# test_news2_algo.py
+
+import math
+
+import pytest
+
+from news2_algo import calculate_news_scores_batch, parameter_points, score_news
+
+NAN = float('nan')
+
+
+@pytest.mark.parametrize("readings", [
+    (NAN, 96, 37.0, 80),
+    (18, NAN, 37.0, 80),
+    (18, 96, NAN, 80),
+    (18, 96, 37.0, NAN),
+])
+def test_score_news_rejects_nan(readings):
+    with pytest.raises(ValueError):
+        score_news(*readings)
+
+
+def test_score_news_rejects_nan_systolic_bp():
+    with pytest.raises(ValueError):
+        score_news(18, 96, 37.0, 80, systolic_bp=NAN)
+
+
+@pytest.mark.parametrize("parameter", ["respiration_rate", "SpO2", "temperature", "pulse", "systolic_bp"])
+def test_parameter_points_rejects_nan(parameter):
+    with pytest.raises(ValueError):
+        parameter_points(parameter, math.nan)
+
+
+def test_batch_treats_nan_as_missing():
+    scores = calculate_news_scores_batch(respiration_rate=[NAN, 18], SpO2_scale1=[96, 96],
+                                         temperature=[37.0, 37.0], pulse=[80, 80])
+    assert scores['score'][0] == -1
+    assert scores['score'][1] == score_news(18, 96, 37.0, 80).score
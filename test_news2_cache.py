@@ -0,0 +1,56 @@
+# test_news2_cache.py
+
+import random
+
+import pytest
+
+from news2_algo import NEWS_BANDS, score_news
+from news2_cache import NEWSScoreCache
+
+NORMAL = {"respiration_rate": 16, "SpO2_scale1": 97, "temperature": 37.0, "pulse": 70, "systolic_bp": 120,
+          "consciousness": "A"}
+OFFSETS = (-0.6, -0.5, -0.45, -0.06, -0.05, -0.04, -0.01, 0, 0.01, 0.04, 0.05, 0.06, 0.45, 0.5, 0.6)
+
+
+def _edge_readings():
+    # Every band boundary of every vital, approached from both sides at and around chart
+    # resolution, plus the edges of the accepted ranges
+    for parameter, bands in NEWS_BANDS.items():
+        name = "SpO2_scale1" if parameter == "SpO2" else parameter
+        edges = [bound for bound, _ in bands if bound is not None] + [0, 100]
+        for edge in edges:
+            for offset in OFFSETS:
+                yield {**NORMAL, name: round(edge + offset, 2)}
+            yield {**NORMAL, name: int(edge)}
+
+
+def _outcome(function, readings):
+    try:
+        return function(**readings)
+    except ValueError as e:
+        return ("ValueError", str(e))
+
+
+EDGE_READINGS = list(_edge_readings())
+# Known cases where rounding before scoring changed the score
+REGRESSIONS = [{**NORMAL, "respiration_rate": 24.5}, {**NORMAL, "respiration_rate": 20.5},
+               {**NORMAL, "SpO2_scale1": 91.4}, {**NORMAL, "temperature": 36.04},
+               {**NORMAL, "pulse": 130.5}, {**NORMAL, "pulse": 50.5}, {**NORMAL, "SpO2_scale1": 100.4}]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cache_matches_score_news_at_every_band_edge(seed):
+    # One shared cache, filled in a random order, so neighbouring readings meet each other's entries
+    cache = NEWSScoreCache(maxsize=100_000)
+    readings = EDGE_READINGS + REGRESSIONS
+    random.Random(seed).shuffle(readings)
+    for _ in range(2):
+        for reading in readings:
+            assert _outcome(cache.score, reading) == _outcome(score_news, reading), reading
+    assert cache.hits
+
+
+@pytest.mark.parametrize("reading", REGRESSIONS)
+def test_cache_scores_exact_readings(reading):
+    cache = NEWSScoreCache()
+    assert _outcome(cache.score, reading) == _outcome(score_news, reading)
@@ -0,0 +1,55 @@
+# test_news2_rescore.py
+
+import csv
+import json
+
+import pytest
+
+from news2_rescore import rescore_file
+
+HEADER = "id,respiration_rate,SpO2_scale1,temperature,pulse,systolic_bp,consciousness,on_oxygen,note\n"
+
+
+def rescore(tmp_path, name, text, chunk_size):
+    source, target = tmp_path / name, tmp_path / f"out-{name}"
+    source.write_text(text, encoding="utf-8")
+    summary = rescore_file(str(source), str(target), chunk_size=chunk_size, workers=2, progress=None)
+    return summary, target.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 100])
+def test_jsonl_bad_lines_are_reported_in_place(tmp_path, chunk_size):
+    lines = [json.dumps({"id": 1, "respiration_rate": 18, "SpO2_scale1": 96, "temperature": 37, "pulse": 80}),
+             "not json",
+             '["a list"]',
+             "",
+             json.dumps({"id": 4, "respiration_rate": 26, "SpO2_scale1": 90, "temperature": 39.5, "pulse": 135})]
+    summary, output = rescore(tmp_path, "obs.jsonl", "\n".join(lines) + "\n", chunk_size)
+    records = [json.loads(line) for line in output.splitlines()]
+
+    assert summary["rows"] == 4
+    assert [record.get("id") for record in records] == [1, None, None, 4]
+    assert records[0]["news2_score"] == 0 and records[0]["news2_error"] == ""
+    assert records[1]["news2_score"] is None and "Invalid JSON at line 2" in records[1]["news2_error"]
+    assert records[2]["news2_error"] == "Line 3 is not a JSON object"
+    assert records[3]["news2_band"] == "high"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 100])
+def test_csv_chunks_keep_quoted_newlines_and_flag_bad_rows(tmp_path, chunk_size):
+    text = (HEADER
+            + '1,18,96,37,80,120,A,no,"two\nline note"\n'
+            + "2,18,96\n"
+            + "\n"
+            + '3,18,96,37,80,120,A,no,"three\nline\nnote"\n'
+            + "4,abc,96,37,80,120,A,no,x\n")
+    summary, output = rescore(tmp_path, "obs.csv", text, chunk_size)
+    rows = list(csv.reader(output.splitlines(keepends=True)))
+
+    assert summary["rows"] == 4
+    assert rows[0][-5:] == ["news2_score", "news2_band", "param_received_3", "params_with_3_points", "news2_error"]
+    assert [row[0] for row in rows[1:]] == ["1", "2", "3", "4"]
+    assert rows[1][8] == "two\nline note" and rows[1][9] == "0"
+    assert rows[2][-1] == "Row has 3 fields, expected 9" and len(rows[2]) == 14
+    assert rows[3][8] == "three\nline\nnote" and rows[3][-1] == ""
+    assert rows[4][9] == "" and rows[4][-1] != ""
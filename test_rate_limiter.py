@@ -0,0 +1,65 @@
+# test_rate_limiter.py
+
+import pytest
+
+from rate_limiter import PriorityFetchQueue, RateLimitBudget, RateLimited
+from scheduler import Scheduler
+
+
+def test_acquire_refuses_instead_of_spending_the_reserve():
+    budget = RateLimitBudget(user_capacity=10)
+    for _ in range(8):
+        budget.acquire('u')
+    with pytest.raises(RateLimited):
+        budget.acquire('u')
+    budget.acquire('u', band='high')
+    assert budget.refused == 1
+
+
+def test_queue_polls_sickest_first_and_defers_the_rest():
+    budget = RateLimitBudget(user_capacity=10)
+    queue = PriorityFetchQueue(budget)
+    order = []
+
+    def fetch(name, requests):
+        def run():
+            for _ in range(requests):
+                budget.acquire('u')  # as FitbitClient does before each request
+            order.append(name)
+        return run
+
+    queue.submit('u', fetch('low', 4), band='low', cost=4)
+    queue.submit('u', fetch('high', 3), band='high', cost=3)
+    queue.submit('u', fetch('medium', 3), band='medium', cost=3)
+    queue.run()
+    assert order == ['high', 'medium']
+    assert len(queue) == 1 and queue.deferred == 1
+    assert 4 <= budget.users['u'].available() < 4.1  # the prepaid requests were not taken twice
+
+
+def test_fetch_that_runs_out_part_way_stays_queued():
+    budget = RateLimitBudget(user_capacity=10)
+    queue = PriorityFetchQueue(budget)
+
+    def fetch():
+        for _ in range(11):
+            budget.acquire('u')
+
+    queue.submit('u', fetch, band='high', cost=2)
+    assert queue.run() == []
+    assert len(queue) == 1
+
+
+def test_patient_jobs_are_queued_once_at_their_band():
+    scheduler = Scheduler()
+    queue = PriorityFetchQueue(RateLimitBudget())
+    polled = []
+    job = queue.patient_job(scheduler, polled.append)
+    scheduler.add_patient_job('p1', job, band='zero')
+    scheduler.add_patient_job('p2', job, band='zero')
+    scheduler.set_patient_band('p2', 'high')
+    for patient_id in ('p1', 'p2', 'p2'):
+        job(patient_id)
+    assert len(queue) == 2
+    assert [band for _, band, _ in queue.run()] == ['high', 'zero']
+    assert polled == ['p2', 'p1']
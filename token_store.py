@@ -0,0 +1,225 @@
+# token_store.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import requests
+
+from config import FITBIT_TOKEN_URL, TOKEN_DB_PATH, TOKEN_REFRESH_MARGIN_SECONDS
+from fitbit_integration import get_session
+
+
+class TokenRefreshError(Exception):
+    """Raised when a token cannot be refreshed (e.g. the refresh token was revoked or already used)."""
+
+
+class TokenStore:
+    """
+    Persistent, shared store of Fitbit OAuth tokens that refreshes each user's token before it expires.
+
+    Tokens live in a SQLite file, so they survive restarts and are shared by every thread and
+    process using the same file. get_access_token() refreshes a token proactively once it is
+    within refresh_margin seconds of expiry, instead of waiting for a TokenExpiredError.
+
+    Fitbit refresh tokens are single-use, so refreshes are single-flight: concurrent callers in
+    one process wait on the same in-flight refresh, and processes sharing the file serialise on
+    a SQLite write lock and re-check the stored token before refreshing it themselves.
+
+    Parameters:
+    - path: SQLite database file
+    - client_id / client_secret: Fitbit app credentials (default: FITBIT_CLIENT_ID/SECRET)
+    - refresh_margin: seconds before expiry at which a token is refreshed
+    - token_url: OAuth2 token endpoint
+    """
+
+    def __init__(self, path=TOKEN_DB_PATH, client_id=None, client_secret=None,
+                 refresh_margin=TOKEN_REFRESH_MARGIN_SECONDS, token_url=None):
+        self.path = path
+        self.client_id = client_id or os.getenv('FITBIT_CLIENT_ID')
+        self.client_secret = client_secret or os.getenv('FITBIT_CLIENT_SECRET')
+        self.refresh_margin = refresh_margin
+        self.token_url = token_url or FITBIT_TOKEN_URL
+        self.refresh_count = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS tokens (
+                    user_id TEXT PRIMARY KEY,
+                    token TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )''')
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def save(self, user_id, token):
+        """
+        Store a token for a user, e.g. straight after the authorization code exchange.
+
+        Parameters:
+        - user_id: Fitbit user id (or any stable key for the patient)
+        - token: token response dict with access_token, refresh_token and expires_at or expires_in
+
+        Returns:
+        - The stored token, with expires_at filled in
+        """
+        token = dict(token)
+        if 'expires_at' not in token:
+            token['expires_at'] = time.time() + float(token.get('expires_in', 28800))
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO tokens (user_id, token, expires_at) VALUES (?, ?, ?)',
+                       (user_id, json.dumps(token), token['expires_at']))
+        return token
+
+    def load(self, user_id):
+        """Return the stored token dict for a user, or None."""
+        with self._connect() as db:
+            row = db.execute('SELECT token FROM tokens WHERE user_id = ?', (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def users(self):
+        with self._connect() as db:
+            return [row[0] for row in db.execute('SELECT user_id FROM tokens')]
+
+    def delete(self, user_id):
+        with self._connect() as db:
+            db.execute('DELETE FROM tokens WHERE user_id = ?', (user_id,))
+
+    def get_token(self, user_id):
+        """Return a token for the user that is valid for at least refresh_margin seconds, refreshing if needed."""
+        token = self.load(user_id)
+        if token is None:
+            raise KeyError(f"No token stored for user {user_id}")
+        if self._needs_refresh(token):
+            token = self.refresh(user_id)
+        return token
+
+    def get_access_token(self, user_id):
+        return self.get_token(user_id)['access_token']
+
+    def refresh(self, user_id, force=False):
+        """
+        Refresh a user's token, sharing one in-flight refresh between concurrent callers.
+
+        Parameters:
+        - user_id: user whose token to refresh
+        - force: refresh even if the stored token is not near expiry (e.g. after a 401)
+
+        Returns:
+        - The new token dict
+        """
+        with self._lock:
+            future = self._inflight.get(user_id)
+            leader = future is None
+            if leader:
+                future = self._inflight[user_id] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            token = self._refresh_locked(user_id, force)
+            future.set_result(token)
+            return token
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[user_id]
+
+    def _refresh_locked(self, user_id, force):
+        with self._connect() as db:
+            # Serialise refreshes across processes; whoever gets the lock second sees the new token
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute('SELECT token FROM tokens WHERE user_id = ?', (user_id,)).fetchone()
+                if row is None:
+                    raise KeyError(f"No token stored for user {user_id}")
+                token = json.loads(row[0])
+                if not force and not self._needs_refresh(token):
+                    db.execute('COMMIT')
+                    return token
+
+                new_token = self._request_refresh(token)
+                db.execute('INSERT OR REPLACE INTO tokens (user_id, token, expires_at) VALUES (?, ?, ?)',
+                           (user_id, json.dumps(new_token), new_token['expires_at']))
+                db.execute('COMMIT')
+                return new_token
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+
+    def _request_refresh(self, token):
+        data = {'grant_type': 'refresh_token', 'refresh_token': token['refresh_token']}
+        auth = None
+        if self.client_secret:
+            auth = (self.client_id, self.client_secret)
+        else:
+            # Public (PKCE) clients identify themselves in the body instead
+            data['client_id'] = self.client_id
+        try:
+            response = get_session().post(self.token_url, data=data, auth=auth, timeout=10)
+        except requests.exceptions.RequestException as e:
+            raise TokenRefreshError(f"Token refresh failed: {e}") from e
+        if response.status_code != 200:
+            raise TokenRefreshError(f"Token refresh failed with status {response.status_code}: {response.text}")
+        self.refresh_count += 1
+        new_token = response.json()
+        new_token['expires_at'] = time.time() + float(new_token.get('expires_in', 28800))
+        return new_token
+
+    def _needs_refresh(self, token):
+        return token.get('expires_at', 0) - time.time() <= self.refresh_margin
+
+    def start_background_refresh(self, interval=60):
+        """Refresh every stored token that is close to expiry every `interval` seconds on a daemon thread."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_due_tokens, args=(interval,), daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def _refresh_due_tokens(self, interval):
+        while not self._stop.is_set():
+            cutoff = time.time() + self.refresh_margin
+            with self._connect() as db:
+                due = [row[0] for row in db.execute('SELECT user_id FROM tokens WHERE expires_at <= ?', (cutoff,))]
+            for user_id in due:
+                try:
+                    self.refresh(user_id)
+                except (TokenRefreshError, KeyError) as e:
+                    print(f"Background token refresh failed for {user_id}: {e}")
+            self._stop.wait(interval)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_token_store():
+    """Return the process-wide TokenStore backed by config.TOKEN_DB_PATH."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = TokenStore()
+        return _default_store
@@ -0,0 +1,260 @@
+# vitals_ring.py
+
+import mmap
+import os
+import threading
+
+import numpy as np
+
+from config import VITALS_RING_CAPACITY, VITALS_RING_DIR
+from database_manager import CONSCIOUSNESS_CODES, consciousness_level
+
+try:
+    import fcntl
+except ImportError:  # Windows: the single-writer rule is not enforced
+    fcntl = None
+
+# One packed record per reading time. Missing floats are NaN, missing consciousness is 255
+# and a missing NEWS score is -1. Consciousness uses the database_manager AVPU codes.
+RECORD_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('pulse', '<f4'),
+    ('respiration_rate', '<f4'),
+    ('SpO2', '<f4'),
+    ('temperature', '<f4'),
+    ('systolic_bp', '<f4'),
+    ('consciousness', 'u1'),
+    ('on_oxygen', 'u1'),
+    ('news_score', 'i1'),
+    ('reserved', 'u1'),
+])
+
+MAGIC = b'NEWSRNG1'
+HEADER_SIZE = 64
+# Header words (little-endian uint64): magic, capacity, record size, records ever written
+_CAPACITY, _RECORD_SIZE, _COUNT = 1, 2, 3
+
+_MISSING = {'consciousness': 255, 'on_oxygen': 255, 'news_score': -1}
+_VITALS = [name for name in RECORD_DTYPE.names if name not in ('ts', 'reserved')]
+
+
+class VitalsRing:
+    """
+    Fixed-size ring buffer of packed vitals records for one device, in a memory-mapped file.
+
+    Holds the last `capacity` readings (24 hours of 1-minute data by default). One ingest
+    process opens the ring writable and appends; any number of Streamlit sessions and worker
+    processes open it read-only and get numpy views straight onto the mapped file, with no
+    query or deserialisation. The file keeps its contents and write position across restarts.
+
+    Every record is stored twice, at slot i and slot i + capacity, so the latest n records
+    are always one contiguous slice and readers never have to stitch a wrapped window. The
+    writer fills both copies before advancing the shared record count, so a reader only sees
+    complete records. Views are live: a view of the last n records stays unchanged until the
+    writer has appended another capacity - n records; pass copy=True to keep data longer.
+    Readers see at most capacity - 1 records: the oldest slot is the one the writer fills
+    next, so leaving it out keeps every window sorted and intact while an append is under way.
+
+    Parameters:
+    - path: ring file
+    - capacity: records held (only used when the writer creates the file)
+    - writable: open as the single writer (creates the file if needed)
+    """
+
+    def __init__(self, path, capacity=VITALS_RING_CAPACITY, writable=False):
+        self.path = path
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            _create(path, capacity)
+
+        self._file = open(path, 'r+b' if writable else 'rb')
+        if writable and fcntl is not None:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._file.close()
+                raise RuntimeError(f"{path} already has a writer") from None
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        self._header = np.ndarray((HEADER_SIZE // 8,), '<u8', buffer=self._map)
+        if bytes(self._map[:8]) != MAGIC or int(self._header[_RECORD_SIZE]) != RECORD_DTYPE.itemsize:
+            self.close()
+            raise ValueError(f"{path} is not a vitals ring of this format")
+        self.capacity = int(self._header[_CAPACITY])
+        self._records = np.ndarray((2 * self.capacity,), RECORD_DTYPE, buffer=self._map, offset=HEADER_SIZE)
+
+    def close(self):
+        self._header = self._records = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def count(self):
+        """Records written since the ring was created (the newest is count - 1)."""
+        return int(self._header[_COUNT])
+
+    def __len__(self):
+        """Records a reader can see (at most capacity - 1; see the class docstring)."""
+        return min(self.count, self.capacity - 1)
+
+    # Writer
+
+    def append(self, ts, **vitals):
+        """
+        Append one reading (keyword names as in RECORD_DTYPE, e.g. pulse=72, consciousness='A').
+
+        Timestamps are epoch seconds and must not go backwards, so time-range reads can bisect.
+        """
+        if not self.writable:
+            raise PermissionError("ring is open read-only")
+        record = _pack(ts, vitals)
+        count = self.count
+        if count and record[0] < self._records[(count - 1) % self.capacity]['ts']:
+            raise ValueError("timestamps must not go backwards")
+        slot = count % self.capacity
+        self._records[slot] = self._records[slot + self.capacity] = record
+        self._header[_COUNT] = count + 1
+
+    def append_many(self, records):
+        """Append a structured array of RECORD_DTYPE records, oldest first."""
+        if not self.writable:
+            raise PermissionError("ring is open read-only")
+        records = np.asarray(records, dtype=RECORD_DTYPE)[-self.capacity:]
+        if not len(records):
+            return
+        count = self.count
+        if count and records['ts'][0] < self._records[(count - 1) % self.capacity]['ts']:
+            raise ValueError("timestamps must not go backwards")
+        if np.any(np.diff(records['ts']) < 0):
+            raise ValueError("timestamps must not go backwards")
+        slots = (count + np.arange(len(records))) % self.capacity
+        self._records[slots] = records
+        self._records[slots + self.capacity] = records
+        self._header[_COUNT] = count + len(records)
+
+    def flush(self):
+        """Write the mapped pages back to disk (the OS does this lazily anyway)."""
+        self._map.flush()
+
+    # Readers
+
+    def latest(self, n=None, copy=False):
+        """
+        Return the last n records (default and at most: capacity - 1), oldest first, as a
+        structured array.
+
+        Without copy this is a read-only view of the mapped file (see the class docstring).
+        """
+        count = self.count
+        n = min(self.capacity - 1 if n is None else n, count, self.capacity - 1)
+        end = count % self.capacity + self.capacity
+        window = self._records[end - n:end]
+        return window.copy() if copy else window
+
+    def since(self, ts, copy=False):
+        """Return the records with timestamps at or after `ts` (epoch seconds), oldest first."""
+        window = self.latest()
+        window = window[np.searchsorted(window['ts'], ts, side='left'):]
+        return window.copy() if copy else window
+
+    def last(self):
+        """Return the newest record as a dict of Python values (missing values as None), or None."""
+        window = self.latest(1)
+        if not len(window):
+            return None
+        return _unpack(window[0])
+
+
+def _create(path, capacity):
+    if capacity < 2:
+        raise ValueError("capacity must be at least 2")
+    # Build the file beside its final name and rename it, so readers never map a half-written header
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    header = np.zeros(HEADER_SIZE // 8, '<u8')
+    header[_CAPACITY], header[_RECORD_SIZE] = capacity, RECORD_DTYPE.itemsize
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(MAGIC + header.tobytes()[8:])
+        f.truncate(HEADER_SIZE + 2 * capacity * RECORD_DTYPE.itemsize)
+    os.replace(temporary, path)
+
+
+def _pack(ts, vitals):
+    unknown = set(vitals) - set(_VITALS)
+    if unknown:
+        raise TypeError(f"unknown vitals: {', '.join(sorted(unknown))}")
+    values = [int(ts)]
+    for name in _VITALS:
+        value = vitals.get(name)
+        if name == 'consciousness' and isinstance(value, str):
+            value = CONSCIOUSNESS_CODES.get(value.upper())
+        if value is None:
+            value = _MISSING.get(name, np.nan)
+        values.append(value)
+    return tuple(values) + (0,)
+
+
+def _unpack(record):
+    values = {'ts': int(record['ts'])}
+    for name in _VITALS:
+        value = record[name].item()
+        if name in _MISSING:
+            value = None if value == _MISSING[name] else value
+        elif value != value:
+            value = None
+        values[name] = value
+    if values['consciousness'] is not None:
+        values['consciousness'] = consciousness_level(values['consciousness'])
+    if values['on_oxygen'] is not None:
+        values['on_oxygen'] = bool(values['on_oxygen'])
+    return values
+
+
+def ring_path(device_id, directory=VITALS_RING_DIR):
+    return os.path.join(directory, f'{device_id}.ring')
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_ring(device_id, directory=VITALS_RING_DIR):
+    """
+    Return this process's read-only VitalsRing for a device, or None if no ring exists yet.
+
+    Mappings are opened once per process and shared by every session and rerun.
+    """
+    path = ring_path(device_id, directory)
+    with _readers_lock:
+        ring = _readers.get(path)
+        if ring is None and os.path.exists(path):
+            ring = _readers[path] = VitalsRing(path)
+        return ring
+
+
+def open_writer(device_id, directory=VITALS_RING_DIR, capacity=VITALS_RING_CAPACITY):
+    """Open (creating if needed) the writable ring for a device; only one writer may hold it."""
+    return VitalsRing(ring_path(device_id, directory), capacity=capacity, writable=True)
+
+
+# Example usage
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    writer = open_writer('Device1', directory, capacity=5)
+    now = int(time.time())
+    for minute in range(8):
+        writer.append(now + minute * 60, pulse=70 + minute, SpO2=97, consciousness='A', news_score=minute % 3)
+
+    reader = get_ring('Device1', directory)
+    print("Held:", len(reader), "of", reader.count, "written")
+    print("Pulse, last 3:", reader.latest(3)['pulse'])
+    print("Newest:", reader.last())
@@ -0,0 +1,201 @@
+# webhook_receiver.py
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from config import FITBIT_SUBSCRIBER_VERIFICATION_CODE, WEBHOOK_HOST, WEBHOOK_PORT
+
+
+def sign(body, client_secret):
+    """X-Fitbit-Signature for a notification body: base64 HMAC-SHA1 keyed with '<client secret>&'."""
+    digest = hmac.new(f'{client_secret}&'.encode(), body, hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+
+class SubscriptionReceiver:
+    """
+    Small HTTP endpoint for Fitbit subscription notifications that triggers targeted fetches.
+
+    Handles the subscriber verification handshake (GET ?verify=<code>: 204 for the right code,
+    404 otherwise), checks the X-Fitbit-Signature of each notification batch, and queues one
+    fetch per (user, collection, date) that changed. Duplicate notifications for a fetch that
+    is still queued are collapsed. A worker thread calls `fetch(owner_id, collection_type, date)`
+    for each queued item, so only patients with new data are fetched instead of polling everyone.
+
+    Parameters:
+    - fetch: callable(owner_id, collection_type, date) run for each change
+    - client_secret: Fitbit app secret used to verify signatures (default: FITBIT_CLIENT_SECRET)
+    - verification_code: subscriber verification code (default: config)
+    - host / port / path: where to listen
+    """
+
+    def __init__(self, fetch, client_secret=None, verification_code=None, host=WEBHOOK_HOST, port=WEBHOOK_PORT,
+                 path='/webhook'):
+        self.fetch = fetch
+        self.client_secret = client_secret or os.getenv('FITBIT_CLIENT_SECRET')
+        self.verification_code = verification_code or FITBIT_SUBSCRIBER_VERIFICATION_CODE
+        self.host = host
+        self.port = port
+        self.path = path
+        self.received = 0
+        self.rejected = 0
+        self.collapsed = 0
+        self.fetched = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._threads = []
+
+    @property
+    def url(self):
+        host = '127.0.0.1' if self.host in ('0.0.0.0', '') else self.host
+        return f'http://{host}:{self.port}{self.path}'
+
+    def start(self):
+        """Start listening and processing notifications on background threads."""
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                code = parse_qs(parsed.query).get('verify', [None])[0]
+                ok = parsed.path == receiver.path and code is not None and \
+                    receiver.verification_code is not None and hmac.compare_digest(code, receiver.verification_code)
+                self._reply(204 if ok else 404)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if urlparse(self.path).path != receiver.path:
+                    self._reply(404)
+                    return
+                # Fitbit expects a quick 204; anything that fails verification gets a 404
+                self._reply(204 if receiver.handle_notifications(body, self.headers.get('X-Fitbit-Signature')) else 404)
+
+            def _reply(self, status):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._threads = [threading.Thread(target=self._server.serve_forever, daemon=True),
+                         threading.Thread(target=self._process_queue, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        print(f"Listening for Fitbit subscription notifications at {self.url}")
+
+    def stop(self):
+        """Stop listening; queued fetches already accepted are still processed first."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def handle_notifications(self, body, signature):
+        """
+        Verify a notification batch and queue its fetches.
+
+        Returns:
+        - True if the batch was accepted, False if the signature or payload was invalid
+        """
+        if not signature or not self.client_secret or \
+                not hmac.compare_digest(signature, sign(body, self.client_secret)):
+            self.rejected += 1
+            return False
+        try:
+            notifications = json.loads(body)
+        except ValueError:
+            self.rejected += 1
+            return False
+        # A batch is a JSON list of notification objects; reject anything else as a whole
+        if not isinstance(notifications, list) or \
+                not all(isinstance(notification, dict) for notification in notifications):
+            self.rejected += 1
+            return False
+
+        for notification in notifications:
+            key = (notification.get('ownerId'), notification.get('collectionType'), notification.get('date'))
+            self.received += 1
+            with self._lock:
+                if key in self._pending:
+                    self.collapsed += 1
+                    continue
+                self._pending.add(key)
+            self._queue.put(key)
+        return True
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _process_queue(self):
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            with self._lock:
+                self._pending.discard(key)
+            try:
+                self.fetch(*key)
+                self.fetched += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Fetch for notification {key} failed: {e}")
+
+
+def send_test_notification(url, notifications, client_secret):
+    """
+    Local stand-in for Fitbit's notifier: POST a signed notification batch to a receiver.
+
+    Parameters:
+    - notifications: list of dicts with collectionType, date, ownerId, ownerType and subscriptionId
+
+    Returns:
+    - HTTP status code returned by the receiver (204 when accepted)
+    """
+    body = json.dumps(notifications).encode()
+    response = requests.post(url, data=body, timeout=5, headers={
+        'Content-Type': 'application/json', 'X-Fitbit-Signature': sign(body, client_secret)})
+    return response.status_code
+
+
+def send_test_verification(url, code):
+    """Stand-in for Fitbit's subscriber verification request; returns the receiver's status code."""
+    return requests.get(url, params={'verify': code}, timeout=5).status_code
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    def fetch(owner_id, collection_type, date):
+        print(f"Fetching {collection_type} for {owner_id} on {date}")
+
+    receiver = SubscriptionReceiver(fetch, client_secret='local-secret', verification_code='local-code', port=0)
+    receiver.start()
+    print("verify (correct):", send_test_verification(receiver.url, 'local-code'))
+    print("verify (wrong):", send_test_verification(receiver.url, 'nope'))
+    batch = [{'collectionType': 'activities', 'date': '2024-05-01', 'ownerId': 'ABC123', 'ownerType': 'user',
+              'subscriptionId': 'sub_ABC123'}] * 3
+    print("notify:", send_test_notification(receiver.url, batch, 'local-secret'))
+    print("notify (bad signature):", send_test_notification(receiver.url, batch, 'wrong-secret'))
+    time.sleep(0.2)
+    receiver.stop()
+    print(f"received={receiver.received} collapsed={receiver.collapsed} fetched={receiver.fetched} rejected={receiver.rejected}")
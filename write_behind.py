@@ -0,0 +1,276 @@
+# write_behind.py
+
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from database_manager import patient_data_rows, reading_value
+
+# Errors that retrying the same rows cannot fix; the rows that cause them are dead-lettered
+_PERMANENT_ERRORS = (ValueError, TypeError, sqlite3.IntegrityError)
+
+
+class WriteBehindQueue:
+    """
+    Bounded in-memory write-behind buffer in front of DatabaseManager.
+
+    Collectors hand readings and NEWS scores to put_patient_data() / put_news_score() and
+    return straight away; a background thread writes them in batches, one transaction per
+    flush, once batch_rows rows are waiting or the oldest has waited max_age seconds. The
+    poll loop never waits on disk unless the buffer is full: then put_* blocks until a
+    flush makes room (backpressure), or raises queue.Full if block is False or put_timeout
+    passes.
+
+    Readings are checked when they are put (a non-numeric or non-finite value raises
+    ValueError there). A flush that fails for a transient reason (e.g. the database is locked)
+    keeps its rows and is retried with exponential backoff; after max_attempts its rows are
+    moved to `dead_letters` as (row, error) pairs. If the error is one retrying cannot fix
+    (ValueError, TypeError, IntegrityError) the batch is written again row by row at once,
+    and only the rows that still fail are dead-lettered, so one bad row never wedges the queue.
+
+    Parameters:
+    - db: DatabaseManager to write to
+    - max_rows: rows the buffer holds before put_* applies backpressure
+    - batch_rows: rows that trigger a flush
+    - max_age: seconds the oldest buffered row may wait before a flush
+    - block / put_timeout: backpressure behaviour when full (wait, up to put_timeout seconds)
+    - max_attempts / backoff / max_backoff: retry policy for failed flushes
+    - dead_letter_limit: most recent dead-lettered rows kept in dead_letters
+    """
+
+    def __init__(self, db, max_rows=50_000, batch_rows=5_000, max_age=1.0, block=True, put_timeout=None,
+                 max_attempts=5, backoff=1.0, max_backoff=30.0, dead_letter_limit=10_000):
+        self.db = db
+        self.max_rows = max_rows
+        self.batch_rows = batch_rows
+        self.max_age = max_age
+        self.block = block
+        self.put_timeout = put_timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.dead_letters = deque(maxlen=dead_letter_limit)
+        self.counters = dict.fromkeys(('flushes', 'rows_written', 'scores_written', 'flush_failures',
+                                       'dead_lettered', 'invalid_puts', 'blocked_puts', 'rejected_puts',
+                                       'peak_depth'), 0)
+        self.flush_seconds = {'last': 0.0, 'max': 0.0, 'total': 0.0}
+        self.blocked_seconds = 0.0
+        self.last_error = None
+
+        self._readings = []
+        self._scores = []
+        self._oldest = None  # monotonic time the oldest buffered row was added
+        self._enqueued = 0  # rows and scores ever accepted
+        self._written = 0  # rows and scores ever committed or dead-lettered
+        self._flush_wanted = 0  # flush everything accepted up to this count now
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self):
+        """Rows and scores waiting to be written (including a flush in progress)."""
+        return self._enqueued - self._written
+
+    # Producers
+
+    def put_patient_data(self, patient_id, data):
+        """Queue a get_patient_data result or observation dict (as DatabaseManager.save_patient_data)."""
+        try:
+            rows = patient_data_rows(patient_id, data)
+        except ValueError:
+            self._invalid_put()
+            raise
+        self.put_readings(rows)
+
+    def put_readings(self, rows):
+        """
+        Queue (patient_id, parameter, timestamp, value) rows.
+
+        Timestamps are coerced to int and values to float; if any row cannot be, ValueError is
+        raised and none of them are queued.
+        """
+        try:
+            rows = [(patient_id, parameter, int(timestamp), reading_value(parameter, value))
+                    for patient_id, parameter, timestamp, value in rows]
+        except (TypeError, ValueError) as e:
+            self._invalid_put()
+            raise ValueError(f"Invalid reading: {e}") from None
+        if rows:
+            self._put(rows, None)
+
+    def put_news_score(self, patient_id, result, timestamp=None):
+        """Queue a NEWSResult for a patient (as DatabaseManager.save_news_score)."""
+        try:
+            timestamp = int(time.time() if timestamp is None else timestamp)
+            if result.score is not None:
+                int(result.score)
+            ','.join(result.params_with_3_points)
+        except (AttributeError, TypeError, ValueError) as e:
+            self._invalid_put()
+            raise ValueError(f"Invalid NEWS score for {patient_id}: {e}") from None
+        self._put(None, (patient_id, timestamp, result))
+
+    def _invalid_put(self):
+        with self._cond:
+            self.counters['invalid_puts'] += 1
+
+    def _put(self, rows, score):
+        size = len(rows) if rows else 1
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("write-behind queue is closed")
+            # A put larger than the whole buffer is let through once the buffer is empty
+            if self.depth and self.depth + size > self.max_rows:
+                if not self.block:
+                    self.counters['rejected_puts'] += 1
+                    raise queue.Full
+                self.counters['blocked_puts'] += 1
+                started = time.monotonic()
+                self._cond.notify_all()
+                room = self._cond.wait_for(lambda: not self.depth or self.depth + size <= self.max_rows
+                                           or self._closing, self.put_timeout)
+                self.blocked_seconds += time.monotonic() - started
+                if not room:
+                    self.counters['rejected_puts'] += 1
+                    raise queue.Full
+                if self._closing:
+                    raise RuntimeError("write-behind queue is closed")
+            if rows:
+                self._readings.extend(rows)
+            else:
+                self._scores.append(score)
+            self._enqueued += size
+            self.counters['peak_depth'] = max(self.counters['peak_depth'], self.depth)
+            # Wake the writer to start the age timer, or to flush a full batch
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._readings) + len(self._scores) >= self.batch_rows:
+                self._cond.notify_all()
+
+    # Flushing
+
+    def flush(self, timeout=None):
+        """
+        Write everything queued so far and wait for it to be committed (or dead-lettered).
+
+        Returns:
+        - True once done, False if timeout passed first
+        """
+        with self._cond:
+            target = self._enqueued
+            self._flush_wanted = max(self._flush_wanted, target)
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout=None):
+        """Flush what is queued, stop the background thread and refuse further puts."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return flushed
+
+    def _due(self):
+        waiting = len(self._readings) + len(self._scores)
+        if not waiting:
+            return False
+        return (waiting >= self.batch_rows or self._flush_wanted > self._written or self._closing
+                or time.monotonic() - self._oldest >= self.max_age)
+
+    def _run(self):
+        retry_at = 0.0
+        attempts = 0
+        while True:
+            with self._cond:
+                while not self._due() or time.monotonic() < retry_at:
+                    if self._closing and not (self._readings or self._scores):
+                        return
+                    if self._oldest is None:
+                        self._cond.wait()
+                    else:
+                        wake = max(self._oldest + self.max_age, retry_at)
+                        self._cond.wait(max(wake - time.monotonic(), 0.001))
+                readings, scores = self._readings, self._scores
+                self._readings, self._scores, oldest = [], [], self._oldest
+                self._oldest = None
+
+            started = time.monotonic()
+            try:
+                self.db.save_batch(readings=readings, news_scores=scores)
+            except Exception as e:
+                attempts += 1
+                print(f"Write-behind flush of {len(readings) + len(scores)} rows failed (attempt {attempts}): {e}")
+                with self._cond:
+                    self.counters['flush_failures'] += 1
+                    self.last_error = e
+                if isinstance(e, _PERMANENT_ERRORS):
+                    # Retrying the batch cannot help: write what can be written, dead-letter the rest
+                    attempts, retry_at = 0, 0.0
+                    self._write_singly(readings, scores)
+                    continue
+                if attempts >= self.max_attempts:
+                    print(f"Write-behind giving up on {len(readings) + len(scores)} rows after {attempts} attempts")
+                    attempts, retry_at = 0, 0.0
+                    self._dead_letter([(row, e) for row in readings + scores])
+                    continue
+                # Keep the rows, ahead of anything queued since, and retry after a backoff
+                with self._cond:
+                    self._readings[:0], self._scores[:0] = readings, scores
+                    self._oldest = oldest
+                retry_at = time.monotonic() + min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+                continue
+            attempts = 0
+            self._committed(readings, scores, time.monotonic() - started)
+
+    def _committed(self, readings, scores, elapsed):
+        with self._cond:
+            self._written += len(readings) + len(scores)
+            self.counters['flushes'] += 1
+            self.counters['rows_written'] += len(readings)
+            self.counters['scores_written'] += len(scores)
+            self.flush_seconds['last'] = elapsed
+            self.flush_seconds['max'] = max(self.flush_seconds['max'], elapsed)
+            self.flush_seconds['total'] += elapsed
+            self._cond.notify_all()
+
+    def _write_singly(self, readings, scores):
+        # One transaction per row, so only the rows that fail are dead-lettered
+        started = time.monotonic()
+        dead = []
+        readings = [row for row in readings if self._save_one(dead, row, readings=[row])]
+        scores = [score for score in scores if self._save_one(dead, score, news_scores=[score])]
+        self._dead_letter(dead)
+        self._committed(readings, scores, time.monotonic() - started)
+
+    def _dead_letter(self, dead):
+        with self._cond:
+            self.dead_letters.extend(dead)
+            self.counters['dead_lettered'] += len(dead)
+            self._written += len(dead)
+            self._cond.notify_all()
+
+    def _save_one(self, dead, row, **batch):
+        try:
+            self.db.save_batch(**batch)
+            return True
+        except Exception as e:
+            print(f"Write-behind dead-lettered {row!r}: {e}")
+            dead.append((row, e))
+            return False
+
+    def stats(self):
+        """Queue depth, flush counts and flush latency (seconds) for monitoring."""
+        with self._cond:
+            flushes = self.counters['flushes']
+            oldest_wait = time.monotonic() - self._oldest if self._oldest is not None else 0.0
+            return {**self.counters, 'depth': self.depth, 'oldest_wait': oldest_wait,
+                    'flush_seconds_last': self.flush_seconds['last'],
+                    'flush_seconds_max': self.flush_seconds['max'],
+                    'flush_seconds_mean': self.flush_seconds['total'] / flushes if flushes else 0.0,
+                    'blocked_seconds': self.blocked_seconds}